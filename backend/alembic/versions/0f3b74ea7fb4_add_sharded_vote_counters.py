@@ -0,0 +1,37 @@
+"""add_sharded_vote_counters
+
+Revision ID: 0f3b74ea7fb4
+Revises: 96d90758d7e6
+Create Date: 2026-10-17 09:12:31.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f3b74ea7fb4'
+down_revision: Union[str, Sequence[str], None] = '96d90758d7e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('elections', sa.Column('counter_shards', sa.Integer(), server_default='1', nullable=False))
+    op.create_table('vote_counter_shards',
+        sa.Column('vote_count', sa.Integer(), nullable=False),
+        sa.Column('election_id', sa.Integer(), nullable=False),
+        sa.Column('candidate_hashed_national_id', sa.String(length=200), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['election_id'], ['elections.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('election_id', 'candidate_hashed_national_id', 'shard')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vote_counter_shards')
+    op.drop_column('elections', 'counter_shards')
@@ -0,0 +1,28 @@
+"""add_election_live_results
+
+Revision ID: 3c5e9a1d7b42
+Revises: 8edb2fa9fb09
+Create Date: 2026-10-17 14:20:31.508214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e9a1d7b42'
+down_revision: Union[str, Sequence[str], None] = '8edb2fa9fb09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('elections', sa.Column('live_results', sa.Boolean(), server_default='false', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('elections', 'live_results')
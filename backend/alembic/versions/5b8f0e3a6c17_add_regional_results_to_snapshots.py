@@ -0,0 +1,29 @@
+"""add_regional_results_to_snapshots
+
+Revision ID: 5b8f0e3a6c17
+Revises: a47d2c8e915f
+Create Date: 2026-10-17 15:38:44.120975
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8f0e3a6c17'
+down_revision: Union[str, Sequence[str], None] = 'a47d2c8e915f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('election_result_snapshots', sa.Column('regional_results', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('election_result_snapshots', 'regional_results')
@@ -0,0 +1,62 @@
+"""store_ranked_ballot_candidate_ids
+
+Revision ID: 7d2e4b9a1f63
+Revises: c92e41f7d305
+Create Date: 2026-10-17 19:42:17.305518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e4b9a1f63'
+down_revision: Union[str, Sequence[str], None] = 'c92e41f7d305'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Each election's participating candidate ids in the order the stored indexes point into
+CANDIDATE_ORDER = """
+    SELECT election_id, array_agg(candidate_hashed_national_id ORDER BY candidate_hashed_national_id COLLATE "C") AS ids
+    FROM candidate_participations
+    GROUP BY election_id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ranked_ballots', sa.Column('ranked_candidate_ids', postgresql.ARRAY(sa.String(length=200)), nullable=True))
+    op.execute(f"""
+        UPDATE ranked_ballots SET ranked_candidate_ids = ARRAY(
+            SELECT candidates.ids[ranked.candidate_index + 1]
+            FROM unnest(ranked_ballots.rankings) WITH ORDINALITY AS ranked(candidate_index, place)
+            WHERE candidates.ids[ranked.candidate_index + 1] IS NOT NULL
+            ORDER BY ranked.place
+        )
+        FROM ({CANDIDATE_ORDER}) AS candidates
+        WHERE candidates.election_id = ranked_ballots.election_id
+    """)
+    op.execute("UPDATE ranked_ballots SET ranked_candidate_ids = '{}' WHERE ranked_candidate_ids IS NULL")
+    op.drop_column('ranked_ballots', 'rankings')
+    op.alter_column('ranked_ballots', 'ranked_candidate_ids', new_column_name='rankings', nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('ranked_ballots', sa.Column('candidate_indexes', postgresql.ARRAY(sa.SmallInteger()), nullable=True))
+    op.execute(f"""
+        UPDATE ranked_ballots SET candidate_indexes = ARRAY(
+            SELECT array_position(candidates.ids, ranked.candidate_id) - 1
+            FROM unnest(ranked_ballots.rankings) WITH ORDINALITY AS ranked(candidate_id, place)
+            WHERE array_position(candidates.ids, ranked.candidate_id) IS NOT NULL
+            ORDER BY ranked.place
+        )::smallint[]
+        FROM ({CANDIDATE_ORDER}) AS candidates
+        WHERE candidates.election_id = ranked_ballots.election_id
+    """)
+    op.execute("UPDATE ranked_ballots SET candidate_indexes = '{}' WHERE candidate_indexes IS NULL")
+    op.drop_column('ranked_ballots', 'rankings')
+    op.alter_column('ranked_ballots', 'candidate_indexes', new_column_name='rankings', nullable=False)
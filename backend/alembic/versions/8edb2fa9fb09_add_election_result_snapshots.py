@@ -0,0 +1,35 @@
+"""add_election_result_snapshots
+
+Revision ID: 8edb2fa9fb09
+Revises: 9bf11f7f2c1c
+Create Date: 2026-10-17 13:41:55.270318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8edb2fa9fb09'
+down_revision: Union[str, Sequence[str], None] = '9bf11f7f2c1c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('election_result_snapshots',
+        sa.Column('election_id', sa.Integer(), nullable=False),
+        sa.Column('results', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['election_id'], ['elections.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('election_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('election_result_snapshots')
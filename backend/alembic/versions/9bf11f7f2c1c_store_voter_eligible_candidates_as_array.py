@@ -0,0 +1,41 @@
+"""store_voter_eligible_candidates_as_array
+
+Revision ID: 9bf11f7f2c1c
+Revises: d64a7c5eccab
+Create Date: 2026-10-17 12:26:08.113590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9bf11f7f2c1c'
+down_revision: Union[str, Sequence[str], None] = 'd64a7c5eccab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('voters', sa.Column('eligible_candidate_ids', postgresql.ARRAY(sa.String(length=200)), nullable=True))
+    op.execute(
+        "UPDATE voters SET eligible_candidate_ids = ARRAY(SELECT json_array_elements_text(eligible_candidates::json)) "
+        "WHERE eligible_candidates IS NOT NULL AND eligible_candidates NOT IN ('', '[]', 'null')"
+    )
+    op.create_index('ix_voters_eligible_candidate_ids', 'voters', ['eligible_candidate_ids'], unique=False, postgresql_using='gin')
+    op.drop_column('voters', 'eligible_candidates')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('voters', sa.Column('eligible_candidates', sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE voters SET eligible_candidates = array_to_json(eligible_candidate_ids)::text "
+        "WHERE eligible_candidate_ids IS NOT NULL"
+    )
+    op.drop_index('ix_voters_eligible_candidate_ids', table_name='voters', postgresql_using='gin')
+    op.drop_column('voters', 'eligible_candidate_ids')
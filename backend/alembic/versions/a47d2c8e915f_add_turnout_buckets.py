@@ -0,0 +1,47 @@
+"""add_turnout_buckets
+
+Revision ID: a47d2c8e915f
+Revises: 3c5e9a1d7b42
+Create Date: 2026-10-17 15:02:17.664390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a47d2c8e915f'
+down_revision: Union[str, Sequence[str], None] = '3c5e9a1d7b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('turnout_buckets',
+        sa.Column('election_id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('governorate', sa.String(length=100), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('ballots', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['election_id'], ['elections.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('election_id', 'bucket_start', 'governorate', 'shard')
+    )
+
+    # Bucket the ballots recorded so far
+    op.execute(
+        "INSERT INTO turnout_buckets (election_id, bucket_start, governorate, shard, ballots) "
+        "SELECT voting_processes.election_id, date_trunc('minute', voting_processes.created_at), "
+        "coalesce(voters.governerate, ''), 0, count(*) "
+        "FROM voting_processes LEFT OUTER JOIN voters "
+        "ON voters.voter_hashed_national_id = voting_processes.voter_hashed_national_id "
+        "AND voters.election_id = voting_processes.election_id "
+        "GROUP BY 1, 2, 3"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('turnout_buckets')
@@ -0,0 +1,39 @@
+"""add_tabulation_methods
+
+Revision ID: c92e41f7d305
+Revises: 5b8f0e3a6c17
+Create Date: 2026-10-17 16:10:05.842133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c92e41f7d305'
+down_revision: Union[str, Sequence[str], None] = '5b8f0e3a6c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('elections', sa.Column('tabulation_method', sa.String(length=20), server_default='plurality', nullable=False))
+    op.add_column('elections', sa.Column('seats', sa.Integer(), server_default='1', nullable=False))
+    op.create_table('ranked_ballots',
+        sa.Column('election_id', sa.Integer(), nullable=False),
+        sa.Column('ballot_id', sa.UUID(), server_default=sa.text('gen_random_uuid()'), nullable=False),
+        sa.Column('rankings', postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+        sa.ForeignKeyConstraint(['election_id'], ['elections.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('election_id', 'ballot_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ranked_ballots')
+    op.drop_column('elections', 'seats')
+    op.drop_column('elections', 'tabulation_method')
@@ -0,0 +1,51 @@
+"""add_ballot_receipts
+
+Revision ID: d64a7c5eccab
+Revises: 0f3b74ea7fb4
+Create Date: 2026-10-17 11:02:47.905113
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd64a7c5eccab'
+down_revision: Union[str, Sequence[str], None] = '0f3b74ea7fb4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('voting_processes', sa.Column('receipt_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_voting_processes_election_receipt', 'voting_processes', ['election_id', 'receipt_hash'])
+    op.add_column('elections', sa.Column('receipt_accumulator', sa.Numeric(precision=78, scale=0), server_default='0', nullable=False))
+    op.add_column('vote_counter_shards', sa.Column('receipt_accumulator', sa.Numeric(precision=78, scale=0), server_default='0', nullable=False))
+
+    # Ballots recorded before receipts existed get an unsalted receipt so that
+    # every election's accumulator covers all of its ballots
+    op.execute(
+        "UPDATE voting_processes SET receipt_hash = encode(sha256(convert_to("
+        "election_id::text || ':' || voter_hashed_national_id || ':' || created_at::text, 'UTF8')), 'hex')"
+    )
+    bind = op.get_bind()
+    accumulators = defaultdict(int)
+    for election_id, receipt_hash in bind.execute(sa.text("SELECT election_id, receipt_hash FROM voting_processes")):
+        accumulators[election_id] += int(receipt_hash, 16)
+    for election_id, accumulator in accumulators.items():
+        bind.execute(
+            sa.text("UPDATE elections SET receipt_accumulator = :accumulator WHERE id = :election_id"),
+            {"accumulator": accumulator % 2 ** 256, "election_id": election_id},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('vote_counter_shards', 'receipt_accumulator')
+    op.drop_column('elections', 'receipt_accumulator')
+    op.drop_index('ix_voting_processes_election_receipt', table_name='voting_processes')
+    op.drop_column('voting_processes', 'receipt_hash')
@@ -0,0 +1,102 @@
+"""
+Ballot acceptance rate with direct writes and with buffered ingestion.
+
+The buffered run submits every ballot through the Redis vote buffer (plus one
+duplicate submission per voter), then starts a consumer and waits until the
+stream is drained. The counters are checked against the number of voters once
+the database has caught up.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.buffered_votes --voters 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import time
+
+import redis.asyncio as redis
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from benchmarks.common import seed_election, teardown
+from core.settings import settings
+from models.election import Election
+from services.vote_buffer import BALLOT_STREAM, VoteBuffer, VoteBufferConsumer
+from services.voting import VotingService
+
+
+async def accept_ballots(seeded, args, sessions, redis_connection) -> tuple[float, int]:
+    """Submit each voter's ballot twice; returns ballots/s and the number of rejected duplicates"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rejected = 0
+
+    async def submit(voter_id: str) -> None:
+        nonlocal rejected
+        async with semaphore, sessions() as db:
+            try:
+                await VotingService.cast_ballot(
+                    seeded.election_id, voter_id, seeded.candidate_ids[:1], db, redis=redis_connection
+                )
+            except HTTPException:
+                rejected += 1
+
+    submissions = seeded.voter_ids + seeded.voter_ids
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(voter_id) for voter_id in submissions))
+    return len(submissions) / (time.perf_counter() - started), rejected
+
+
+async def drain(redis_connection) -> float:
+    """Run a consumer until the stream is empty; returns the seconds it took"""
+    consumer = VoteBufferConsumer()
+    started = time.perf_counter()
+    consumer.start(redis_connection)
+    try:
+        while True:
+            await asyncio.sleep(0.1)
+            if await redis_connection.xlen(BALLOT_STREAM) == 0:
+                return time.perf_counter() - started
+    finally:
+        await consumer.stop()
+
+
+async def total_votes(sessions, election_id: int) -> int:
+    async with sessions() as db:
+        return (await db.execute(
+            select(Election.total_vote_count).where(Election.id == election_id)
+        )).scalar_one()
+
+
+async def main_async(args) -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URL, pool_size=args.concurrency, max_overflow=0)
+    sessions = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    redis_connection = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+
+    print(f"{'mode':>9} {'submits/s':>10} {'drain s':>8} {'rejected':>9} {'counts ok':>10}")
+    try:
+        for mode in ("direct", "buffered"):
+            seeded = await seed_election(num_candidates=3, num_voters=args.voters)
+            try:
+                buffer = redis_connection if mode == "buffered" else None
+                throughput, rejected = await accept_ballots(seeded, args, sessions, buffer)
+                drain_seconds = await drain(redis_connection) if buffer is not None else 0.0
+                counts_ok = await total_votes(sessions, seeded.election_id) == len(seeded.voter_ids)
+                print(f"{mode:>9} {throughput:>10.1f} {drain_seconds:>8.2f} {rejected:>9} {str(counts_ok):>10}")
+            finally:
+                await redis_connection.delete(*(
+                    VoteBuffer.dedupe_key(seeded.election_id, voter_id) for voter_id in seeded.voter_ids
+                ))
+                await teardown(seeded)
+    finally:
+        await redis_connection.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare direct and Redis-buffered ballot ingestion")
+    parser.add_argument("--voters", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    asyncio.run(main_async(parser.parse_args()))
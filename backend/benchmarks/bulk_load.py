@@ -0,0 +1,96 @@
+"""
+Voter roll load time: COPY-based bulk loader vs. the previous per-row path.
+
+Seeds an election without voters, then loads `--voters` generated voters with
+BulkLoader.load_voters, and `--legacy-voters` of them with the previous path
+(one existence SELECT and one ORM add per voter, flushed at the end). Both
+loads run in a transaction that is rolled back, so they can be repeated; a
+second bulk load of the same voters measures the all-duplicates case.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bulk_load --voters 100000 --legacy-voters 10000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.future import select
+
+from benchmarks.common import seed_election, teardown
+from core.dependencies import SessionLocal
+from core.shared import hash_national_id
+from models.voter import Voter
+from services.bulk_loader import BulkLoader
+
+
+def generated_voters(count: int, run_id: int) -> list:
+    return [
+        {
+            "voter_hashed_national_id": hash_national_id(f"bulk-{run_id}-voter-{i}"),
+            "phone_number": "+200000000000",
+            "governorate": "Cairo",
+        }
+        for i in range(count)
+    ]
+
+
+async def legacy_load(election_id: int, voters: list, db) -> int:
+    """The per-row existence check and ORM insert used before the bulk loader"""
+    created = 0
+    for voter_info in voters:
+        existing = await db.execute(
+            select(Voter).where(
+                Voter.voter_hashed_national_id == voter_info["voter_hashed_national_id"],
+                Voter.election_id == election_id
+            )
+        )
+        if existing.scalar_one_or_none() is None:
+            db.add(Voter(
+                voter_hashed_national_id=voter_info["voter_hashed_national_id"],
+                phone_number=voter_info["phone_number"],
+                governerate=voter_info["governorate"],
+                election_id=election_id,
+            ))
+            created += 1
+    await db.flush()
+    return created
+
+
+def report(label: str, rows: int, elapsed: float, detail: str):
+    print(f"{label:>20} {rows:>9} {elapsed:>9.3f} {rows / elapsed:>12,.0f}  {detail}")
+
+
+async def main(args):
+    seeded = await seed_election(num_candidates=2, num_voters=0)
+    try:
+        voters = generated_voters(args.voters, seeded.election_id)
+        print(f"{'path':>20} {'rows':>9} {'seconds':>9} {'rows/s':>12}")
+
+        async with SessionLocal() as db:
+            started = time.perf_counter()
+            loaded = await BulkLoader.load_voters(seeded.election_id, voters, db)
+            report("copy", len(voters), time.perf_counter() - started, f"inserted={loaded.inserted} skipped={loaded.skipped}")
+
+            started = time.perf_counter()
+            loaded = await BulkLoader.load_voters(seeded.election_id, voters, db)
+            report("copy (duplicates)", len(voters), time.perf_counter() - started, f"inserted={loaded.inserted} skipped={loaded.skipped}")
+            await db.rollback()
+
+        if args.legacy_voters:
+            async with SessionLocal() as db:
+                sample = voters[:args.legacy_voters]
+                started = time.perf_counter()
+                created = await legacy_load(seeded.election_id, sample, db)
+                report("per-row", len(sample), time.perf_counter() - started, f"inserted={created}")
+                await db.rollback()
+    finally:
+        await teardown(seeded)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the COPY bulk loader with per-row voter inserts")
+    parser.add_argument("--voters", type=int, default=100000)
+    parser.add_argument("--legacy-voters", type=int, default=10000, help="voters loaded with the per-row path (0 to skip)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,48 @@
+"""
+Latency of VotingService.cast_ballot as a function of ballot size.
+
+Usage (from the backend directory, e.g. inside the backend container):
+
+    python -m benchmarks.cast_vote_latency --ballots 500 --sizes 1 2 5 10
+"""
+
+import argparse
+import asyncio
+import time
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from benchmarks.common import seed_election, summarize, teardown
+from core.dependencies import SessionLocal
+from services.voting import VotingService
+
+
+async def run_ballot_size(ballot_size: int, ballots: int) -> dict:
+    seeded = await seed_election(num_candidates=max(ballot_size, 10), num_voters=ballots, num_of_votes_per_voter=ballot_size)
+    samples_ms = []
+    try:
+        selection = seeded.candidate_ids[:ballot_size]
+        for voter_id in seeded.voter_ids:
+            async with SessionLocal() as db:
+                started = time.perf_counter()
+                await VotingService.cast_ballot(seeded.election_id, voter_id, selection, db)
+                samples_ms.append((time.perf_counter() - started) * 1000)
+    finally:
+        await teardown(seeded)
+    return summarize(samples_ms)
+
+
+async def main_async(args) -> None:
+    print(f"{'ballot size':>11} {'ballots':>8} {'mean ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for ballot_size in args.sizes:
+        stats = await run_ballot_size(ballot_size, args.ballots)
+        print(
+            f"{ballot_size:>11} {stats['n']:>8} {stats['mean']:>9.2f} "
+            f"{stats['p50']:>8.2f} {stats['p99']:>8.2f} {stats['max']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cast_vote latency against ballot size")
+    parser.add_argument("--ballots", type=int, default=500, help="ballots cast per ballot size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 5, 10], help="ballot sizes to measure")
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,146 @@
+"""
+Shared helpers for the backend benchmarks.
+
+The benchmarks run against the database configured in SQLALCHEMY_DATABASE_URL
+(the docker-compose Postgres), seed their own organization/election and remove
+everything again when they finish.
+"""
+
+import statistics
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import delete, insert
+
+from core.dependencies import SessionLocal
+from core.shared import Country, Status, hash_national_id
+from models.candidate import Candidate
+from models.candidate_participation import CandidateParticipation
+from models.election import Election
+from models.organization import Organization
+from models.user import User, UserRole
+from models.voter import Voter
+
+
+@dataclass
+class SeededElection:
+    """Identifiers of a benchmark election"""
+    user_id: int
+    election_id: int
+    candidate_ids: List[str]
+    voter_ids: List[str]
+
+
+async def seed_election(
+    num_candidates: int,
+    num_voters: int,
+    num_of_votes_per_voter: int = 1,
+    verified: bool = True,
+    counter_shards: int = 1,
+) -> SeededElection:
+    """Create an organization with one running election, its candidates and its voters"""
+    run_id = uuid.uuid4().hex[:12]
+    now = datetime.now(timezone.utc)
+
+    async with SessionLocal() as db:
+        user = User(
+            email=f"bench-{run_id}@example.com",
+            password="benchmark",
+            role=UserRole.organization,
+            is_active=True,
+        )
+        db.add(user)
+        await db.flush()
+
+        db.add(Organization(user_id=user.id, name=f"bench-{run_id}", country=Country.Egypt, status=Status.accepted))
+
+        election = Election(
+            title=f"Benchmark {run_id}",
+            types="simple",
+            status="running",
+            starts_at=now - timedelta(minutes=1),
+            ends_at=now + timedelta(hours=6),
+            num_of_votes_per_voter=num_of_votes_per_voter,
+            number_of_candidates=num_candidates,
+            potential_number_of_voters=num_voters,
+            counter_shards=counter_shards,
+            method="csv",
+            organization_id=user.id,
+        )
+        db.add(election)
+        await db.flush()
+
+        candidate_ids = [hash_national_id(f"{run_id}-candidate-{i}") for i in range(num_candidates)]
+        voter_ids = [hash_national_id(f"{run_id}-voter-{i}") for i in range(num_voters)]
+
+        await db.execute(
+            insert(Candidate),
+            [
+                {
+                    "hashed_national_id": candidate_id,
+                    "name": f"Candidate {i}",
+                    "country": Country.Egypt,
+                    "organization_id": user.id,
+                }
+                for i, candidate_id in enumerate(candidate_ids)
+            ],
+        )
+        await db.execute(
+            insert(CandidateParticipation),
+            [
+                {"candidate_hashed_national_id": candidate_id, "election_id": election.id, "vote_count": 0}
+                for candidate_id in candidate_ids
+            ],
+        )
+        for start in range(0, num_voters, 5000):
+            await db.execute(
+                insert(Voter),
+                [
+                    {
+                        "voter_hashed_national_id": voter_id,
+                        "phone_number": "+200000000000",
+                        "election_id": election.id,
+                        "is_verified": verified,
+                    }
+                    for voter_id in voter_ids[start:start + 5000]
+                ],
+            )
+
+        seeded = SeededElection(
+            user_id=user.id,
+            election_id=election.id,
+            candidate_ids=candidate_ids,
+            voter_ids=voter_ids,
+        )
+        await db.commit()
+
+    return seeded
+
+
+async def teardown(seeded: SeededElection) -> None:
+    """Remove the benchmark organization; its elections, candidates and voters cascade from the user row"""
+    async with SessionLocal() as db:
+        await db.execute(delete(User).where(User.id == seeded.user_id))
+        await db.commit()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms: List[float]) -> dict:
+    """Latency summary in milliseconds"""
+    return {
+        "n": len(samples_ms),
+        "mean": statistics.fmean(samples_ms) if samples_ms else 0.0,
+        "p50": percentile(samples_ms, 50),
+        "p99": percentile(samples_ms, 99),
+        "max": max(samples_ms) if samples_ms else 0.0,
+    }
@@ -0,0 +1,123 @@
+"""
+Concurrency stress test for the vote counters.
+
+Every voter of a seeded election submits its ballot several times at once from
+many concurrent sessions. When all submissions are done the script checks that
+`Election.total_vote_count`, the number of voting processes and every
+`CandidateParticipation.vote_count` equal what the accepted ballots add up to,
+and exits with status 1 if any counter drifted.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.concurrent_votes --voters 5000 --concurrency 64 --submissions 2
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from benchmarks.common import seed_election, teardown
+from core.settings import settings
+from models.candidate_participation import CandidateParticipation
+from models.election import Election
+from models.voting_process import VotingProcess
+from services.voting import VotingService
+
+
+async def main_async(args) -> int:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URL, pool_size=args.concurrency, max_overflow=0)
+    sessions = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    seeded = await seed_election(args.candidates, args.voters, args.votes_per_voter)
+    rng = random.Random(args.seed)
+    ballots = {
+        voter_id: rng.sample(seeded.candidate_ids, args.votes_per_voter)
+        for voter_id in seeded.voter_ids
+    }
+    submissions = [voter_id for voter_id in seeded.voter_ids for _ in range(args.submissions)]
+    rng.shuffle(submissions)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    accepted = Counter()
+    expected_candidate_counts = Counter()
+    rejected = 0
+    failed = 0
+
+    async def submit(voter_id: str) -> None:
+        nonlocal rejected, failed
+        async with semaphore, sessions() as db:
+            try:
+                await VotingService.cast_ballot(seeded.election_id, voter_id, ballots[voter_id], db)
+            except HTTPException:
+                rejected += 1
+                return
+            except Exception as e:
+                failed += 1
+                print(f"Unexpected error for voter {voter_id[:8]}...: {e}")
+                return
+        accepted[voter_id] += 1
+        expected_candidate_counts.update(ballots[voter_id])
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(submit(voter_id) for voter_id in submissions))
+        elapsed = time.perf_counter() - started
+
+        async with sessions() as db:
+            total_vote_count = (await db.execute(
+                select(Election.total_vote_count).where(Election.id == seeded.election_id)
+            )).scalar_one()
+            voting_processes = (await db.execute(
+                select(func.count()).select_from(VotingProcess).where(VotingProcess.election_id == seeded.election_id)
+            )).scalar_one()
+            candidate_counts = dict((await db.execute(
+                select(CandidateParticipation.candidate_hashed_national_id, CandidateParticipation.vote_count)
+                .where(CandidateParticipation.election_id == seeded.election_id)
+            )).all())
+    finally:
+        await teardown(seeded)
+        await engine.dispose()
+
+    accepted_ballots = sum(accepted.values())
+    print(f"submissions: {len(submissions)}  accepted: {accepted_ballots}  rejected: {rejected}  failed: {failed}")
+    print(f"elapsed: {elapsed:.2f}s  throughput: {len(submissions) / elapsed:.1f} submissions/s")
+
+    problems = []
+    if any(count > 1 for count in accepted.values()):
+        problems.append("a voter had more than one ballot accepted")
+    if total_vote_count != accepted_ballots:
+        problems.append(f"election total_vote_count is {total_vote_count}, expected {accepted_ballots}")
+    if voting_processes != accepted_ballots:
+        problems.append(f"{voting_processes} voting processes recorded, expected {accepted_ballots}")
+    for candidate_id in seeded.candidate_ids:
+        if candidate_counts.get(candidate_id, 0) != expected_candidate_counts[candidate_id]:
+            problems.append(
+                f"candidate {candidate_id[:8]}... has {candidate_counts.get(candidate_id, 0)} votes, "
+                f"expected {expected_candidate_counts[candidate_id]}"
+            )
+
+    for problem in problems:
+        print(f"MISMATCH: {problem}")
+    if not problems:
+        print("OK: all counters match the accepted ballots")
+    return 1 if problems or failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress the vote counters with concurrent ballots")
+    parser.add_argument("--voters", type=int, default=5000)
+    parser.add_argument("--candidates", type=int, default=5)
+    parser.add_argument("--votes-per-voter", type=int, default=2)
+    parser.add_argument("--submissions", type=int, default=2, help="times each voter submits the same ballot")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
@@ -0,0 +1,78 @@
+"""
+Ballot throughput of one hot election with direct and sharded vote counters.
+
+Every ballot of the seeded election selects the same candidate, which is the
+worst case for row contention. After each run the counter slots are rolled up
+and the totals are checked against the number of ballots cast.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.counter_shards --voters 5000 --concurrency 64 --shards 1 16 64
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+import main  # noqa: F401  (registers every model with SQLAlchemy)
+from benchmarks.common import seed_election, teardown
+from core.settings import settings
+from models.candidate_participation import CandidateParticipation
+from models.election import Election
+from services.vote_counter import VoteCounter
+from services.voting import VotingService
+
+
+async def run_shards(shards: int, args, sessions) -> tuple[float, bool]:
+    seeded = await seed_election(num_candidates=3, num_voters=args.voters, counter_shards=shards)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    hot_candidate = seeded.candidate_ids[0]
+
+    async def submit(voter_id: str) -> None:
+        async with semaphore, sessions() as db:
+            await VotingService.cast_ballot(seeded.election_id, voter_id, [hot_candidate], db)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(submit(voter_id) for voter_id in seeded.voter_ids))
+        elapsed = time.perf_counter() - started
+
+        async with sessions() as db:
+            await VoteCounter.rollup(seeded.election_id, db)
+            total = (await db.execute(
+                select(Election.total_vote_count).where(Election.id == seeded.election_id)
+            )).scalar_one()
+            hot_count = (await db.execute(
+                select(CandidateParticipation.vote_count).where(
+                    CandidateParticipation.election_id == seeded.election_id,
+                    CandidateParticipation.candidate_hashed_national_id == hot_candidate
+                )
+            )).scalar_one()
+    finally:
+        await teardown(seeded)
+
+    return len(seeded.voter_ids) / elapsed, total == hot_count == len(seeded.voter_ids)
+
+
+async def main_async(args) -> None:
+    engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URL, pool_size=args.concurrency, max_overflow=0)
+    sessions = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    print(f"{'shards':>6} {'ballots/s':>10} {'counts ok':>10}")
+    try:
+        for shards in args.shards:
+            throughput, counts_ok = await run_shards(shards, args, sessions)
+            print(f"{shards:>6} {throughput:>10.1f} {str(counts_ok):>10}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ballot throughput across counter shard counts")
+    parser.add_argument("--voters", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 16, 64])
+    asyncio.run(main_async(parser.parse_args()))
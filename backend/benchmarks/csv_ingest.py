@@ -0,0 +1,100 @@
+"""
+Voter CSV validation and hashing throughput.
+
+Generates a voter file of `--rows` rows in memory (a fraction of them with an
+empty national ID or phone number when `--bad-rows` is given) and times
+parsing, column-wise validation and hashing with CSVHandler. The previous
+row-by-row loop is timed on the first `--legacy-rows` rows for comparison,
+and hashing alone is timed in one process and on the hashing pool
+(`--hash-workers` processes). No database is needed.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.csv_ingest --rows 1000000 --legacy-rows 50000
+"""
+
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+import core.shared
+from core.shared import hash_national_id, hash_national_ids, shutdown_hash_pool
+from services.csv_handler import VOTER_REQUIRED_COLUMNS, CSVHandler
+
+GOVERNORATES = ["Cairo", "Alexandria", "Giza", "Aswan", "Luxor", "Suez"]
+
+
+def voter_file(rows: int, bad_rows: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    national_ids = rng.integers(10**13, 10**14, rows).astype(str).astype(object)
+    phone_numbers = ("+20" + rng.integers(10**9, 10**10, rows).astype(str)).astype(object)
+    national_ids[rng.choice(rows, bad_rows, replace=False)] = ""
+    frame = pd.DataFrame({
+        "national_id": national_ids,
+        "phone_number": phone_numbers,
+        "governorate": rng.choice(GOVERNORATES, rows),
+    })
+    return frame.to_csv(index=False).encode("utf-8")
+
+
+def legacy_voters(df: pd.DataFrame) -> int:
+    """The per-row loop CSVHandler used before, without its debug output"""
+    voters = []
+    for index, row in df.iterrows():
+        raw_national_id = str(row["national_id"]).strip()
+        if not raw_national_id:
+            raise ValueError("National ID cannot be empty")
+        voters.append({
+            "voter_hashed_national_id": hash_national_id(raw_national_id),
+            "phone_number": str(row["phone_number"]),
+            "governorate": str(row.get("governorate", "")) if pd.notna(row.get("governorate")) else None,
+        })
+    return len(voters)
+
+
+def timed(label: str, rows: int, run):
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>22} {rows:>9} {elapsed:>9.3f} {rows / elapsed:>12,.0f}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time voter CSV validation and hashing")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--bad-rows", type=int, default=0, help="rows with an empty national ID")
+    parser.add_argument("--legacy-rows", type=int, default=50000, help="rows timed with the old loop (0 to skip)")
+    parser.add_argument("--hash-workers", type=int, default=core.shared.HASH_POOL_WORKERS,
+                        help="processes of the hashing pool (1 to skip the pool)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    content = voter_file(args.rows, args.bad_rows, args.seed)
+    print(f"rows={args.rows} bad_rows={args.bad_rows} size={len(content) / 2**20:.1f} MiB")
+    print(f"{'step':>22} {'rows':>9} {'seconds':>9} {'rows/s':>12}")
+
+    df = timed("parse", args.rows, lambda: CSVHandler.read_csv(content, "voters", VOTER_REQUIRED_COLUMNS))
+    voters, errors = timed("validate + hash", args.rows, lambda: CSVHandler.validate_voters(df))
+    try:
+        CSVHandler.raise_for_errors(errors)
+    except HTTPException as e:
+        print(f"rejected: {e.detail[:120]}...")
+
+    if args.legacy_rows and not args.bad_rows:
+        legacy_df = pd.read_csv(io.BytesIO(content), nrows=args.legacy_rows)
+        timed("legacy row loop", len(legacy_df), lambda: legacy_voters(legacy_df))
+
+    national_ids = [national_id for national_id in df["national_id"].tolist() if isinstance(national_id, str)]
+    core.shared.HASH_POOL_WORKERS = 1
+    timed("hash, 1 process", len(national_ids), lambda: hash_national_ids(national_ids))
+    if args.hash_workers > 1:
+        core.shared.HASH_POOL_WORKERS = args.hash_workers
+        core.shared.HASH_POOL_MIN_BATCH = 0
+        hash_national_ids(national_ids[:args.hash_workers])  # start the processes outside the timing
+        timed(f"hash, {args.hash_workers} processes", len(national_ids), lambda: hash_national_ids(national_ids))
+        shutdown_hash_pool()
@@ -0,0 +1,203 @@
+"""
+End-to-end load test of the voter flow through the HTTP API.
+
+Seeds an election with unverified voters, then runs every voter through the
+same requests the voting frontend makes, with `--concurrency` voters in flight:
+
+    POST /api/voters/login/request-otp
+    POST /api/voters/login/verify-otp
+    GET  /api/voting/election/{id}/candidates
+    POST /api/voting/election/{id}/vote
+
+The application runs in-process behind httpx's ASGI transport, against the
+configured PostgreSQL and Redis, with the SMS client replaced by a stub. For each
+step the report gives latency percentiles, errors and the number of SQL
+statements per request; overall it gives completed ballots per second and the
+time backends spent waiting on row locks (sampled from pg_stat_activity).
+SQLite cannot stand in for PostgreSQL here: the vote path relies on
+PostgreSQL-only SQL (ON CONFLICT, data-modifying CTEs, ANY(array)).
+
+When BUFFERED_VOTE_INGEST is enabled the vote buffer consumer runs during the
+test and is drained before the counters are checked. Exits with status 1 when
+the election total does not match the number of accepted ballots.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.load_test --voters 2000 --candidates 10 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import contextvars
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+import httpx
+import redis.asyncio as redis
+from sqlalchemy import event, text
+from sqlalchemy.future import select
+
+import main
+from benchmarks.common import seed_election, summarize, teardown
+from core.dependencies import SessionLocal, engine, get_twilio_client
+from core.settings import settings
+from models.election import Election
+from services.vote_buffer import BALLOT_STREAM, VoteBuffer, start_vote_buffer_consumer, stop_vote_buffer_consumer
+from services.vote_counter import VoteCounter
+
+STEPS = ("request_otp", "verify_otp", "candidates", "vote")
+
+# Step whose SQL statements are being counted
+current_step: contextvars.ContextVar[str | None] = contextvars.ContextVar("current_step", default=None)
+statements = Counter()
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    step = current_step.get()
+    if step is not None:
+        statements[step] += 1
+
+
+class StubMessages:
+    async def create_async(self, **kwargs):
+        return SimpleNamespace(status="queued", sid="load-test")
+
+
+async def stub_twilio_client():
+    yield SimpleNamespace(messages=StubMessages())
+
+
+async def sample_lock_waits(stop: asyncio.Event, interval: float) -> float:
+    """Backend-seconds spent waiting on heavyweight locks, sampled every `interval` seconds"""
+    waited = 0.0
+    async with engine.connect() as conn:
+        while not stop.is_set():
+            waiting = (await conn.execute(text(
+                "SELECT count(*) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+            ))).scalar_one()
+            waited += waiting * interval
+            await conn.rollback()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+    return waited
+
+
+async def main_async(args) -> int:
+    main.app.dependency_overrides[get_twilio_client] = stub_twilio_client
+    redis_connection = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    main.app.state.redis = redis_connection
+    if settings.BUFFERED_VOTE_INGEST:
+        start_vote_buffer_consumer(redis_connection)
+
+    seeded = await seed_election(
+        args.candidates, args.voters, args.votes_per_voter, verified=False, counter_shards=args.shards
+    )
+    election_id = seeded.election_id
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = defaultdict(list)
+    errors = Counter()
+    accepted = 0
+
+    async def timed(client: httpx.AsyncClient, step: str, method: str, url: str, **kwargs) -> httpx.Response:
+        token = current_step.set(step)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        finally:
+            latencies[step].append((time.perf_counter() - started) * 1000)
+            current_step.reset(token)
+        if response.status_code >= 400:
+            errors[step] += 1
+        return response
+
+    async def vote(client: httpx.AsyncClient, voter_id: str) -> None:
+        nonlocal accepted
+        voter = {"election_id": election_id, "voter_hashed_national_id": voter_id}
+        async with semaphore:
+            otp = await timed(client, "request_otp", "POST", "/api/voters/login/request-otp", params=voter)
+            if otp.status_code != 200:
+                return
+            verified = await timed(
+                client, "verify_otp", "POST", "/api/voters/login/verify-otp",
+                params={**voter, "code": otp.json()["otp_code"]}
+            )
+            if verified.status_code != 200:
+                return
+            await timed(client, "candidates", "GET", f"/api/voting/election/{election_id}/candidates")
+            ballot = await timed(
+                client, "vote", "POST", f"/api/voting/election/{election_id}/vote",
+                json={
+                    "voter_hashed_national_id": voter_id,
+                    "candidate_hashed_national_ids": rng.sample(seeded.candidate_ids, args.votes_per_voter),
+                }
+            )
+            if ballot.status_code == 200:
+                accepted += 1
+
+    stop_sampling = asyncio.Event()
+    sampler = asyncio.create_task(sample_lock_waits(stop_sampling, args.lock_sample_interval))
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(vote(client, voter_id) for voter_id in seeded.voter_ids))
+            elapsed = time.perf_counter() - started
+
+        stop_sampling.set()
+        lock_wait_seconds = await sampler
+
+        if settings.BUFFERED_VOTE_INGEST:
+            while await redis_connection.xlen(BALLOT_STREAM) > 0:
+                await asyncio.sleep(0.1)
+
+        async with SessionLocal() as db:
+            await VoteCounter.rollup(election_id, db)
+            total_vote_count = (await db.execute(
+                select(Election.total_vote_count).where(Election.id == election_id)
+            )).scalar_one()
+    finally:
+        stop_sampling.set()
+        await stop_vote_buffer_consumer()
+        await redis_connection.delete(*(VoteBuffer.dedupe_key(election_id, voter_id) for voter_id in seeded.voter_ids))
+        await teardown(seeded)
+        await redis_connection.close()
+
+    print(
+        f"voters={args.voters} candidates={args.candidates} votes/voter={args.votes_per_voter} "
+        f"concurrency={args.concurrency} shards={args.shards} buffered={settings.BUFFERED_VOTE_INGEST}"
+    )
+    print(f"{'step':>12} {'requests':>9} {'errors':>7} {'mean ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'sql/req':>8}")
+    for step in STEPS:
+        stats = summarize(latencies[step])
+        per_request = statements[step] / stats["n"] if stats["n"] else 0.0
+        print(
+            f"{step:>12} {stats['n']:>9} {errors[step]:>7} {stats['mean']:>9.2f} {stats['p50']:>8.2f} "
+            f"{stats['p99']:>8.2f} {stats['max']:>8.2f} {per_request:>8.2f}"
+        )
+    print(f"ballots accepted: {accepted} in {elapsed:.2f}s ({accepted / elapsed:.1f} ballots/s)")
+    print(f"lock wait (sampled): {lock_wait_seconds:.2f} backend-seconds")
+
+    if total_vote_count != accepted:
+        print(f"FAILED: election total is {total_vote_count}, expected {accepted}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the OTP + ballot flow through the HTTP API")
+    parser.add_argument("--voters", type=int, default=2000)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--votes-per-voter", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=1, help="counter_shards of the seeded election")
+    parser.add_argument("--lock-sample-interval", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
@@ -1,6 +1,7 @@
 from types import SimpleNamespace
 from typing import Annotated
 from fastapi import Depends, Header, HTTPException, Request, status
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.future import select
 
@@ -92,6 +93,15 @@ async def get_organization(user: user_dependency, db: db_dependency):
 organization_dependency = Annotated[User, Depends(get_organization)]
 
 
+# -------------------- Redis --------------------
+def get_redis(request: Request) -> Redis:
+    """Shared Redis connection opened in the application lifespan."""
+    return request.app.state.redis
+
+
+redis_dependency = Annotated[Redis, Depends(get_redis)]
+
+
 # -------------------- Request Helpers --------------------
 def get_client_ip(request: Request):
     """Extract client IP (supports X-Forwarded-For)."""
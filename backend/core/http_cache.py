@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+
+
+@dataclass(frozen=True)
+class PreparedPayload:
+    """A JSON response body rendered once, with its gzip encoding and ETag"""
+    body: bytes
+    gzip_body: bytes
+    etag: str
+
+    @classmethod
+    def from_content(cls, content) -> "PreparedPayload":
+        # Same rendering as FastAPI's JSONResponse
+        body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        return cls(
+            body=body,
+            gzip_body=gzip.compress(body, mtime=0),
+            etag=f'W/"{hashlib.sha256(body).hexdigest()[:32]}"',
+        )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() == "gzip":
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def not_modified(request: Request, etag: str, headers: dict) -> Response | None:
+    """A 304 response when the request's If-None-Match already names `etag`"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
+
+
+def prepared_response(request: Request, payload: PreparedPayload, cache_control: str = "no-cache") -> Response:
+    """
+    Serve a prepared payload: 304 when the client already has it, otherwise the
+    gzip or identity body depending on Accept-Encoding.
+    """
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    response = not_modified(request, payload.etag, headers)
+    if response is not None:
+        return response
+
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload.gzip_body, media_type="application/json", headers=headers)
+
+    return Response(content=payload.body, media_type="application/json", headers=headers)
@@ -5,6 +5,8 @@ from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.dependencies import get_db
 from services.election_status import ElectionStatusService
+from services.results_finalizer import results_finalizer
+from services.vote_counter import VoteCounter
 
 
 
@@ -35,6 +37,15 @@ class ElectionStatusScheduler:
                 name='Initial Election Status Update',
                 replace_existing=True
             )
+
+            # Fold sharded vote counter slots into the election counters
+            self.scheduler.add_job(
+                func=self._rollup_vote_counters,
+                trigger=IntervalTrigger(seconds=30),
+                id='rollup_vote_counters',
+                name='Rollup Vote Counters',
+                replace_existing=True
+            )
             
             self.scheduler.start()
             self.is_running = True
@@ -56,6 +67,11 @@ class ElectionStatusScheduler:
                     updated_count = await ElectionStatusService.update_election_statuses(db)
                     if updated_count > 0:
                         print(f"Background task updated {updated_count} election statuses")
+
+                    # Hand finished elections over to the results finalizer
+                    enqueued_count = await results_finalizer.enqueue_finished_elections(db)
+                    if enqueued_count > 0:
+                        print(f"Queued {enqueued_count} finished elections for results finalization")
                     break
                 except Exception as e:
                     print(f"Error in background election status update: {str(e)}")
@@ -63,6 +79,19 @@ class ElectionStatusScheduler:
         except Exception as e:
             print(f"Error in background election status update: {str(e)}")
     
+    async def _rollup_vote_counters(self):
+        """Background task to roll up sharded vote counters"""
+        try:
+            async for db in get_db():
+                try:
+                    await VoteCounter.rollup_sharded_elections(db)
+                    break
+                except Exception as e:
+                    print(f"Error in background vote counter rollup: {str(e)}")
+                    break
+        except Exception as e:
+            print(f"Error in background vote counter rollup: {str(e)}")
+    
     async def sync_all_statuses(self):
         """Manually sync all election statuses (useful for fixing inconsistencies)"""
         try:
@@ -31,6 +31,13 @@ class Settings(BaseSettings):
     # File upload limits
     MAX_DOCUMENT_SIZE: int = 5 * 1024 * 1024
     MAX_SPREADSHEET_SIZE: int = 2 * 1024 * 1024
+    # Voter roll CSVs are parsed and inserted this many rows at a time
+    VOTER_IMPORT_CHUNK_ROWS: int = 50000
+    # Background CSV election imports: concurrent imports, queued imports, and how
+    # long a job's progress stays readable after it was last updated
+    IMPORT_JOB_WORKERS: int = 1
+    IMPORT_JOB_QUEUE_SIZE: int = 20
+    IMPORT_JOB_TTL_SECONDS: int = 24 * 3600
 
     # Cloudinary Configuration
     CLOUDINARY_CLOUD_NAME: str
@@ -48,6 +55,49 @@ class Settings(BaseSettings):
     APP_HOST: str = "http://localhost"
     SERVER_DOMAIN: str = "http://localhost"
 
+    # Redis
+    REDIS_URL: str = "redis://redis"
+
+    # Buffered vote ingestion: ballots are deduplicated and queued in a Redis stream
+    # and written to PostgreSQL in batches by a background consumer
+    BUFFERED_VOTE_INGEST: bool = False
+    VOTE_BUFFER_BATCH_SIZE: int = 500
+    VOTE_BUFFER_BLOCK_MS: int = 1000
+    VOTE_BUFFER_DEDUPE_TTL_SECONDS: int = 7 * 24 * 3600
+    # Unacknowledged ballots are claimed and retried after this long, and this often
+    VOTE_BUFFER_RETRY_MS: int = 10000
+    # Deliveries after which a ballot that keeps failing is moved to the dead-letter stream
+    VOTE_BUFFER_MAX_DELIVERIES: int = 5
+
+    # Largest kiosk ballot upload accepted in one request
+    MAX_BATCH_BALLOTS: int = 20000
+
+    # How long a worker serves an election and its candidates from memory
+    ELECTION_CACHE_TTL_SECONDS: int = 30
+
+    # Kiosk ballot batches of an election are accepted until this long after it
+    # ends, so polling stations can upload what they collected offline
+    KIOSK_UPLOAD_WINDOW_SECONDS: int = 900
+
+    # Results of a closed election are not snapshotted until this long after its
+    # kiosk upload window closes, so ballots validated just before then have committed
+    RESULTS_SETTLE_SECONDS: int = 30
+
+    # Background finalization of finished elections: concurrent tallies and queued elections
+    RESULTS_FINALIZER_WORKERS: int = 2
+    RESULTS_FINALIZER_QUEUE_SIZE: int = 50
+    # Failed attempts after which an election is no longer finalized in the background
+    RESULTS_FINALIZER_MAX_ATTEMPTS: int = 5
+
+    # Browser and nginx cache lifetime of finished election results; a regenerated
+    # snapshot reaches clients at most this late
+    RESULTS_CACHE_MAX_AGE_SECONDS: int = 600
+
+    # Live tally stream: updates pushed to each watcher per second, and how often
+    # a watched tally is reloaded from the database
+    LIVE_TALLY_MAX_UPDATES_PER_SECOND: float = 2.0
+    LIVE_TALLY_RESYNC_SECONDS: int = 30
+
     # AI Configuration
     OPENAI_API_KEY: str | None = None
 
@@ -1,5 +1,17 @@
+import asyncio
 import enum
 import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import List, Sequence
+
+# Processes hashing large batches of national IDs; 1 hashes every batch in the calling thread
+HASH_POOL_WORKERS = min(8, os.cpu_count() or 1)
+
+# Smaller batches are hashed in the calling thread, where they cost less than a pool round trip
+HASH_POOL_MIN_BATCH = 20000
 
 
 class Country(enum.Enum):
@@ -222,3 +234,53 @@ def hash_national_id(national_id: str) -> str:
     
     # Standardized hashing: strip whitespace, encode as UTF-8, hash with SHA-256
     return hashlib.sha256(national_id.strip().encode('utf-8')).hexdigest()
+
+
+def _hash_stripped(national_ids: List[str]) -> List[str]:
+    sha256 = hashlib.sha256
+    return [sha256(national_id.encode('utf-8')).hexdigest() for national_id in national_ids]
+
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # Spawned rather than forked: the server process runs threads and an event loop
+        _hash_pool = ProcessPoolExecutor(HASH_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    """Stop the hashing processes, if any were started"""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+def hash_national_ids(national_ids: Sequence[str]) -> List[str]:
+    """
+    Hash many national IDs exactly like hash_national_id, in order.
+
+    SHA-256 of a short ID is dominated by per-call interpreter overhead, so
+    threads gain nothing; batches of HASH_POOL_MIN_BATCH IDs or more are split
+    across HASH_POOL_WORKERS processes instead. Blocks until done: call it from
+    a worker thread, or await hash_national_ids_async on the event loop.
+    """
+    stripped = [national_id.strip() if national_id else "" for national_id in national_ids]
+    if not all(stripped):
+        raise ValueError("National ID cannot be empty")
+
+    if HASH_POOL_WORKERS <= 1 or not stripped or len(stripped) < HASH_POOL_MIN_BATCH:
+        return _hash_stripped(stripped)
+
+    slice_size = -(-len(stripped) // HASH_POOL_WORKERS)
+    slices = [stripped[start:start + slice_size] for start in range(0, len(stripped), slice_size)]
+    return list(chain.from_iterable(_get_hash_pool().map(_hash_stripped, slices)))
+
+
+async def hash_national_ids_async(national_ids: Sequence[str]) -> List[str]:
+    """hash_national_ids off the event loop"""
+    return await asyncio.to_thread(hash_national_ids, national_ids)
@@ -30,22 +30,47 @@ from routers.results import router as results_router
 from routers.payment import router as payment_router
 from routers.ai_analytics import router as ai_analytics_router
 from core.scheduler import start_election_status_scheduler, stop_election_status_scheduler
+from core.settings import settings
+from core.shared import shutdown_hash_pool
+from services.import_jobs import start_import_jobs, stop_import_jobs
+from services.live_tally import start_live_tally_hub, stop_live_tally_hub
+from services.results_finalizer import start_results_finalizer, stop_results_finalizer
+from services.vote_buffer import start_vote_buffer_consumer, stop_vote_buffer_consumer
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis_connection = redis.from_url("redis://redis", encoding="utf-8", decode_responses=True)
+    redis_connection = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    app.state.redis = redis_connection
     await FastAPILimiter.init(redis_connection)
     print("Application startup...")
 
-    # Start the election status scheduler
+    # Start finalizing finished elections, then the scheduler that finds them
+    start_results_finalizer(redis_connection)
     start_election_status_scheduler()
 
+    # Start writing buffered ballots to the database
+    if settings.BUFFERED_VOTE_INGEST:
+        start_vote_buffer_consumer(redis_connection)
+
+    # Follow counted ballots for live tally watchers
+    start_live_tally_hub(redis_connection)
+
+    # Run queued CSV election imports
+    start_import_jobs(redis_connection)
+
     try:
         yield
     finally:
         # Stop the election status scheduler
         stop_election_status_scheduler()
+        await stop_results_finalizer()
+
+        # Stop the buffered ballot writer before closing its connection
+        await stop_vote_buffer_consumer()
+        await stop_live_tally_hub()
+        await stop_import_jobs()
+        shutdown_hash_pool()
 
         await redis_connection.close()
         print("Application shutdown.")
@@ -11,6 +11,10 @@ from .voting_process import VotingProcess
 from .dummy_candidate import DummyCandidate
 from .dummy_voter import DummyVoter
 from .transaction import Transaction
+from .vote_counter_shard import VoteCounterShard
+from .election_result_snapshot import ElectionResultSnapshot
+from .turnout_bucket import TurnoutBucket
+from .ranked_ballot import RankedBallot
 
 __all__ = [
     "Candidate",
@@ -26,4 +30,8 @@ __all__ = [
     "DummyCandidate",
     "DummyVoter",
     "Transaction",
+    "VoteCounterShard",
+    "ElectionResultSnapshot",
+    "TurnoutBucket",
+    "RankedBallot",
 ]
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, Numeric, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.base import Base
@@ -28,6 +28,21 @@ class Election(Base):
     number_of_candidates: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     num_of_votes_per_voter: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     potential_number_of_voters: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Number of counter slots per candidate; 1 counts straight into candidate_participations
+    counter_shards: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
+    # How winners are determined: plurality, approval, borda, irv or stv
+    tabulation_method: Mapped[str] = mapped_column(String(20), nullable=False, default="plurality", server_default="plurality")
+
+    # Number of winners; used by STV and by plurality/approval with more than one seat
+    seats: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
+    # Whether organization dashboards may follow per-candidate counts while voting is open
+    live_results: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default="false")
+
+    # Sum of every recorded ballot receipt modulo 2^256, kept up to date with total_vote_count
+    receipt_accumulator: Mapped[int] = mapped_column(Numeric(78, 0), nullable=False, default=0, server_default="0")
     
     # New fields for election creation method
     method: Mapped[str] = mapped_column(String(50), nullable=False, default="api")  # 'api' or 'csv'
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, ForeignKey, Integer, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.base import Base
+
+
+class ElectionResultSnapshot(Base):
+    __tablename__ = "election_result_snapshots"
+
+    # Foreign Keys
+    election_id: Mapped[int] = mapped_column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+
+    # Response body of /results/election/{id} as computed when the snapshot was taken
+    results: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+
+    # Per-governorate and per-district results, keyed by region level
+    regional_results: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True)
+
+    generated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
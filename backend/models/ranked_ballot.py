@@ -0,0 +1,29 @@
+import uuid
+
+from sqlalchemy import ForeignKey, Integer, String, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.base import Base
+
+
+class RankedBallot(Base):
+    """
+    A ballot's candidate preferences, kept for elections tabulated from whole
+    ballots (Borda, IRV, STV). There is no column pointing at the voter, but a
+    ranking is written in the same transaction as its voting process, so anyone
+    who can read system columns (xmin) or the physical row order can match a
+    ballot cast on its own to its voter. Batches (kiosk uploads, the vote buffer)
+    store their rankings shuffled, which only narrows a ranking down to its batch.
+    """
+
+    __tablename__ = "ranked_ballots"
+
+    # Foreign Keys
+    election_id: Mapped[int] = mapped_column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+
+    ballot_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
+
+    # Ids of the ranked candidates, most preferred first. Ids rather than positions
+    # in the candidate list, which shifts when a candidate is removed after voting
+    rankings: Mapped[list[str]] = mapped_column(ARRAY(String(200)), nullable=False)
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.base import Base
+
+
+class TurnoutBucket(Base):
+    __tablename__ = "turnout_buckets"
+
+    # Foreign Keys
+    election_id: Mapped[int] = mapped_column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+
+    # Minute the ballots were cast in
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+    # Governorate of the voters; the empty string holds voters without one
+    governorate: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    # Counter slot, so concurrent ballots of sharded elections don't all update one row
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+
+    ballots: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,22 @@
+from sqlalchemy import ForeignKey, Integer, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.base import Base
+
+
+class VoteCounterShard(Base):
+    __tablename__ = "vote_counter_shards"
+
+    # Votes counted in this slot since the last rollup into candidate_participations/elections
+    vote_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Receipts of the ballots counted in this slot, summed modulo 2^256 (election-total slots only)
+    receipt_accumulator: Mapped[int] = mapped_column(Numeric(78, 0), nullable=False, default=0)
+
+    # Foreign Keys
+    election_id: Mapped[int] = mapped_column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+
+    # Candidate the slot counts for; the empty string holds the election's total ballots
+    candidate_hashed_national_id: Mapped[str] = mapped_column(String(200), primary_key=True)
+
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -12,6 +13,9 @@ if TYPE_CHECKING:
 
 class Voter(Base):
     __tablename__ = "voters"
+    __table_args__ = (
+        Index("ix_voters_eligible_candidate_ids", "eligible_candidate_ids", postgresql_using="gin"),
+    )
 
     voter_hashed_national_id: Mapped[str] = mapped_column(String(200), primary_key=True)
 
@@ -26,7 +30,8 @@ class Voter(Base):
     last_verified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # New fields for API-based elections
-    eligible_candidates: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON string of eligible candidate IDs
+    # Candidates an API voter may vote for; NULL means every candidate of the election
+    eligible_candidate_ids: Mapped[list[str] | None] = mapped_column(ARRAY(String(200)), nullable=True)
     is_api_voter: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
 
     # Foreign Keys
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.base import Base
@@ -12,11 +12,17 @@ if TYPE_CHECKING:
 
 class VotingProcess(Base):
     __tablename__ = "voting_processes"
+    __table_args__ = (
+        Index("ix_voting_processes_election_receipt", "election_id", "receipt_hash"),
+    )
 
     voter_hashed_national_id: Mapped[str] = mapped_column(String(200), primary_key=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
+    # SHA-256 (hex) ballot receipt handed to the voter, folded into the election's receipt accumulator
+    receipt_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
     # Foreign Keys
     election_id: Mapped[int] = mapped_column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
 
@@ -17,6 +17,7 @@ from models.user import UserRole
 from models.election import Election
 from models.candidate import Candidate
 from models.candidate_participation import CandidateParticipation
+from services.election_cache import election_cache
 
 
 router = APIRouter(prefix="/approvals", tags=["Approvals"])
@@ -85,6 +86,9 @@ async def decide_approval(
     approval.decided_at = datetime.now(timezone.utc)
     approval.decided_by_user_id = current_user.id
 
+    # Elections whose candidates change when the approval is applied
+    election_ids = []
+
     # Apply staged actions on approval
     if decision.approve and approval.payload:
         payload = json.loads(approval.payload)
@@ -150,4 +154,5 @@ async def decide_approval(
                 )
 
     await db.commit()
+    election_cache.invalidate(*election_ids)
     return
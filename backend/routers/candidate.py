@@ -16,6 +16,7 @@ from core.shared import Country
 from models import Candidate
 from models.organization import Organization
 from schemas.candidate import CandidateRead, CandidateCreate, CandidateUpdate, CandidateCreateResponse
+from services.election_cache import election_cache
 from services.image import ImageService
 from services.notification import NotificationService
 from schemas.notification import CandidateNotificationData
@@ -385,6 +386,7 @@ async def create_candidate(
         try:
             await db.commit()
             await db.refresh(new_candidate)
+            election_cache.invalidate(*unique_ids)
             
             # Create notification for candidate creation
             try:
@@ -559,6 +561,7 @@ async def update_candidate(
 
     await db.commit()
     await db.refresh(candidate)
+    election_cache.invalidate_candidate(hashed_national_id)
 
     # Create notification for candidate update
     if changes_made:
@@ -725,6 +728,7 @@ async def update_candidate_with_files(
 
     await db.commit()
     await db.refresh(candidate)
+    election_cache.invalidate_candidate(hashed_national_id)
 
     # Create notification for candidate update (including file uploads)
     if changes_made or photo or symbol_icon:
@@ -840,6 +844,7 @@ async def set_candidate_participations(
 
     await db.commit()
     await db.refresh(candidate)
+    election_cache.invalidate(*(to_add | to_remove))
     
     # Return data using extracted values to avoid MissingGreenlet errors
     candidate_data = {
@@ -915,6 +920,7 @@ async def delete_candidate(
     # Now delete the candidate
     await db.delete(candidate)
     await db.commit()
+    election_cache.invalidate_candidate(hashed_national_id)
 
     # Create notification for candidate deletion
     try:
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, File, HTTPException, UploadFile, Form, Depends, Query, status
 import json
+import os
+import shutil
 from sqlalchemy.future import select
 from sqlalchemy import and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -17,6 +19,10 @@ from models.election import Election
 from models.voter import Voter
 from schemas.election import ElectionCreate, ElectionOut, ElectionUpdate, ElectionListResponse, ElectionStatus
 from services.csv_handler import CSVHandler
+from services.bulk_loader import BulkLoader
+from services.import_jobs import ElectionImport, ImportJobRunner, import_job_runner, new_import_dir
+from services.voter_import import VoterImportService
+from services.election_cache import election_cache
 from services.notification import NotificationService
 from schemas.notification import ElectionNotificationData
 from sqlalchemy import func
@@ -282,6 +288,10 @@ async def create_election(election_data: ElectionCreate, db: db_dependency, curr
             potential_number_of_voters=election_data.potential_number_of_voters,
             method=method_value,
             api_endpoint=election_data.api_endpoint,
+            counter_shards=election_data.counter_shards,
+            live_results=election_data.live_results,
+            tabulation_method=election_data.tabulation_method.value,
+            seats=election_data.seats,
             status="upcoming",
         )
 
@@ -449,6 +459,14 @@ async def update_election(
     ):
         raise HTTPException(status_code=400, detail="End date must be after start date")
 
+    tabulation_method = election_data.tabulation_method or election.tabulation_method
+    seats = election_data.seats or election.seats
+    if tabulation_method == "irv" and seats != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Instant runoff elections fill exactly one seat; use stv for more"
+        )
+
     # Check if election type is changing and validate CSV compatibility
     if election_data.types and election_data.types != election.types and election.method == "csv":
         await _validate_type_change_compatibility(db, election, election_data.types)
@@ -462,6 +480,7 @@ async def update_election(
 
     await db.commit()
     await db.refresh(election)
+    election_cache.invalidate(election_id)
 
     # Create notification for election update
     if changes_made:
@@ -628,6 +647,7 @@ async def delete_election(election_id: int, db: db_dependency, current_user: org
         # Commit all deletions first
         print("Committing all deletions...")
         await db.commit()
+        election_cache.invalidate(election_id)
         print("Successfully committed all deletions")
 
         print("Step 6: Creating deletion notification")
@@ -762,11 +782,10 @@ async def replace_election_csv_data(
 
         # Process CSV files using CSV handler (which handles hashing)
         candidates_data = await CSVHandler.process_candidates_csv(candidates_file)
-        voters_data = await CSVHandler.process_voters_csv(voters_file)
 
-        # Create new candidates and voters from processed data
+        # Create new candidates from processed data; voters are streamed from their file
         candidates_count = await _create_candidates_from_processed_data(db, election_id, organization_id, candidates_data)
-        voters_count = await _create_voters_from_processed_data(db, election_id, voters_data)
+        voters_count = await VoterImportService.import_voters_csv(voters_file, election_id, db)
 
         # Sync election counts with actual data
         await _sync_election_candidate_count(election, db)
@@ -774,6 +793,7 @@ async def replace_election_csv_data(
 
         await db.commit()
         await db.refresh(election)
+        election_cache.invalidate(election_id)
 
         # TODO: Create notification for election update (temporarily disabled due to async issues)
         # try:
@@ -826,6 +846,7 @@ async def upload_candidates_csv(
     await _sync_election_candidate_count(election, db)
 
     await db.commit()
+    election_cache.invalidate(election_id)
     return {"message": f"Successfully added {len(candidates_data)} candidates"}
 
 
@@ -846,17 +867,18 @@ async def upload_voters_csv(
     if election.organization_id != organization_id:
         raise HTTPException(status_code=403, detail="Not authorized to modify this election")
 
-    # Process CSV file
-    voters_data = await CSVHandler.process_voters_csv(file)
-
-    # Create voters
-    await _create_voters_from_data(voters_data, election_id, db)
+    # Stream the CSV file into the voter roll
+    try:
+        voters_count = await VoterImportService.import_voters_csv(file, election_id, db)
+    except HTTPException:
+        await db.rollback()
+        raise
 
     # Update voter count
-    election.potential_number_of_voters += len(voters_data)
+    election.potential_number_of_voters += voters_count
 
     await db.commit()
-    return {"message": f"Successfully added {len(voters_data)} voters"}
+    return {"message": f"Successfully added {voters_count} voters"}
 
 
 @router.get("/templates/candidates-csv")
@@ -942,14 +964,10 @@ async def create_election_with_csv(
         candidates_data = await CSVHandler.process_candidates_csv(candidates_file)
         print(f"DEBUG: Candidates CSV processed, got {len(candidates_data)} candidates")
         
-        print("DEBUG: Processing voters CSV...")
-        voters_data = await CSVHandler.process_voters_csv(voters_file)
-        print(f"DEBUG: Voters CSV processed, got {len(voters_data)} voters")
-
-        # Create candidates and voters from processed data
+        # Create candidates from processed data, then stream the voters file into the roll
         print("DEBUG: Creating candidates and voters...")
         candidates_count = await _create_candidates_from_processed_data(db, new_election.id, organization_id, candidates_data)
-        voters_count = await _create_voters_from_processed_data(db, new_election.id, voters_data)
+        voters_count = await VoterImportService.import_voters_csv(voters_file, new_election.id, db)
         
         print(f"DEBUG: Created {candidates_count} candidates and {voters_count} voters")
 
@@ -1129,110 +1147,85 @@ async def _create_candidates_from_processed_data(db, election_id, organization_i
 
     Returns the number of participations created for this election (used as election.number_of_candidates).
     """
-    from models.candidate_participation import CandidateParticipation
+    loaded = await BulkLoader.load_candidates(election_id, organization_id, candidates_data, db)
+    return loaded.inserted
 
-    print(f"DEBUG: _create_candidates_from_processed_data called with {len(candidates_data)} candidates")
-    print(f"DEBUG: election_id={election_id}, organization_id={organization_id}")
 
-    participations_created = 0
+@router.post("/create-with-csv/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_election_with_csv_job(
+    current_user: organization_dependency,
+    title: str = Form(...),
+    types: str = Form(...),
+    starts_at: str = Form(...),
+    ends_at: str = Form(...),
+    potential_number_of_voters: int = Form(...),
+    candidates_file: UploadFile = File(...),
+    voters_file: UploadFile = File(...),
+    num_of_votes_per_voter: int = Form(1),
+):
+    """
+    Create an election with CSV files for candidates and voters in the background.
+    Returns a job id right away; the election is created when the job completes,
+    see GET /election/import-jobs/{job_id}.
+    """
+    # Parse dates
+    try:
+        starts_at_dt = datetime.fromisoformat(starts_at.replace("Z", "+00:00"))
+        ends_at_dt = datetime.fromisoformat(ends_at.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
 
-    for idx, candidate_info in enumerate(candidates_data):
-        try:
-            print(f"DEBUG: Processing candidate {idx + 1}: {candidate_info.get('name', 'Unknown')}")
-            
-            hashed_id = candidate_info["hashed_national_id"]
-
-            # Check if candidate exists
-            existing = await db.execute(select(Candidate).where(Candidate.hashed_national_id == hashed_id))
-            candidate = existing.scalar_one_or_none()
-
-            if not candidate:
-                print(f"DEBUG: Creating new candidate: {candidate_info.get('name', 'Unknown')}")
-                candidate = Candidate(
-                    hashed_national_id=hashed_id,
-                    name=candidate_info["name"],
-                    district=candidate_info.get("district"),
-                    governorate=candidate_info.get("governorate"),
-                    country=candidate_info["country"],
-                    party=candidate_info.get("party"),
-                    symbol_name=candidate_info.get("symbol_name"),
-                    birth_date=candidate_info["birth_date"],
-                    description=candidate_info.get("description"),
-                    organization_id=organization_id,
-                )
-                db.add(candidate)
-                print(f"DEBUG: New candidate added to session")
-            else:
-                print(f"DEBUG: Using existing candidate: {candidate.name}")
-
-            # Create participation if not exists
-            existing_p = await db.execute(
-                select(CandidateParticipation).where(
-                    CandidateParticipation.candidate_hashed_national_id == candidate.hashed_national_id,
-                    CandidateParticipation.election_id == election_id,
-                )
-            )
-            if existing_p.scalar_one_or_none() is None:
-                print(f"DEBUG: Creating participation for candidate: {candidate.name}")
-                db.add(
-                    CandidateParticipation(
-                        candidate_hashed_national_id=candidate.hashed_national_id,
-                        election_id=election_id,
-                    )
-                )
-                participations_created += 1
-                print(f"DEBUG: Participation created, total: {participations_created}")
-            else:
-                print(f"DEBUG: Participation already exists for candidate: {candidate.name}")
+    if ends_at_dt <= starts_at_dt:
+        raise HTTPException(status_code=400, detail="End date must be after start date")
 
-        except Exception as e:
-            print(f"DEBUG: Error processing candidate {idx + 1}: {str(e)}")
-            raise ValueError(f"Error processing candidate row {idx + 1}: {str(e)}")
+    # Validate file types
+    if not candidates_file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Candidates file must be a CSV")
+    if not voters_file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Voters file must be a CSV")
 
-    print(f"DEBUG: _create_candidates_from_processed_data completed, created {participations_created} participations")
-    return participations_created
+    organization_id = getattr(current_user, 'organization_id', current_user.id)
 
+    # Spool both uploads to disk; the request's temporary files go away with it
+    job_id, job_dir = new_import_dir()
+    try:
+        candidates_path = os.path.join(job_dir, "candidates.csv")
+        voters_path = os.path.join(job_dir, "voters.csv")
+        await ImportJobRunner.spool_upload(candidates_file, candidates_path)
+        await ImportJobRunner.spool_upload(voters_file, voters_path)
 
-async def _create_voters_from_processed_data(db, election_id, voters_data):
-    """Create voters from processed data"""
+        progress = await import_job_runner.submit(ElectionImport(
+            job_id=job_id,
+            organization_id=organization_id,
+            title=title,
+            types=types,
+            starts_at=starts_at_dt,
+            ends_at=ends_at_dt,
+            num_of_votes_per_voter=num_of_votes_per_voter,
+            potential_number_of_voters=potential_number_of_voters,
+            candidates_file=candidates_path,
+            voters_file=voters_path,
+            candidates_file_name=candidates_file.filename,
+            voters_file_name=voters_file.filename,
+        ))
+    except Exception:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
 
-    print(f"DEBUG: _create_voters_from_processed_data called with {len(voters_data)} voters")
-    print(f"DEBUG: election_id={election_id}")
+    return {"job_id": progress.job_id, "status": progress.status}
 
-    voters_count = 0
-    for idx, voter_info in enumerate(voters_data):
-        try:
-            print(f"DEBUG: Processing voter {idx + 1}")
-            
-            voter_hashed_id = voter_info["voter_hashed_national_id"]
-            governorate_value = voter_info.get("governorate")
 
-            # Check if voter exists
-            existing = await db.execute(
-                select(Voter).where(
-                    Voter.voter_hashed_national_id == voter_hashed_id, Voter.election_id == election_id
-                )
-            )
-            if existing.scalar_one_or_none() is None:
-                print(f"DEBUG: Creating new voter: {voter_hashed_id[:8]}...")
-                voter = Voter(
-                    voter_hashed_national_id=voter_hashed_id,
-                    phone_number=voter_info["phone_number"],
-                    governerate=governorate_value,
-                    election_id=election_id,
-                )
-                db.add(voter)
-                voters_count += 1
-                print(f"DEBUG: New voter added, total: {voters_count}")
-            else:
-                print(f"DEBUG: Voter already exists: {voter_hashed_id[:8]}...")
-
-        except Exception as e:
-            print(f"DEBUG: Error processing voter {idx + 1}: {str(e)}")
-            raise ValueError(f"Error processing voter row {idx + 1}: {str(e)}")
-
-    print(f"DEBUG: _create_voters_from_processed_data completed, created {voters_count} voters")
-    return voters_count
+@router.get("/import-jobs/{job_id}")
+async def get_import_job(job_id: str, current_user: organization_dependency):
+    """
+    Progress of a background CSV election import: status, rows processed and
+    rejected, estimated seconds left and, once completed, the election id.
+    """
+    organization_id = getattr(current_user, 'organization_id', current_user.id)
+    progress = await import_job_runner.get_progress(job_id)
+    if progress is None or progress["organization_id"] != organization_id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return progress
 
 
 @router.post("/sync-statuses", status_code=status.HTTP_200_OK)
@@ -1,22 +1,63 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from typing import Any, Awaitable, Callable
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.future import select
-from core.dependencies import db_dependency
-from services.election_results import ElectionResultsService
+from core.dependencies import admin_dependency, db_dependency, organization_dependency, redis_dependency
+from core.http_cache import not_modified
+from core.settings import settings
+from services.ballot_integrity import BallotIntegrityService
+from services.election_cache import election_cache
+from services.election_results import ElectionResultsService, RankingMethod, RegionLevel
+from services.live_tally import live_tally_hub
+from services.results_export import ExportDataset, ExportFormat, ResultsExportService
+from services.turnout import TurnoutService
 from models.election import Election
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/results", tags=["election_results"])
 
 
+async def _snapshot_response(
+    request: Request, election_id: int, db, variant: str, load: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    Serve a view of the election's results snapshot with a strong ETag and a
+    long Cache-Control. A client or proxy holding the current snapshot gets a
+    304 before anything beyond the snapshot's timestamp is read.
+    """
+    headers = {"Cache-Control": f"public, max-age={settings.RESULTS_CACHE_MAX_AGE_SECONDS}"}
+    snapshot_etag = await ElectionResultsService.get_snapshot_etag(election_id, db)
+    if snapshot_etag is not None:
+        headers["ETag"] = f'"{snapshot_etag}-{variant}"'
+        response = not_modified(request, headers["ETag"], headers)
+        if response is not None:
+            return response
+
+    content = jsonable_encoder(await load())
+
+    if snapshot_etag is None:
+        # Loading built the snapshot
+        snapshot_etag = await ElectionResultsService.get_snapshot_etag(election_id, db)
+        if snapshot_etag is None:
+            return JSONResponse(content=content, headers={"Cache-Control": "no-cache"})
+        headers["ETag"] = f'"{snapshot_etag}-{variant}"'
+    return JSONResponse(content=content, headers=headers)
+
+
 @router.get("/election/{election_id}")
-async def get_election_results(election_id: int, db: db_dependency):
+async def get_election_results(election_id: int, request: Request, db: db_dependency, redis: redis_dependency):
     """
     Get comprehensive election results for a finished election.
     Only accessible after the election has ended.
     """
     try:
-        results = await ElectionResultsService.get_election_results(election_id, db)
-        return results
+        return await _snapshot_response(
+            request, election_id, db, "results",
+            lambda: ElectionResultsService.get_election_results(
+                election_id, db, redis if settings.BUFFERED_VOTE_INGEST else None
+            )
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -29,8 +70,69 @@ async def get_election_results(election_id: int, db: db_dependency):
         )
 
 
+@router.get("/election/{election_id}/regions")
+async def get_regional_election_results(
+    election_id: int, request: Request, db: db_dependency, redis: redis_dependency, level: RegionLevel = "governorate"
+):
+    """
+    Get the results of a finished election per governorate or per district of
+    the candidates: tallies, ranks, winners and, for governorates, turnout.
+
+    Each region's `winner_basis` says how its winners were picked: "votes" is
+    the highest vote count; "first_preferences" (Borda, IRV and STV elections)
+    means `vote_count` holds first preferences and the winners are only the
+    region's first preference leaders, not the outcome of the election's
+    tabulation method or its seats.
+    """
+    try:
+        return await _snapshot_response(
+            request, election_id, db, f"regions-{level}",
+            lambda: ElectionResultsService.get_regional_results(
+                election_id, level, db, redis if settings.BUFFERED_VOTE_INGEST else None
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve regional election results: {str(e)}"
+        )
+
+
+async def _load_election_summary(election_id: int, db, redis) -> dict:
+    summary = await ElectionResultsService.get_election_summary(election_id, db)
+    if summary is not None:
+        return summary
+
+    # No snapshot yet: check if election exists and has finished before taking one
+    election_result = await db.execute(
+        select(Election.ends_at).where(Election.id == election_id)
+    )
+    ends_at = election_result.scalar_one_or_none()
+
+    if ends_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Election not found"
+        )
+
+    now = datetime.now(timezone.utc)
+    if now <= ends_at:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Election has not finished yet"
+        )
+
+    await ElectionResultsService.build_results_snapshot(election_id, db, redis)
+    return await ElectionResultsService.get_election_summary(election_id, db)
+
+
 @router.get("/election/{election_id}/summary")
-async def get_election_summary(election_id: int, db: db_dependency):
+async def get_election_summary(election_id: int, request: Request, db: db_dependency, redis: redis_dependency):
     """
     Get a brief summary of election results including:
     - Winner(s)
@@ -38,50 +140,17 @@ async def get_election_summary(election_id: int, db: db_dependency):
     - Voter turnout
     """
     try:
-        # Check if election exists and has finished
-        election_result = await db.execute(
-            select(Election).where(Election.id == election_id)
+        return await _snapshot_response(
+            request, election_id, db, "summary",
+            lambda: _load_election_summary(election_id, db, redis if settings.BUFFERED_VOTE_INGEST else None)
         )
-        election = election_result.scalar_one_or_none()
-        
-        if not election:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Election not found"
-            )
-        
-        now = datetime.now(timezone.utc)
-        if now <= election.ends_at:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Election has not finished yet"
-            )
-        
-        # Get basic results for summary
-        results = await ElectionResultsService.get_election_results(election_id, db)
-        
-        # Return only summary information
-        summary = {
-            "election_id": election_id,
-            "election_title": results["election_info"]["title"],
-            "winners": [
-                {
-                    "name": winner["name"],
-                    "party": winner["party"],
-                    "vote_count": winner["vote_count"],
-                    "vote_percentage": winner["vote_percentage"]
-                }
-                for winner in results["results"]["winners"]
-            ],
-            "total_votes_cast": results["results"]["statistics"]["total_votes_cast"],
-            "voter_turnout_percentage": results["results"]["statistics"]["voter_turnout_percentage"],
-            "number_of_candidates": results["results"]["statistics"]["number_of_candidates"]
-        }
-        
-        return summary
-        
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -90,10 +159,13 @@ async def get_election_summary(election_id: int, db: db_dependency):
 
 
 @router.post("/election/{election_id}/finalize")
-async def finalize_election_results(election_id: int, db: db_dependency):
+async def finalize_election_results(
+    election_id: int, db: db_dependency, redis: redis_dependency, ranking: RankingMethod = "standard"
+):
     """
     Finalize election results by updating candidate rankings and winner status.
     This endpoint can be called manually or automatically when an election ends.
+    `ranking` selects how tied candidates are ranked ("standard" or "dense").
     """
     try:
         # Check if election exists and has finished
@@ -115,8 +187,15 @@ async def finalize_election_results(election_id: int, db: db_dependency):
                 detail="Election has not finished yet"
             )
         
+        # Rank only once every ballot has been counted
+        vote_buffer = redis if settings.BUFFERED_VOTE_INGEST else None
+        await ElectionResultsService.ensure_counting_complete(election_id, db, vote_buffer)
+
         # Update candidate rankings and winner status
-        updated_count = await ElectionResultsService.update_candidate_rankings(election_id, db)
+        updated_count = await ElectionResultsService.update_candidate_rankings(election_id, db, ranking)
+
+        # Results are served from the snapshot from now on
+        await ElectionResultsService.build_results_snapshot(election_id, db, vote_buffer)
         
         return {
             "message": "Election results finalized successfully",
@@ -126,8 +205,163 @@ async def finalize_election_results(election_id: int, db: db_dependency):
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to finalize election results: {str(e)}"
         )
+
+
+@router.post("/election/{election_id}/snapshot/regenerate")
+async def regenerate_results_snapshot(
+    election_id: int, db: db_dependency, redis: redis_dependency, _: admin_dependency
+):
+    """Admin-only: recompute a finished election's results snapshot from the vote counters."""
+    try:
+        results = await ElectionResultsService.build_results_snapshot(
+            election_id, db, redis if settings.BUFFERED_VOTE_INGEST else None
+        )
+        return {
+            "message": "Results snapshot regenerated successfully",
+            "election_id": election_id,
+            "total_votes_cast": results["results"]["statistics"]["total_votes_cast"]
+        }
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to regenerate results snapshot: {str(e)}"
+        )
+
+
+@router.get("/election/{election_id}/integrity")
+async def verify_election_integrity(election_id: int, db: db_dependency, current_user: organization_dependency):
+    """
+    Re-check the election's ballot receipts against its receipt accumulator and
+    vote total, for the organization running it. Streams over every recorded
+    ballot, so it is meant for audits rather than frequent polling.
+    """
+    organization_id = getattr(current_user, 'organization_id', current_user.id)
+    election = await election_cache.get(election_id, db)
+    if not election or election.organization_id != organization_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
+
+    try:
+        return await BallotIntegrityService.verify_election(election_id, db)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to verify election integrity: {str(e)}"
+        )
+
+
+@router.get("/election/{election_id}/live")
+async def stream_live_tally(election_id: int, db: db_dependency, current_user: organization_dependency):
+    """
+    Server-Sent Events stream of an election's turnout as ballots are counted,
+    for the organization running it. Per-candidate counts are included only
+    when the election has `live_results` enabled.
+    """
+    organization_id = getattr(current_user, 'organization_id', current_user.id)
+    election = await election_cache.get(election_id, db)
+    if not election or election.organization_id != organization_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
+
+    return StreamingResponse(
+        live_tally_hub.watch(election_id, election.live_results),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/election/{election_id}/turnout")
+async def get_election_turnout(
+    election_id: int,
+    db: db_dependency,
+    current_user: organization_dependency,
+    interval_minutes: int = Query(1, ge=1, le=1440),
+    by_governorate: bool = False,
+):
+    """
+    Turnout series of an election for the organization running it: ballots
+    cast per interval, optionally split by voter governorate. Read from the
+    pre-aggregated per-minute buckets, so it is cheap while voting is open.
+    """
+    organization_id = getattr(current_user, 'organization_id', current_user.id)
+    election = await election_cache.get(election_id, db)
+    if not election or election.organization_id != organization_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
+
+    try:
+        return await TurnoutService.get_turnout_series(election_id, db, interval_minutes, by_governorate)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve election turnout: {str(e)}"
+        )
+
+
+@router.get("/election/{election_id}/export")
+async def export_election_results(
+    election_id: int,
+    db: db_dependency,
+    redis: redis_dependency,
+    current_user: organization_dependency,
+    dataset: ExportDataset = "candidates",
+    format: ExportFormat = "csv",
+):
+    """
+    Download a finished election's candidate results, regional results or
+    anonymized ballot cast times as CSV or Parquet. The file is streamed
+    while it is being produced.
+    """
+    organization_id = getattr(current_user, 'organization_id', current_user.id)
+    election = await election_cache.get(election_id, db)
+    if not election or election.organization_id != organization_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
+
+    if datetime.now(timezone.utc) <= election.ends_at:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Election has not finished yet")
+
+    if dataset == "ballots":
+        batches = ResultsExportService.ballot_batches(election_id)
+    else:
+        try:
+            rows = await ResultsExportService.snapshot_rows(
+                election_id, dataset, db, redis if settings.BUFFERED_VOTE_INGEST else None
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        batches = ResultsExportService.batches_of(rows)
+
+    if format == "parquet":
+        body = ResultsExportService.encode_parquet(ResultsExportService.parquet_schema(dataset), batches)
+        media_type = "application/vnd.apache.parquet"
+    else:
+        body = ResultsExportService.encode_csv(dataset, batches)
+        media_type = "text/csv"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="election-{election_id}-{dataset}.{format}"'}
+    )
@@ -1,182 +1,176 @@
+import json
+from collections import Counter
 from datetime import datetime, timezone
 from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, status, Depends
+from pydantic import ValidationError
 from sqlalchemy.future import select
 from sqlalchemy import and_, func
 
-from core.dependencies import db_dependency
+from core.dependencies import db_dependency, organization_dependency, redis_dependency
+from core.http_cache import prepared_response
+from core.settings import settings
 from models.voting_process import VotingProcess
-from models.candidate_participation import CandidateParticipation
-from models.candidate import Candidate
 from models.election import Election
-from models.voter import Voter
-from schemas.voting import VoteRequest, VoteResponse, CandidateVoteInfo
+from schemas.voting import BallotResult, BatchVoteResponse, KioskBallot, VoteRequest, VoteResponse
+from services.ballot_integrity import BallotIntegrityService
+from services.election_cache import election_cache
+from services.live_tally import publish_tally_delta
+from services.vote_buffer import VoteBuffer
+from services.voting import VotingService
 
 router = APIRouter(prefix="/voting", tags=["voting"])
 
 
 @router.get("/election/{election_id}/candidates", response_model=dict)
-async def get_election_candidates(election_id: int, db: db_dependency):
-    """Get all candidates for an election that voters can vote for"""
+async def get_election_candidates(election_id: int, request: Request, db: db_dependency):
+    """
+    Get all candidates for an election that voters can vote for.
+
+    The response is rendered once per cached election and served as-is (gzip when
+    accepted), with an ETag so a voter reopening the ballot gets a 304.
+    """
     
-    # Check if election exists and is currently running
-    election_result = await db.execute(
-        select(Election).where(Election.id == election_id)
-    )
-    election = election_result.scalar_one_or_none()
+    election = await election_cache.get(election_id, db)
     
     if not election:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
     
     now = datetime.now(timezone.utc)
-    if now < election.starts_at or now > election.ends_at:
+    if not election.is_running(now):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Election is not currently running")
     
-    # Get candidates participating in this election (without vote counts for privacy)
-    candidates_result = await db.execute(
-        select(Candidate)
-        .join(CandidateParticipation, CandidateParticipation.candidate_hashed_national_id == Candidate.hashed_national_id)
-        .where(CandidateParticipation.election_id == election_id)
-        .order_by(Candidate.name)
-    )
-    
-    candidates = candidates_result.scalars().all()
-    
-    return {
-        "election_info": {
-            "id": election.id,
-            "title": election.title,
-            "num_of_votes_per_voter": election.num_of_votes_per_voter
-        },
-        "candidates": [
-            CandidateVoteInfo(
-                hashed_national_id=candidate.hashed_national_id,
-                name=candidate.name,
-                party=candidate.party,
-                symbol_name=candidate.symbol_name,
-                symbol_icon_url=candidate.symbol_icon_url,
-                photo_url=candidate.photo_url
-            )
-            for candidate in candidates
-        ]
-    }
+    # Candidates participating in this election (without vote counts for privacy)
+    return prepared_response(request, election.ballot_payload)
 
 
 @router.post("/election/{election_id}/vote", response_model=VoteResponse)
-async def cast_vote(election_id: int, vote_request: VoteRequest, db: db_dependency):
+async def cast_vote(election_id: int, vote_request: VoteRequest, db: db_dependency, redis: redis_dependency):
     """Cast a vote in an election"""
     
-    # Check if election exists and is currently running
-    election_result = await db.execute(
-        select(Election).where(Election.id == election_id)
-    )
-    election = election_result.scalar_one_or_none()
-    
-    if not election:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
-    
-    now = datetime.now(timezone.utc)
-    if now < election.starts_at or now > election.ends_at:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Election is not currently running")
-    
-    # Check if voter exists and is verified for this election
-    voter_result = await db.execute(
-        select(Voter).where(
-            and_(
-                Voter.voter_hashed_national_id == vote_request.voter_hashed_national_id,
-                Voter.election_id == election_id,
-                Voter.is_verified == True
-            )
-        )
-    )
-    voter = voter_result.scalar_one_or_none()
-    
-    if not voter:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Voter not found or not verified for this election")
-    
-    # Check if voter has already voted in this election
-    existing_vote_result = await db.execute(
-        select(VotingProcess).where(
-            and_(
-                VotingProcess.voter_hashed_national_id == vote_request.voter_hashed_national_id,
-                VotingProcess.election_id == election_id
-            )
+    try:
+        timestamp, receipt = await VotingService.cast_ballot(
+            election_id,
+            vote_request.voter_hashed_national_id,
+            vote_request.candidate_hashed_national_ids,
+            db,
+            redis=redis if settings.BUFFERED_VOTE_INGEST else None
         )
-    )
-    
-    if existing_vote_result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Voter has already voted in this election")
-    
-    # Validate number of candidates selected
-    if len(vote_request.candidate_hashed_national_ids) != election.num_of_votes_per_voter:
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail=f"Must select exactly {election.num_of_votes_per_voter} candidate(s)"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to cast vote. Please try again."
         )
-    
-    # Validate that all selected candidates are participating in this election
-    for candidate_id in vote_request.candidate_hashed_national_ids:
-        participation_result = await db.execute(
-            select(CandidateParticipation).where(
-                and_(
-                    CandidateParticipation.candidate_hashed_national_id == candidate_id,
-                    CandidateParticipation.election_id == election_id
-                )
-            )
+
+    # Buffered ballots are announced by the consumer once they are written
+    if not settings.BUFFERED_VOTE_INGEST:
+        await publish_tally_delta(
+            redis, election_id, 1, dict.fromkeys(vote_request.candidate_hashed_national_ids, 1)
         )
-        
-        if not participation_result.scalar_one_or_none():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, 
-                detail=f"Candidate {candidate_id} is not participating in this election"
-            )
     
-    try:
-        # Record the voting process
-        voting_process = VotingProcess(
-            voter_hashed_national_id=vote_request.voter_hashed_national_id,
-            election_id=election_id,
-            created_at=now
+    return VoteResponse(
+        message="Vote cast successfully",
+        election_id=election_id,
+        voter_hashed_national_id=vote_request.voter_hashed_national_id,
+        candidates_selected=vote_request.candidate_hashed_national_ids,
+        timestamp=timestamp,
+        receipt=receipt
+    )
+
+
+@router.post("/election/{election_id}/ballots/batch", response_model=BatchVoteResponse)
+async def cast_ballots_batch(
+    election_id: int,
+    request: Request,
+    db: db_dependency,
+    redis: redis_dependency,
+    current_user: organization_dependency,
+):
+    """
+    Upload ballots collected offline by polling-station kiosks.
+
+    The body is either a JSON array of ballots or NDJSON (`application/x-ndjson`,
+    one ballot per line). Each ballot is accepted or rejected on its own; the
+    response lists the outcome of every ballot in upload order.
+
+    Ballots must have been cast while the election was running, and batches are
+    only accepted until KIOSK_UPLOAD_WINDOW_SECONDS (15 minutes by default) after
+    the election ends; later uploads get a 409 whatever their `cast_at`, as do
+    uploads once the election's results have been snapshotted. Results are not
+    finalized before the window closes.
+    """
+    organization_id = getattr(current_user, 'organization_id', current_user.id)
+    body = await request.body()
+
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        entries = [line for line in body.decode("utf-8").splitlines() if line.strip()]
+    else:
+        try:
+            entries = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of ballots")
+        if not isinstance(entries, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of ballots")
+
+    if len(entries) > settings.MAX_BATCH_BALLOTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.MAX_BATCH_BALLOTS} ballots can be uploaded at once"
         )
-        db.add(voting_process)
-        
-        # Update vote counts for selected candidates
-        for candidate_id in vote_request.candidate_hashed_national_ids:
-            participation_result = await db.execute(
-                select(CandidateParticipation).where(
-                    and_(
-                        CandidateParticipation.candidate_hashed_national_id == candidate_id,
-                        CandidateParticipation.election_id == election_id
-                    )
-                )
-            )
-            participation = participation_result.scalar_one_or_none()
-            if participation:
-                participation.vote_count += 1
-        
-        # Update election total vote count
-        election.total_vote_count += 1
-        
-        await db.commit()
-        
-        return VoteResponse(
-            message="Vote cast successfully",
-            election_id=election_id,
-            voter_hashed_national_id=vote_request.voter_hashed_national_id,
-            candidates_selected=vote_request.candidate_hashed_national_ids,
-            timestamp=now
+
+    ballots = []
+    parse_errors = []
+    for index, entry in enumerate(entries):
+        try:
+            if isinstance(entry, str):
+                ballots.append((index, KioskBallot.model_validate_json(entry)))
+            else:
+                ballots.append((index, KioskBallot.model_validate(entry)))
+        except ValidationError as e:
+            parse_errors.append(BallotResult(index=index, accepted=False, detail=f"Invalid ballot: {e.errors()[0]['msg']}"))
+
+    try:
+        results = await VotingService.cast_ballots(
+            election_id,
+            organization_id,
+            ballots,
+            db,
+            redis=redis if settings.BUFFERED_VOTE_INGEST else None
         )
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        await db.rollback()
+        print(f"Error recording ballot batch for election {election_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to cast vote. Please try again."
+            detail="Failed to record ballots. Please try again."
         )
 
+    if not settings.BUFFERED_VOTE_INGEST:
+        accepted_indexes = {result.index for result in results if result.accepted}
+        candidate_deltas = Counter()
+        for index, ballot in ballots:
+            if index in accepted_indexes:
+                candidate_deltas.update(ballot.candidate_hashed_national_ids)
+        await publish_tally_delta(redis, election_id, len(accepted_indexes), dict(candidate_deltas))
+
+    results = sorted(results + parse_errors, key=lambda result: result.index)
+    accepted = sum(1 for result in results if result.accepted)
+    return BatchVoteResponse(
+        election_id=election_id,
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        results=results
+    )
+
 
 @router.get("/election/{election_id}/voter/{voter_hashed_national_id}/status")
-async def get_voter_voting_status(election_id: int, voter_hashed_national_id: str, db: db_dependency):
+async def get_voter_voting_status(
+    election_id: int, voter_hashed_national_id: str, db: db_dependency, redis: redis_dependency
+):
     """Check if a voter has already voted in an election"""
     
     # Check if election exists
@@ -199,6 +193,10 @@ async def get_voter_voting_status(election_id: int, voter_hashed_national_id: st
     )
     
     has_voted = voting_process_result.scalar_one_or_none() is not None
+
+    # A buffered ballot may not have been written to the database yet
+    if not has_voted and settings.BUFFERED_VOTE_INGEST:
+        has_voted = await VoteBuffer.has_pending_ballot(redis, election_id, voter_hashed_national_id)
     
     return {
         "election_id": election_id,
@@ -206,3 +204,16 @@ async def get_voter_voting_status(election_id: int, voter_hashed_national_id: st
         "has_voted": has_voted,
         "votes_allowed": election.num_of_votes_per_voter
     }
+
+
+@router.get("/election/{election_id}/receipt/{receipt}")
+async def check_ballot_receipt(election_id: int, receipt: str, db: db_dependency):
+    """Check that the ballot behind a voter's receipt is among the election's recorded ballots"""
+    
+    recorded = await BallotIntegrityService.is_receipt_recorded(election_id, receipt, db)
+    
+    return {
+        "election_id": election_id,
+        "receipt": receipt,
+        "recorded": recorded
+    }
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import List, Optional
 from enum import Enum
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from .candidate import CandidateCreate
 from .voter import VoterCreate
 
@@ -12,6 +12,14 @@ class ElectionMethod(str, Enum):
     CSV = "csv"
 
 
+class TabulationMethod(str, Enum):
+    PLURALITY = "plurality"
+    APPROVAL = "approval"
+    BORDA = "borda"
+    IRV = "irv"
+    STV = "stv"
+
+
 class ElectionType(str, Enum):
     SIMPLE = "simple"
     DISTRICT_BASED = "district_based"
@@ -93,6 +101,22 @@ class ElectionCreate(ElectionBase):
     
     # For API method
     api_endpoint: Optional[str] = None
+
+    # Counter slots per candidate; raise for elections expecting heavy concurrent voting
+    counter_shards: int = Field(1, ge=1, le=256)
+
+    # Stream per-candidate counts to the live tally while the election is running
+    live_results: bool = False
+
+    # Ranked methods (borda, irv, stv) take the order of the selected candidates as preference
+    tabulation_method: TabulationMethod = TabulationMethod.PLURALITY
+    seats: int = Field(1, ge=1)
+
+    @field_validator("seats")
+    def validate_seats(cls, seats, info):
+        if info.data.get("tabulation_method") == TabulationMethod.IRV and seats != 1:
+            raise ValueError("Instant runoff elections fill exactly one seat; use stv for more")
+        return seats
     
     # For CSV method - file content will be handled separately in the endpoint
     # Optional lists for manual candidate/voter addition (for backwards compatibility)
@@ -108,6 +132,10 @@ class ElectionUpdate(BaseModel):
     ends_at: datetime | None = None
     num_of_votes_per_voter: int | None = None
     potential_number_of_voters: int | None = None
+    counter_shards: int | None = Field(None, ge=1, le=256)
+    live_results: bool | None = None
+    tabulation_method: TabulationMethod | None = None
+    seats: int | None = Field(None, ge=1)
 
     @field_validator("ends_at")
     def validate_dates_update(cls, ends_at, info):
@@ -126,6 +154,10 @@ class ElectionOut(ElectionBase):
     number_of_candidates: int
     method: str
     api_endpoint: str | None = None
+    counter_shards: int = 1
+    live_results: bool = False
+    tabulation_method: str = "plurality"
+    seats: int = 1
 
     class Config:
         from_attributes = True
@@ -33,6 +33,29 @@ class VoteResponse(BaseModel):
     voter_hashed_national_id: str
     candidates_selected: List[str]
     timestamp: datetime
+    receipt: str | None = Field(None, description="Ballot receipt; can later be checked against the recorded ballots")
     
     class Config:
         from_attributes = True
+
+
+class KioskBallot(VoteRequest):
+    """A ballot collected offline by a polling-station kiosk"""
+    cast_at: datetime | None = Field(None, description="When the ballot was cast on the kiosk; defaults to upload time")
+
+
+class BallotResult(BaseModel):
+    """Outcome of one ballot of a batch upload"""
+    index: int
+    voter_hashed_national_id: str | None = None
+    accepted: bool
+    detail: str | None = None
+    receipt: str | None = None
+
+
+class BatchVoteResponse(BaseModel):
+    """Schema for the response to a batch ballot upload"""
+    election_id: int
+    accepted: int
+    rejected: int
+    results: List[BallotResult]
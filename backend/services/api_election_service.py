@@ -1,4 +1,3 @@
-import json
 import hashlib
 import aiohttp
 import logging
@@ -210,7 +209,7 @@ class APIElectionService:
                     election_id, 
                     api_response.eligible_candidates
                 )
-                existing_voter.eligible_candidates = json.dumps(eligible_candidate_ids) if eligible_candidate_ids else None
+                existing_voter.eligible_candidate_ids = eligible_candidate_ids or None
             
             await self.db.flush()
             return existing_voter
@@ -229,7 +228,7 @@ class APIElectionService:
             phone_number=api_response.phone_number,
             election_id=election_id,
             is_api_voter=True,
-            eligible_candidates=json.dumps(eligible_candidate_ids) if eligible_candidate_ids else None
+            eligible_candidate_ids=eligible_candidate_ids or None
         )
         
         self.db.add(voter)
@@ -338,21 +337,13 @@ class APIElectionService:
         """
         Get the list of candidates that a voter is eligible to vote for
         """
-        if not voter.eligible_candidates:
-            return []
-        
-        try:
-            candidate_ids = json.loads(voter.eligible_candidates)
-        except (json.JSONDecodeError, TypeError):
-            return []
-        
-        if not candidate_ids:
+        if not voter.eligible_candidate_ids:
             return []
         
         # Get candidate details
         from sqlalchemy.future import select
         candidates_result = await self.db.execute(
-            select(Candidate).where(Candidate.hashed_national_id.in_(candidate_ids))
+            select(Candidate).where(Candidate.hashed_national_id.in_(voter.eligible_candidate_ids))
         )
         candidates = candidates_result.scalars().all()
         
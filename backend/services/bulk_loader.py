@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import cast, column, func, literal, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from core.shared import Country
+from models.candidate import Candidate
+from models.candidate_participation import CandidateParticipation
+from models.voter import Voter
+
+VOTER_STAGING_COLUMNS = ("voter_hashed_national_id", "phone_number", "governerate")
+
+CANDIDATE_STAGING_COLUMNS = (
+    "hashed_national_id", "name", "district", "governorate", "country", "party",
+    "symbol_name", "symbol_icon_url", "photo_url", "birth_date", "description",
+)
+
+# Transaction-scoped staging tables, created on first use in a transaction
+_STAGING_TABLES = {
+    "voter_import_staging": """
+        CREATE TEMPORARY TABLE IF NOT EXISTS voter_import_staging (
+            voter_hashed_national_id varchar(200),
+            phone_number varchar(20),
+            governerate varchar(100)
+        ) ON COMMIT DROP
+    """,
+    "candidate_import_staging": """
+        CREATE TEMPORARY TABLE IF NOT EXISTS candidate_import_staging (
+            hashed_national_id varchar(200),
+            name varchar(200),
+            district varchar(100),
+            governorate varchar(100),
+            country text,
+            party varchar(100),
+            symbol_name varchar(100),
+            symbol_icon_url varchar(500),
+            photo_url varchar(500),
+            birth_date timestamp,
+            description text
+        ) ON COMMIT DROP
+    """,
+}
+
+voter_staging = table("voter_import_staging", *(column(name) for name in VOTER_STAGING_COLUMNS))
+candidate_staging = table("candidate_import_staging", *(column(name) for name in CANDIDATE_STAGING_COLUMNS))
+
+
+def _utc_naive(value: datetime) -> datetime:
+    """Staging timestamps are UTC without a zone"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class LoadResult:
+    """Rows a bulk load added, and rows skipped because they already existed"""
+    inserted: int
+    skipped: int
+
+
+class BulkLoader:
+    """
+    Loads validated voters and candidates with PostgreSQL COPY.
+
+    Rows are copied in one binary stream into a temporary staging table on the
+    session's own connection, then moved into the real table with a single
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING, so a load costs a handful of
+    round trips whatever its size and existing rows are skipped rather than
+    looked up one by one. Everything runs in the caller's transaction; the
+    staging tables disappear when it ends.
+    """
+
+    @staticmethod
+    async def _stage(db, staging: str, columns: Sequence[str], records: List[Tuple[Any, ...]]) -> None:
+        await db.execute(text(_STAGING_TABLES[staging]))
+        await db.execute(text(f"TRUNCATE {staging}"))
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(staging, records=records, columns=columns)
+
+    @staticmethod
+    async def load_voters(election_id: int, voters: List[Dict[str, Any]], db) -> LoadResult:
+        """Add voters (as produced by CSVHandler) to an election's roll"""
+        if not voters:
+            return LoadResult(0, 0)
+
+        await BulkLoader._stage(
+            db, "voter_import_staging", VOTER_STAGING_COLUMNS,
+            [(voter["voter_hashed_national_id"], voter["phone_number"], voter["governorate"]) for voter in voters]
+        )
+        result = await db.execute(
+            insert(Voter).from_select(
+                ["voter_hashed_national_id", "phone_number", "governerate", "election_id"],
+                select(
+                    voter_staging.c.voter_hashed_national_id,
+                    voter_staging.c.phone_number,
+                    voter_staging.c.governerate,
+                    literal(election_id)
+                )
+            ).on_conflict_do_nothing(index_elements=[Voter.voter_hashed_national_id, Voter.election_id])
+        )
+        return LoadResult(result.rowcount, len(voters) - result.rowcount)
+
+    @staticmethod
+    async def load_candidates(
+        election_id: int, organization_id: int, candidates: List[Dict[str, Any]], db
+    ) -> LoadResult:
+        """
+        Create the candidates (as produced by CSVHandler) that don't exist yet
+        and enter all of them in the election. Counts are of participations.
+        """
+        if not candidates:
+            return LoadResult(0, 0)
+
+        await BulkLoader._stage(
+            db, "candidate_import_staging", CANDIDATE_STAGING_COLUMNS,
+            [
+                (
+                    candidate["hashed_national_id"], candidate["name"], candidate.get("district"),
+                    candidate.get("governorate"), Country(candidate["country"]).name, candidate.get("party"),
+                    candidate.get("symbol_name"), candidate.get("symbol_icon_url"), candidate.get("photo_url"),
+                    _utc_naive(candidate["birth_date"]), candidate.get("description"),
+                )
+                for candidate in candidates
+            ]
+        )
+
+        created = await db.execute(
+            insert(Candidate).from_select(
+                [*CANDIDATE_STAGING_COLUMNS, "organization_id"],
+                select(
+                    candidate_staging.c.hashed_national_id,
+                    candidate_staging.c.name,
+                    candidate_staging.c.district,
+                    candidate_staging.c.governorate,
+                    cast(candidate_staging.c.country, Candidate.country.type),
+                    candidate_staging.c.party,
+                    candidate_staging.c.symbol_name,
+                    candidate_staging.c.symbol_icon_url,
+                    candidate_staging.c.photo_url,
+                    func.timezone("UTC", candidate_staging.c.birth_date),
+                    candidate_staging.c.description,
+                    literal(organization_id)
+                )
+            ).on_conflict_do_nothing(index_elements=[Candidate.hashed_national_id])
+        )
+
+        entered = await db.execute(
+            insert(CandidateParticipation).from_select(
+                ["candidate_hashed_national_id", "election_id"],
+                select(candidate_staging.c.hashed_national_id, literal(election_id))
+            ).on_conflict_do_nothing(
+                index_elements=[CandidateParticipation.candidate_hashed_national_id, CandidateParticipation.election_id]
+            )
+        )
+        print(f"Loaded {len(candidates)} candidates into election {election_id}: {created.rowcount} new, {entered.rowcount} entered")
+        return LoadResult(entered.rowcount, len(candidates) - entered.rowcount)
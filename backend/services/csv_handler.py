@@ -1,172 +1,198 @@
-import csv
+import asyncio
 import io
-import hashlib
-from datetime import datetime
-from typing import List, Dict, Any
+from typing import BinaryIO, List, Dict, Any, Iterator, Tuple
 import pandas as pd
 from fastapi import HTTPException, UploadFile
-from core.shared import Country, hash_national_id
+from core.shared import Country, hash_national_id, hash_national_ids
+
+# Accepted values of the country column
+COUNTRY_VALUES = frozenset(c.value for c in Country)
+
+# Bad rows listed in an upload error; the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+CANDIDATE_REQUIRED_COLUMNS = ['national_id', 'name', 'country', 'birth_date']
+VOTER_REQUIRED_COLUMNS = ['national_id', 'phone_number']
 
 
 class CSVHandler:
-    """Service for handling CSV file uploads and processing"""
+    """
+    Service for handling CSV file uploads and processing.
+
+    Files are read with every column as text and validated column by column;
+    each check yields a mask of bad rows, so all problems of a file are found
+    in one pass and reported together with their line numbers. Validation
+    runs off the event loop, and national IDs are hashed in one batch.
+    """
     
     @staticmethod
     def _hash_national_id(national_id: str) -> str:
         """Hash a national ID using SHA-256 - ALL national IDs are sensitive data"""
         # Use centralized hashing function to ensure consistency
         return hash_national_id(national_id)
-    
+
     @staticmethod
-    async def process_candidates_csv(file: UploadFile) -> List[Dict[str, Any]]:
-        """
-        Process uploaded candidates CSV file
-        Expected columns: national_id, name, district, governorate, country, 
-                         party, symbol_name, birth_date, description
-        """
-        print(f"DEBUG: CSVHandler.process_candidates_csv called with file: {file.filename}")
-        
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="File must be a CSV")
-        
-        content = await file.read()
-        print(f"DEBUG: Read {len(content)} bytes from candidates file")
-        
+    def read_csv(content: bytes, kind: str, required_columns: List[str]) -> pd.DataFrame:
+        """Parse an uploaded file as text columns and check the required columns are present"""
         try:
-            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-            print(f"DEBUG: CSV parsed successfully, columns: {list(df.columns)}")
-            print(f"DEBUG: CSV has {len(df)} rows")
-            print(f"DEBUG: First few rows of data:")
-            for i in range(min(3, len(df))):
-                print(f"DEBUG: Row {i}: {dict(df.iloc[i])}")
+            df = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False, na_values=[''], encoding='utf-8')
         except Exception as e:
-            print(f"DEBUG: Error parsing CSV: {str(e)}")
-            print(f"DEBUG: CSV content preview: {content[:200]}...")
-            raise HTTPException(status_code=400, detail=f"Error parsing CSV file: {str(e)}")
-        
-        # Validate required columns
-        required_columns = ['national_id', 'name', 'country', 'birth_date']
+            print(f"Error parsing {kind} CSV: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Error parsing {kind} CSV file: {str(e)}")
+
         missing_columns = [col for col in required_columns if col not in df.columns]
         if missing_columns:
-            print(f"DEBUG: Missing required columns: {missing_columns}")
             raise HTTPException(
                 status_code=400, 
                 detail=f"Missing required columns: {', '.join(missing_columns)}"
             )
-        
-        candidates = []
-        for index, row in df.iterrows():
-            try:
-                print(f"DEBUG: Processing candidate row {index + 1}")
-                
-                # Validate country
-                country_value = row['country']
-                if country_value not in [c.value for c in Country]:
-                    raise ValueError(f"Invalid country: {country_value}")
-                
-                # Parse birth_date
-                birth_date = pd.to_datetime(row['birth_date']).to_pydatetime()
-                
-                # Get raw national ID and hash it
-                raw_national_id = str(row['national_id']).strip()
-                if not raw_national_id:
-                    raise ValueError("National ID cannot be empty")
-                
-                # Hash the raw national ID before storage
-                hashed_national_id = CSVHandler._hash_national_id(raw_national_id)
-                
-                candidate_data = {
-                    'hashed_national_id': hashed_national_id,
-                    'name': str(row['name']),
-                    'district': str(row.get('district', '')) if pd.notna(row.get('district')) else None,
-                    'governorate': str(row.get('governorate', '')) if pd.notna(row.get('governorate')) else None,
-                    'country': country_value,
-                    'party': str(row.get('party', '')) if pd.notna(row.get('party')) else None,
-                    'symbol_name': str(row.get('symbol_name', '')) if pd.notna(row.get('symbol_name')) else None,
-                    'birth_date': birth_date,
-                    'description': str(row.get('description', '')) if pd.notna(row.get('description')) else None,
-                    'symbol_icon_url': str(row.get('symbol_icon_url', '')) if pd.notna(row.get('symbol_icon_url')) else None,
-                    'photo_url': str(row.get('photo_url', '')) if pd.notna(row.get('photo_url')) else None,
-                }
-                candidates.append(candidate_data)
-                print(f"DEBUG: Successfully processed candidate row {index + 1}")
-                
-            except Exception as e:
-                print(f"DEBUG: Error processing candidate row {index + 1}: {str(e)}")
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Error processing row {index + 1}: {str(e)}"
-                )
-        
-        print(f"DEBUG: Successfully processed {len(candidates)} candidates")
-        return candidates
-    
+        return df
+
     @staticmethod
-    async def process_voters_csv(file: UploadFile) -> List[Dict[str, Any]]:
+    def read_csv_chunks(file: BinaryIO, kind: str, required_columns: List[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
         """
-        Process uploaded voters CSV file
-        Expected columns: national_id, phone_number, governorate
+        Parse a file incrementally, `chunk_rows` rows at a time, as text columns.
+        Only the chunk being parsed is held in memory.
         """
-        print(f"DEBUG: CSVHandler.process_voters_csv called with file: {file.filename}")
-        
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="File must be a CSV")
-        
-        content = await file.read()
-        print(f"DEBUG: Read {len(content)} bytes from voters file")
-        
         try:
-            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
-            print(f"DEBUG: Voters CSV parsed successfully, columns: {list(df.columns)}")
-            print(f"DEBUG: Voters CSV has {len(df)} rows")
-            print(f"DEBUG: First few rows of voters data:")
-            for i in range(min(3, len(df))):
-                print(f"DEBUG: Row {i}: {dict(df.iloc[i])}")
-        except Exception as e:
-            print(f"DEBUG: Error parsing voters CSV: {str(e)}")
-            print(f"DEBUG: Voters CSV content preview: {content[:200]}...")
-            raise HTTPException(status_code=400, detail=f"Error parsing voters CSV file: {str(e)}")
-        
-        # Validate required columns
-        required_columns = ['national_id', 'phone_number']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            print(f"DEBUG: Missing required voter columns: {missing_columns}")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Missing required columns: {', '.join(missing_columns)}"
+            reader = pd.read_csv(
+                file, dtype=str, keep_default_na=False, na_values=[''], encoding='utf-8', chunksize=chunk_rows
             )
-        
-        voters = []
-        for index, row in df.iterrows():
-            try:
-                print(f"DEBUG: Processing voter row {index + 1}")
-                
-                # Get raw national ID and hash it
-                raw_national_id = str(row['national_id']).strip()
-                if not raw_national_id:
-                    raise ValueError("National ID cannot be empty")
-                
-                # Hash the raw national ID before storage
-                hashed_national_id = CSVHandler._hash_national_id(raw_national_id)
-                
-                voter_data = {
-                    'voter_hashed_national_id': hashed_national_id,
-                    'phone_number': str(row['phone_number']),
-                    'governorate': str(row.get('governorate', '')) if pd.notna(row.get('governorate')) else None,
-                }
-                voters.append(voter_data)
-                print(f"DEBUG: Successfully processed voter row {index + 1}")
-                
-            except Exception as e:
-                print(f"DEBUG: Error processing voter row {index + 1}: {str(e)}")
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Error processing row {index + 1}: {str(e)}"
-                )
-        
-        print(f"DEBUG: Successfully processed {len(voters)} voters")
-        return voters
+            with reader:
+                first_chunk = True
+                for chunk in reader:
+                    if first_chunk:
+                        missing_columns = [col for col in required_columns if col not in chunk.columns]
+                        if missing_columns:
+                            raise HTTPException(
+                                status_code=400,
+                                detail=f"Missing required columns: {', '.join(missing_columns)}"
+                            )
+                        first_chunk = False
+                    yield chunk
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error parsing {kind} CSV: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Error parsing {kind} CSV file: {str(e)}")
+
+    @staticmethod
+    def _optional(df: pd.DataFrame, column: str) -> List[Any]:
+        """A text column with missing cells (or a missing column) as None"""
+        if column not in df.columns:
+            return [None] * len(df)
+        values = df[column]
+        return values.astype(object).where(values.notna(), None).tolist()
+
+    @staticmethod
+    def _records(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        """Row dicts from equally long column lists (much faster than DataFrame.to_dict)"""
+        keys = list(columns)
+        return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+    @staticmethod
+    def _national_ids(df: pd.DataFrame, errors: List[Tuple[int, str]]) -> pd.Series:
+        national_ids = df['national_id'].str.strip()
+        CSVHandler._add_errors(errors, national_ids.isna() | (national_ids == ''), "National ID cannot be empty")
+        return national_ids
+
+    @staticmethod
+    def _add_errors(errors: List[Tuple[int, str]], bad: pd.Series, message) -> None:
+        """Record the rows of a bad-row mask; `message` is a string or a function of the row's value"""
+        for index in bad.index[bad]:
+            errors.append((index, message if isinstance(message, str) else message(index)))
+
+    @staticmethod
+    def raise_for_errors(errors: List[Tuple[int, str]], first_line: int = 2, total: int | None = None) -> None:
+        """
+        Reject the file when any row failed validation. `first_line` is the
+        file line of the frame's first row (the header is line 1); `total`
+        also counts errors beyond those kept in `errors`.
+        """
+        if not errors:
+            return
+        total = total or len(errors)
+        errors.sort()
+        reported = "; ".join(f"line {index + first_line}: {message}" for index, message in errors[:MAX_REPORTED_ERRORS])
+        if total > MAX_REPORTED_ERRORS:
+            reported += f"; and {total - MAX_REPORTED_ERRORS} more"
+        raise HTTPException(status_code=400, detail=f"{total} validation errors: {reported}")
+
+    @staticmethod
+    def validate_candidates(df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+        """Candidates of a parsed file, and (row index, error) of every bad row"""
+        df = df.reset_index(drop=True)
+        errors = []
+
+        national_ids = CSVHandler._national_ids(df, errors)
+        CSVHandler._add_errors(errors, df['name'].isna(), "Name cannot be empty")
+
+        countries = df['country']
+        CSVHandler._add_errors(
+            errors, ~countries.isin(COUNTRY_VALUES), lambda index: f"Invalid country: {countries[index]}"
+        )
+
+        # ISO dates in one vectorized pass; anything else is parsed value by value
+        raw_dates = df['birth_date'].str.strip()
+        birth_dates = pd.to_datetime(raw_dates, format='ISO8601', errors='coerce')
+        unparsed = birth_dates.isna() & raw_dates.notna()
+        if unparsed.any():
+            birth_dates[unparsed] = pd.to_datetime(raw_dates[unparsed], format='mixed', errors='coerce')
+        CSVHandler._add_errors(
+            errors, birth_dates.isna(), lambda index: f"Invalid birth date: {df['birth_date'][index]}"
+        )
+
+        if errors:
+            return [], errors
+
+        candidates = CSVHandler._records({
+            'hashed_national_id': hash_national_ids(national_ids.tolist()),
+            'name': df['name'].tolist(),
+            'district': CSVHandler._optional(df, 'district'),
+            'governorate': CSVHandler._optional(df, 'governorate'),
+            'country': countries.tolist(),
+            'party': CSVHandler._optional(df, 'party'),
+            'symbol_name': CSVHandler._optional(df, 'symbol_name'),
+            'birth_date': list(birth_dates.dt.to_pydatetime()),
+            'description': CSVHandler._optional(df, 'description'),
+            'symbol_icon_url': CSVHandler._optional(df, 'symbol_icon_url'),
+            'photo_url': CSVHandler._optional(df, 'photo_url'),
+        })
+        return candidates, errors
+
+    @staticmethod
+    def validate_voters(df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+        """Voters of a parsed file, and (row index, error) of every bad row"""
+        df = df.reset_index(drop=True)
+        errors = []
+
+        national_ids = CSVHandler._national_ids(df, errors)
+        CSVHandler._add_errors(errors, df['phone_number'].isna(), "Phone number cannot be empty")
+
+        if errors:
+            return [], errors
+
+        voters = CSVHandler._records({
+            'voter_hashed_national_id': hash_national_ids(national_ids.tolist()),
+            'phone_number': df['phone_number'].tolist(),
+            'governorate': CSVHandler._optional(df, 'governorate'),
+        })
+        return voters, errors
+
+    @staticmethod
+    async def process_candidates_csv(file: UploadFile) -> List[Dict[str, Any]]:
+        """
+        Process uploaded candidates CSV file
+        Expected columns: national_id, name, district, governorate, country, 
+                         party, symbol_name, birth_date, description
+        """
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="File must be a CSV")
+
+        df = CSVHandler.read_csv(await file.read(), "candidates", CANDIDATE_REQUIRED_COLUMNS)
+        candidates, errors = await asyncio.to_thread(CSVHandler.validate_candidates, df)
+        CSVHandler.raise_for_errors(errors)
+        return candidates
     
     @staticmethod
     def get_candidates_csv_template() -> str:
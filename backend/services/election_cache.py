@@ -0,0 +1,171 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Tuple
+
+from sqlalchemy.future import select
+
+from core.http_cache import PreparedPayload
+from core.settings import settings
+from models.candidate import Candidate
+from models.candidate_participation import CandidateParticipation
+from models.election import Election
+from schemas.voting import CandidateVoteInfo
+
+
+@dataclass(frozen=True)
+class CachedElection:
+    """What the ballot path needs to know about an election"""
+    id: int
+    organization_id: int
+    title: str
+    starts_at: datetime
+    ends_at: datetime
+    num_of_votes_per_voter: int
+    counter_shards: int
+    live_results: bool
+    tabulation_method: str
+    candidate_ids: FrozenSet[str]
+    candidates: Tuple[CandidateVoteInfo, ...]
+    # Rendered `/voting/election/{id}/candidates` response
+    ballot_payload: PreparedPayload
+
+    def is_running(self, now: datetime) -> bool:
+        return self.starts_at <= now <= self.ends_at
+
+    @property
+    def uploads_close_at(self) -> datetime:
+        """When the last kiosk ballot batch may be uploaded"""
+        return self.ends_at + timedelta(seconds=settings.KIOSK_UPLOAD_WINDOW_SECONDS)
+
+    def ballot_size_error(self, selected: int) -> str | None:
+        """Why a ballot selecting this many candidates is invalid, if it is"""
+        if self.tabulation_method == "plurality":
+            if selected != self.num_of_votes_per_voter:
+                return f"Must select exactly {self.num_of_votes_per_voter} candidate(s)"
+        elif not 1 <= selected <= self.num_of_votes_per_voter:
+            return f"Must select between 1 and {self.num_of_votes_per_voter} candidate(s)"
+        return None
+
+
+class ElectionCache:
+    """
+    Per-process cache of elections and their participating candidates.
+
+    Candidates and the voting window cannot change while an election is running,
+    so entries are only dropped when their TTL expires or when a route that edits
+    an election or a candidate calls one of the `invalidate*` hooks. Other worker
+    processes pick the change up once their own entry expires.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[float, CachedElection]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        # Bumped by every invalidation so a load racing with an edit is not stored
+        self._generation = 0
+
+    async def get(self, election_id: int, db) -> CachedElection | None:
+        """Return the cached election, loading it on a miss; None if it does not exist"""
+        entry = self._fresh_entry(election_id)
+        if entry is not None:
+            return entry
+
+        lock = self._locks.setdefault(election_id, asyncio.Lock())
+        async with lock:
+            # Another request may have loaded it while we waited
+            entry = self._fresh_entry(election_id)
+            if entry is not None:
+                return entry
+
+            generation = self._generation
+            entry = await self._load(election_id, db)
+            if entry is not None and generation == self._generation:
+                self._entries[election_id] = (time.monotonic() + self.ttl_seconds, entry)
+            return entry
+
+    def invalidate(self, *election_ids: int) -> None:
+        """Drop the given elections"""
+        self._generation += 1
+        for election_id in election_ids:
+            self._entries.pop(election_id, None)
+
+    def invalidate_candidate(self, candidate_hashed_national_id: str) -> None:
+        """Drop every election the candidate participates in"""
+        self.invalidate(*[
+            election_id
+            for election_id, (_, entry) in list(self._entries.items())
+            if candidate_hashed_national_id in entry.candidate_ids
+        ])
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    def _fresh_entry(self, election_id: int) -> CachedElection | None:
+        cached = self._entries.get(election_id)
+        if cached is None:
+            return None
+        expires_at, entry = cached
+        if expires_at < time.monotonic():
+            self._entries.pop(election_id, None)
+            return None
+        return entry
+
+    @staticmethod
+    async def _load(election_id: int, db) -> CachedElection | None:
+        election_result = await db.execute(
+            select(
+                Election.id,
+                Election.organization_id,
+                Election.title,
+                Election.starts_at,
+                Election.ends_at,
+                Election.num_of_votes_per_voter,
+                Election.counter_shards,
+                Election.live_results,
+                Election.tabulation_method,
+            ).where(Election.id == election_id)
+        )
+        election = election_result.one_or_none()
+        if not election:
+            return None
+
+        candidates_result = await db.execute(
+            select(Candidate)
+            .join(CandidateParticipation, CandidateParticipation.candidate_hashed_national_id == Candidate.hashed_national_id)
+            .where(CandidateParticipation.election_id == election_id)
+            .order_by(Candidate.name)
+        )
+        candidates = tuple(
+            CandidateVoteInfo.model_validate(candidate) for candidate in candidates_result.scalars().all()
+        )
+        ballot_payload = PreparedPayload.from_content({
+            "election_info": {
+                "id": election.id,
+                "title": election.title,
+                "num_of_votes_per_voter": election.num_of_votes_per_voter,
+                "tabulation_method": election.tabulation_method
+            },
+            "candidates": candidates
+        })
+
+        return CachedElection(
+            id=election.id,
+            organization_id=election.organization_id,
+            title=election.title,
+            starts_at=election.starts_at,
+            ends_at=election.ends_at,
+            num_of_votes_per_voter=election.num_of_votes_per_voter,
+            counter_shards=election.counter_shards,
+            live_results=election.live_results,
+            tabulation_method=election.tabulation_method,
+            candidate_ids=frozenset(candidate.hashed_national_id for candidate in candidates),
+            candidates=candidates,
+            ballot_payload=ballot_payload,
+        )
+
+
+# Global cache instance
+election_cache = ElectionCache(settings.ELECTION_CACHE_TTL_SECONDS)
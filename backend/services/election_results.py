@@ -1,21 +1,288 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from fastapi.encoders import jsonable_encoder
+from redis.asyncio import Redis
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
-from sqlalchemy import and_, func, desc
+from sqlalchemy import Integer, String, and_, case, func, desc, literal, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from models.election import Election
+from models.election_result_snapshot import ElectionResultSnapshot
 from models.candidate_participation import CandidateParticipation
 from models.candidate import Candidate
 from models.voting_process import VotingProcess
+from models.turnout_bucket import TurnoutBucket
 from models.voter import Voter
-from typing import List, Dict, Any
+from core.settings import settings
+from services.tabulation import RANKED_METHODS, TabulationService
+from services.vote_buffer import VoteBuffer
+from services.vote_counter import VoteCounter
+from typing import List, Dict, Any, Literal
+
+# Tie handling of candidate ranks: standard competition (1, 1, 3) or dense (1, 1, 2)
+RankingMethod = Literal["standard", "dense"]
+
+# Candidate attribute regional results are grouped by
+RegionLevel = Literal["governorate", "district"]
+REGION_LEVELS = ("governorate", "district")
+
+
+class CountingInProgress(ValueError):
+    """A closed election still has ballots on their way into the counters"""
 
 
 class ElectionResultsService:
     """Service for calculating and retrieving election results"""
     
     @staticmethod
-    async def get_election_results(election_id: int, db) -> Dict[str, Any]:
+    async def get_election_results(election_id: int, db, redis: Redis | None = None) -> Dict[str, Any]:
+        """
+        Get the results of a finished election from its snapshot; the snapshot
+        is taken on the first request if finalization has not produced one yet.
+        """
+        snapshot_result = await db.execute(
+            select(ElectionResultSnapshot.results).where(ElectionResultSnapshot.election_id == election_id)
+        )
+        results = snapshot_result.scalar_one_or_none()
+        if results is not None:
+            return results
+
+        return await ElectionResultsService.build_results_snapshot(election_id, db, redis)
+
+    @staticmethod
+    async def get_election_summary(election_id: int, db) -> Dict[str, Any] | None:
+        """
+        Winners and totals of a finished election, or None before its snapshot
+        is taken. Only the title, winners and statistics are extracted from the
+        snapshot, so the candidate list is never sent over or decoded.
+        """
+        results = ElectionResultSnapshot.results
+        summary_result = await db.execute(
+            select(
+                results[("election_info", "title")].astext,
+                results[("results", "winners")],
+                results[("results", "statistics")]
+            )
+            .where(ElectionResultSnapshot.election_id == election_id)
+        )
+        row = summary_result.one_or_none()
+        if row is None:
+            return None
+
+        title, winners, statistics = row
+        return {
+            "election_id": election_id,
+            "election_title": title,
+            "winners": [
+                {
+                    "name": winner["name"],
+                    "party": winner["party"],
+                    "vote_count": winner["vote_count"],
+                    "vote_percentage": winner["vote_percentage"]
+                }
+                for winner in winners
+            ],
+            "total_votes_cast": statistics["total_votes_cast"],
+            "voter_turnout_percentage": statistics["voter_turnout_percentage"],
+            "number_of_candidates": statistics["number_of_candidates"]
+        }
+
+    @staticmethod
+    async def get_snapshot_etag(election_id: int, db) -> str | None:
+        """
+        Strong entity tag of the election's results snapshot, None without one.
+        Derived from the time the snapshot was taken, which every rebuild moves.
+        """
+        snapshot_result = await db.execute(
+            select(ElectionResultSnapshot.generated_at).where(ElectionResultSnapshot.election_id == election_id)
+        )
+        generated_at = snapshot_result.scalar_one_or_none()
+        if generated_at is None:
+            return None
+        return f"{election_id}-{int(generated_at.timestamp() * 1_000_000):x}"
+
+    @staticmethod
+    async def ensure_counting_complete(election_id: int, db, redis: Redis | None = None) -> None:
+        """
+        Raise ValueError unless every ballot of the election has reached the
+        counters: not before RESULTS_SETTLE_SECONDS after kiosk uploads close
+        (KIOSK_UPLOAD_WINDOW_SECONDS after it ends), when ballots validated just
+        before then have committed, nor while the vote
+        buffer (when `redis` is given) still holds any of its ballots. Those
+        two cases raise CountingInProgress, as they only need waiting out.
+        """
+        election_result = await db.execute(select(Election.ends_at).where(Election.id == election_id))
+        ends_at = election_result.scalar_one_or_none()
+        if ends_at is None:
+            raise ValueError("Election not found")
+
+        now = datetime.now(timezone.utc)
+        if now <= ends_at:
+            raise ValueError("Election has not finished yet")
+        counted_at = ends_at + timedelta(seconds=settings.KIOSK_UPLOAD_WINDOW_SECONDS + settings.RESULTS_SETTLE_SECONDS)
+        if now <= counted_at:
+            raise CountingInProgress("Election results are still being counted, try again shortly")
+        if redis is not None and await VoteBuffer.pending_ballots(redis, election_id):
+            raise CountingInProgress("Election results are still being counted, try again shortly")
+
+    @staticmethod
+    async def build_results_snapshot(election_id: int, db, redis: Redis | None = None) -> Dict[str, Any]:
+        """
+        Compute the election's results from the live tables, store them as its
+        snapshot (replacing any previous one) and return them. Refuses while
+        ballots may still be on their way into the counters, see
+        `ensure_counting_complete`.
+        """
+        await ElectionResultsService.ensure_counting_complete(election_id, db, redis)
+        results = jsonable_encoder(await ElectionResultsService.compute_election_results(election_id, db))
+        first_preferences = results["results"]["tabulation"].get("first_preferences")
+        regional_results = jsonable_encoder(
+            await ElectionResultsService.compute_regional_results(election_id, db, first_preferences)
+        )
+
+        upsert = insert(ElectionResultSnapshot).values(
+            election_id=election_id, results=results, regional_results=regional_results
+        )
+        await db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[ElectionResultSnapshot.election_id],
+                set_={
+                    "results": upsert.excluded.results,
+                    "regional_results": upsert.excluded.regional_results,
+                    "generated_at": func.now()
+                }
+            )
+        )
+        await db.commit()
+        return results
+
+    @staticmethod
+    async def get_regional_results(
+        election_id: int, level: RegionLevel, db, redis: Redis | None = None
+    ) -> Dict[str, Any]:
+        """Results of a finished election per governorate or district, from its snapshot"""
+        snapshot_result = await db.execute(
+            select(ElectionResultSnapshot.regional_results).where(ElectionResultSnapshot.election_id == election_id)
+        )
+        regional_results = snapshot_result.scalar_one_or_none()
+        if regional_results is None:
+            # No snapshot yet, or one taken before regional results were stored
+            await ElectionResultsService.build_results_snapshot(election_id, db, redis)
+            snapshot_result = await db.execute(
+                select(ElectionResultSnapshot.regional_results).where(ElectionResultSnapshot.election_id == election_id)
+            )
+            regional_results = snapshot_result.scalar_one()
+
+        return {"election_id": election_id, "level": level, "regions": regional_results[level]}
+
+    @staticmethod
+    async def compute_regional_results(
+        election_id: int, db, first_preferences: Dict[str, int] | None = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Tallies and winners of every governorate and district, by the region of
+        each candidate. Both levels come from one query over the participation
+        counters, ranked and totalled per region with window functions, so no
+        ballot is read. Governorates also get their turnout, from the voters
+        and the turnout buckets. Expects the counters to be rolled up.
+
+        Ranked elections pass the first preference counts of their tabulation,
+        which replace the counters (every appearance on a ballot). The election
+        is not re-tabulated per region: a region's winners are then only its
+        first preference leaders, which each region states as its `winner_basis`.
         """
-        Get comprehensive election results including:
+        votes = CandidateParticipation.vote_count
+        candidates_query = (
+            select(Candidate)
+            .join(CandidateParticipation, CandidateParticipation.candidate_hashed_national_id == Candidate.hashed_national_id)
+            .where(CandidateParticipation.election_id == election_id)
+        )
+        if first_preferences is not None:
+            counted = select(
+                func.unnest(literal(list(first_preferences), ARRAY(String))).label("candidate_id"),
+                func.unnest(literal(list(first_preferences.values()), ARRAY(Integer))).label("votes"),
+            ).subquery("first_preferences")
+            candidates_query = candidates_query.outerjoin(counted, counted.c.candidate_id == Candidate.hashed_national_id)
+            votes = func.coalesce(counted.c.votes, 0)
+
+        columns = [
+            Candidate.hashed_national_id,
+            Candidate.name,
+            Candidate.party,
+            Candidate.governorate,
+            Candidate.district,
+            votes.label("vote_count"),
+        ]
+        for level in REGION_LEVELS:
+            region = getattr(Candidate, level)
+            columns += [
+                func.rank().over(partition_by=region, order_by=desc(votes)).label(f"{level}_rank"),
+                func.sum(votes).over(partition_by=region).label(f"{level}_votes"),
+                func.max(votes).over(partition_by=region).label(f"{level}_max_votes"),
+            ]
+
+        candidates_result = await db.execute(
+            candidates_query.with_only_columns(*columns).order_by(desc(votes), Candidate.name)
+        )
+        rows = candidates_result.all()
+
+        eligible_result = await db.execute(
+            select(Voter.governerate, func.count())
+            .where(Voter.election_id == election_id)
+            .group_by(Voter.governerate)
+        )
+        eligible_voters = {governorate or "": count for governorate, count in eligible_result.all()}
+
+        ballots_result = await db.execute(
+            select(TurnoutBucket.governorate, func.sum(TurnoutBucket.ballots))
+            .where(TurnoutBucket.election_id == election_id)
+            .group_by(TurnoutBucket.governorate)
+        )
+        ballots_cast = {governorate: int(ballots) for governorate, ballots in ballots_result.all()}
+
+        regional_results = {}
+        for level in REGION_LEVELS:
+            regions = {}
+            for row in rows:
+                name = getattr(row, level)
+                region_votes = int(getattr(row, f"{level}_votes") or 0)
+                max_votes = getattr(row, f"{level}_max_votes")
+                region = regions.get(name)
+                if region is None:
+                    region = regions[name] = {
+                        "region": name,
+                        "total_votes": region_votes,
+                        "candidates": [],
+                        "winners": [],
+                        "winner_basis": "votes" if first_preferences is None else "first_preferences",
+                    }
+                    if level == "governorate":
+                        eligible = eligible_voters.get(name or "", 0)
+                        ballots = ballots_cast.get(name or "", 0)
+                        region["total_eligible_voters"] = eligible
+                        region["ballots_cast"] = ballots
+                        region["voter_turnout_percentage"] = round(ballots / eligible * 100, 2) if eligible else 0
+
+                is_winner = row.vote_count == max_votes and row.vote_count > 0
+                region["candidates"].append({
+                    "hashed_national_id": row.hashed_national_id,
+                    "name": row.name,
+                    "party": row.party,
+                    "vote_count": row.vote_count,
+                    "vote_percentage": round(row.vote_count / region_votes * 100, 2) if region_votes else 0,
+                    "rank": getattr(row, f"{level}_rank"),
+                    "is_winner": is_winner,
+                })
+                if is_winner:
+                    region["winners"].append(row.hashed_national_id)
+
+            regional_results[level] = sorted(regions.values(), key=lambda region: (region["region"] is None, region["region"] or ""))
+
+        return regional_results
+
+    @staticmethod
+    async def compute_election_results(election_id: int, db) -> Dict[str, Any]:
+        """
+        Compute comprehensive election results including:
         - Election information
         - Candidate rankings with vote counts and percentages
         - Total votes cast
@@ -23,6 +290,9 @@ class ElectionResultsService:
         - Winner determination
         """
         try:
+            # Fold any sharded counter slots into the counters read below
+            await VoteCounter.rollup(election_id, db)
+
             # Get election details
             election_result = await db.execute(
                 select(Election).where(Election.id == election_id)
@@ -70,10 +340,18 @@ class ElectionResultsService:
             )
             
             candidates_data = candidates_result.all()
+            tabulation = await TabulationService.tabulate(election_id, db)
+            is_ranked = tabulation["method"] in RANKED_METHODS
             
             # Calculate percentages and rankings
             candidates_with_stats = []
             for i, (candidate, vote_count, has_won, rank) in enumerate(candidates_data):
+                if is_ranked:
+                    # The counter holds every appearance on a ballot; votes are first preferences
+                    appearances = vote_count or 0
+                    vote_count = tabulation["first_preferences"][candidate.hashed_national_id]
+                    rank = tabulation["ranks"][candidate.hashed_national_id]
+
                 vote_percentage = 0
                 if total_votes_cast > 0:
                     vote_percentage = (vote_count / total_votes_cast) * 100
@@ -97,6 +375,14 @@ class ElectionResultsService:
                     "is_winner": is_winner,
                     "rank": rank
                 })
+                if is_ranked:
+                    candidates_with_stats[-1]["appearances"] = appearances
+
+            if is_ranked:
+                # Ranked methods are ordered by the outcome of the count
+                candidates_with_stats.sort(key=lambda c: (c["rank"], c["name"]))
+                for position, candidate in enumerate(candidates_with_stats, start=1):
+                    candidate["position"] = position
             
             # Determine winners (candidates with the highest vote count)
             if candidates_with_stats:
@@ -104,6 +390,13 @@ class ElectionResultsService:
                 winners = [c for c in candidates_with_stats if c["vote_count"] == max_votes and c["vote_count"] > 0]
             else:
                 winners = []
+
+            # Other methods and multi-seat elections are decided by the tabulation
+            if tabulation["method"] != "plurality" or tabulation["seats"] > 1:
+                winner_ids = set(tabulation["winners"])
+                for candidate in candidates_with_stats:
+                    candidate["is_winner"] = candidate["hashed_national_id"] in winner_ids
+                winners = [c for c in candidates_with_stats if c["is_winner"]]
             
             # Calculate additional statistics
             stats = {
@@ -129,7 +422,8 @@ class ElectionResultsService:
                 "results": {
                     "candidates": candidates_with_stats,
                     "winners": winners,
-                    "statistics": stats
+                    "statistics": stats,
+                    "tabulation": tabulation
                 }
             }
             
@@ -138,54 +432,68 @@ class ElectionResultsService:
             raise
     
     @staticmethod
-    async def update_candidate_rankings(election_id: int, db) -> int:
+    async def update_candidate_rankings(election_id: int, db, ranking: RankingMethod = "standard") -> int:
         """
         Update candidate rankings and winner status based on final vote counts.
         This should be called when an election finishes.
+
+        Ranks and winners are computed and written by a single UPDATE ... FROM a
+        window-function subquery. Tied candidates share a rank; with "standard"
+        competition ranking the next rank skips (1, 1, 3), with "dense" it does
+        not (1, 1, 2). Every candidate with the highest non-zero count has won,
+        unless the election's tabulation method or seats decide otherwise.
+        Borda, IRV and STV elections take both ranks and winners from the count.
         """
         try:
-            # Get candidates ordered by vote count
-            candidates_result = await db.execute(
+            # Fold any sharded counter slots into the counters being ranked
+            await VoteCounter.rollup(election_id, db)
+
+            rank_function = func.dense_rank() if ranking == "dense" else func.rank()
+            ranked = (
                 select(
                     CandidateParticipation.candidate_hashed_national_id,
-                    CandidateParticipation.vote_count
+                    rank_function.over(order_by=desc(CandidateParticipation.vote_count)).label("rank"),
+                    func.max(CandidateParticipation.vote_count).over().label("max_votes")
                 )
                 .where(CandidateParticipation.election_id == election_id)
-                .order_by(desc(CandidateParticipation.vote_count))
+                .subquery("ranked_participations")
             )
-            
-            candidates_data = candidates_result.all()
-            
-            if not candidates_data:
-                return 0
-            
-            # Find the highest vote count
-            max_votes = candidates_data[0][1] or 0
-            
-            updated_count = 0
-            
-            # Update rankings and winner status
-            for i, (candidate_id, vote_count) in enumerate(candidates_data):
-                participation_result = await db.execute(
-                    select(CandidateParticipation)
-                    .where(
-                        and_(
-                            CandidateParticipation.candidate_hashed_national_id == candidate_id,
-                            CandidateParticipation.election_id == election_id
-                        )
+
+            result = await db.execute(
+                update(CandidateParticipation)
+                .where(
+                    CandidateParticipation.election_id == election_id,
+                    CandidateParticipation.candidate_hashed_national_id == ranked.c.candidate_hashed_national_id
+                )
+                .values(
+                    rank=ranked.c.rank,
+                    has_won=and_(
+                        CandidateParticipation.vote_count == ranked.c.max_votes,
+                        CandidateParticipation.vote_count > 0
                     )
                 )
-                
-                participation = participation_result.scalar_one_or_none()
-                if participation:
-                    # Update rank (1st, 2nd, 3rd, etc.)
-                    participation.rank = i + 1
-                    
-                    # Update winner status (all candidates with max votes are winners)
-                    participation.has_won = (vote_count == max_votes and vote_count > 0)
-                    
-                    updated_count += 1
-            
+            )
+            updated_count = result.rowcount
+
+            # Ranks follow the vote counters, except for ranked methods whose counters
+            # hold every appearance on a ballot; winners of other methods come from the tabulation
+            tabulation = await TabulationService.tabulate(election_id, db)
+            if tabulation["method"] in RANKED_METHODS and tabulation["ranks"]:
+                await db.execute(
+                    update(CandidateParticipation)
+                    .where(CandidateParticipation.election_id == election_id)
+                    .values(
+                        rank=case(tabulation["ranks"], value=CandidateParticipation.candidate_hashed_national_id),
+                        has_won=CandidateParticipation.candidate_hashed_national_id.in_(tabulation["winners"])
+                    )
+                )
+            elif tabulation["method"] != "plurality" or tabulation["seats"] > 1:
+                await db.execute(
+                    update(CandidateParticipation)
+                    .where(CandidateParticipation.election_id == election_id)
+                    .values(has_won=CandidateParticipation.candidate_hashed_national_id.in_(tabulation["winners"]))
+                )
+
             await db.commit()
             return updated_count
             
@@ -46,8 +46,8 @@ class ElectionStatusService:
                     status_changed = True
                     print(f"Election {election.id} ({election.title}) has finished")
                     
-                    # Note: Results finalization will be done manually or via API call
-                    # to avoid async context issues in background scheduler
+                    # Results are finalized in the background by the results finalizer
+                    # (or manually via the finalize endpoint)
                     print(f"Election {election.id} status updated to finished")
                 
                 # Update status if it changed
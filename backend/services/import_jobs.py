@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fastapi import HTTPException, UploadFile
+from redis.asyncio import Redis
+
+from core.dependencies import SessionLocal
+from core.settings import settings
+from models.election import Election
+from schemas.notification import ElectionNotificationData
+from services.bulk_loader import BulkLoader
+from services.csv_handler import CANDIDATE_REQUIRED_COLUMNS, CSVHandler
+from services.notification import NotificationService
+from services.voter_import import VoterImportService
+
+# Progress of every job is kept under IMPORT_JOB_KEY + job id, readable from any worker process
+IMPORT_JOB_KEY = "import_jobs:"
+
+IMPORT_UPLOAD_DIR = "uploads/imports"
+
+# Operation name of import notifications
+IMPORT_OPERATION = "election CSV import"
+
+# Bytes copied at a time when spooling an upload to disk
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass
+class ElectionImport:
+    """A CSV election waiting to be created, with its uploads spooled to disk"""
+    job_id: str
+    organization_id: int
+    title: str
+    types: str
+    starts_at: datetime
+    ends_at: datetime
+    num_of_votes_per_voter: int
+    potential_number_of_voters: int
+    candidates_file: str
+    voters_file: str
+    candidates_file_name: str
+    voters_file_name: str
+
+
+@dataclass
+class ImportProgress:
+    job_id: str
+    organization_id: int
+    status: str = "queued"  # queued, running, completed, failed
+    election_id: int | None = None
+    candidates_loaded: int = 0
+    rows_processed: int = 0
+    rows_rejected: int = 0
+    bytes_processed: int = 0
+    bytes_total: int = 0
+    eta_seconds: float | None = None
+    error: str | None = None
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    started_at: str | None = None
+    finished_at: str | None = None
+
+
+class ImportJobRunner:
+    """
+    Background creation of CSV elections.
+
+    The upload request only spools both files to disk and queues a job; a
+    fixed number of workers then create the election, load its candidates and
+    stream its voter roll into the database, publishing progress to Redis
+    after every chunk so any worker process can report it. An import either
+    creates the whole election or nothing, like the synchronous upload.
+    """
+
+    def __init__(self, workers: int, queue_size: int, ttl_seconds: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.ttl_seconds = ttl_seconds
+        self.redis: Redis | None = None
+        self.queue: asyncio.Queue | None = None
+        self.tasks: List[asyncio.Task] = []
+
+    def start(self, redis: Redis):
+        """Start the import workers"""
+        if not self.tasks:
+            self.redis = redis
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+            print(f"Import job runner started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers; queued and running jobs are dropped and keep their last progress until it expires"""
+        if self.tasks:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks = []
+            self.queue = None
+            print("Import job runner stopped")
+
+    @staticmethod
+    async def spool_upload(upload: UploadFile, path: str) -> int:
+        """Copy an upload to `path` without holding it in memory; returns its size"""
+        await upload.seek(0)
+
+        def copy():
+            with open(path, "wb") as destination:
+                shutil.copyfileobj(upload.file, destination, SPOOL_CHUNK_BYTES)
+            return os.path.getsize(path)
+
+        return await asyncio.to_thread(copy)
+
+    async def submit(self, job: ElectionImport) -> ImportProgress:
+        """Queue an import; raises HTTPException 503 when the queue is full"""
+        if self.queue is None or self.queue.full():
+            raise HTTPException(status_code=503, detail="Too many imports in progress, try again later")
+
+        progress = ImportProgress(
+            job_id=job.job_id,
+            organization_id=job.organization_id,
+            bytes_total=os.path.getsize(job.voters_file)
+        )
+        await self._save(progress)
+        self.queue.put_nowait((job, progress))
+        return progress
+
+    async def get_progress(self, job_id: str) -> Dict[str, Any] | None:
+        data = await self.redis.get(f"{IMPORT_JOB_KEY}{job_id}")
+        return json.loads(data) if data else None
+
+    async def _save(self, progress: ImportProgress):
+        await self.redis.set(f"{IMPORT_JOB_KEY}{progress.job_id}", json.dumps(asdict(progress)), ex=self.ttl_seconds)
+
+    async def _work(self):
+        while True:
+            job, progress = await self.queue.get()
+            try:
+                await self.run(job, progress)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error running import job {job.job_id}: {str(e)}")
+            finally:
+                await asyncio.to_thread(shutil.rmtree, os.path.dirname(job.voters_file), True)
+                self.queue.task_done()
+
+    async def run(self, job: ElectionImport, progress: ImportProgress):
+        """Create the election of an import and report how it went"""
+        progress.status = "running"
+        progress.started_at = datetime.now(timezone.utc).isoformat()
+        await self._save(progress)
+        await _notify(lambda service: service.create_bulk_operation_notification(
+            job.organization_id, IMPORT_OPERATION, "started"
+        ))
+        started = time.monotonic()
+
+        async def on_progress(rows_processed: int, rows_rejected: int, bytes_processed: int):
+            progress.rows_processed = rows_processed
+            progress.rows_rejected = rows_rejected
+            progress.bytes_processed = bytes_processed
+            if 0 < bytes_processed < progress.bytes_total:
+                done = bytes_processed / progress.bytes_total
+                progress.eta_seconds = round((time.monotonic() - started) * (1 - done) / done, 1)
+            await self._save(progress)
+
+        try:
+            async with SessionLocal() as db:
+                try:
+                    election = Election(
+                        title=job.title,
+                        types=job.types,
+                        organization_id=job.organization_id,
+                        starts_at=job.starts_at,
+                        ends_at=job.ends_at,
+                        num_of_votes_per_voter=job.num_of_votes_per_voter,
+                        potential_number_of_voters=job.potential_number_of_voters,
+                        method="csv",
+                        api_endpoint=None,
+                        status="upcoming",
+                    )
+                    db.add(election)
+                    await db.flush()
+
+                    with open(job.candidates_file, "rb") as candidates_file:
+                        content = await asyncio.to_thread(candidates_file.read)
+                    df = await asyncio.to_thread(CSVHandler.read_csv, content, "candidates", CANDIDATE_REQUIRED_COLUMNS)
+                    candidates, errors = await asyncio.to_thread(CSVHandler.validate_candidates, df)
+                    CSVHandler.raise_for_errors(errors)
+                    loaded = await BulkLoader.load_candidates(election.id, job.organization_id, candidates, db)
+                    progress.candidates_loaded = loaded.inserted
+
+                    with open(job.voters_file, "rb") as voters_file:
+                        voters_count = await VoterImportService.import_voters(
+                            voters_file, election.id, db, on_progress
+                        )
+
+                    election.number_of_candidates = loaded.inserted
+                    election.potential_number_of_voters = voters_count
+                    election_id = election.id
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+        except Exception as e:
+            progress.status = "failed"
+            progress.error = e.detail if isinstance(e, HTTPException) else str(e)
+            progress.eta_seconds = None
+            progress.finished_at = datetime.now(timezone.utc).isoformat()
+            await self._save(progress)
+            await _notify(lambda service: service.create_csv_upload_notification(
+                job.organization_id, job.voters_file_name, False, error_message=progress.error
+            ))
+            await _notify(lambda service: service.create_bulk_operation_notification(
+                job.organization_id, IMPORT_OPERATION, "failed", error_message=progress.error
+            ))
+            print(f"Import job {job.job_id} failed: {progress.error}")
+            return
+
+        progress.status = "completed"
+        progress.election_id = election_id
+        progress.bytes_processed = progress.bytes_total
+        progress.eta_seconds = 0
+        progress.finished_at = datetime.now(timezone.utc).isoformat()
+        await self._save(progress)
+        election_data = ElectionNotificationData(
+            election_id=election_id,
+            election_title=job.title,
+            start_time=job.starts_at,
+            end_time=job.ends_at,
+        )
+        await _notify(lambda service: service.create_election_created_notification(
+            organization_id=job.organization_id, election_data=election_data
+        ))
+        await _notify(lambda service: service.create_csv_upload_notification(
+            job.organization_id, job.candidates_file_name, True, record_count=progress.candidates_loaded
+        ))
+        await _notify(lambda service: service.create_csv_upload_notification(
+            job.organization_id, job.voters_file_name, True, record_count=voters_count
+        ))
+        await _notify(lambda service: service.create_bulk_operation_notification(
+            job.organization_id, IMPORT_OPERATION, "completed", record_count=progress.candidates_loaded + voters_count
+        ))
+        print(f"Import job {job.job_id} created election {election_id} with {voters_count} voters")
+
+
+async def _notify(create: Callable[[NotificationService], Awaitable[Any]]):
+    """Create a notification on a session of its own; a failed notification never fails the import"""
+    try:
+        async with SessionLocal() as db:
+            await create(NotificationService(db))
+    except Exception as e:
+        print(f"Warning: Failed to create import notification: {str(e)}")
+
+
+def new_import_dir() -> tuple[str, str]:
+    """A fresh job id and the directory its uploads are spooled to"""
+    job_id = uuid.uuid4().hex
+    path = os.path.join(IMPORT_UPLOAD_DIR, job_id)
+    os.makedirs(path, exist_ok=True)
+    return job_id, path
+
+
+# Global runner instance
+import_job_runner = ImportJobRunner(
+    settings.IMPORT_JOB_WORKERS, settings.IMPORT_JOB_QUEUE_SIZE, settings.IMPORT_JOB_TTL_SECONDS
+)
+
+
+def start_import_jobs(redis: Redis):
+    """Start running queued CSV imports"""
+    import_job_runner.start(redis)
+
+
+async def stop_import_jobs():
+    """Stop the CSV import workers"""
+    await import_job_runner.stop()
@@ -0,0 +1,217 @@
+import asyncio
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Tuple
+
+from redis.asyncio import Redis
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from core.dependencies import SessionLocal
+from core.settings import settings
+from models.voter import Voter
+from services.vote_counter import VoteCounter
+
+# Counted ballots are announced on TALLY_CHANNEL + election id
+TALLY_CHANNEL = "votes:tally:"
+
+# Comment line sent to idle watchers so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+
+
+async def publish_tally_delta(redis: Redis | None, election_id: int, ballots: int, candidate_deltas: Dict[str, int]):
+    """Announce ballots that were just counted. A failed publish never fails the ballot."""
+    if redis is None or ballots <= 0:
+        return
+    try:
+        await redis.publish(
+            f"{TALLY_CHANNEL}{election_id}",
+            json.dumps({"ballots": ballots, "candidates": candidate_deltas})
+        )
+    except Exception as e:
+        print(f"Error publishing tally delta for election {election_id}: {str(e)}")
+
+
+@dataclass
+class _Tally:
+    ballots: int
+    eligible_voters: int
+    candidates: Counter
+    # Queue of every watcher -> whether it may see per-candidate counts
+    watchers: Dict[asyncio.Queue, bool] = field(default_factory=dict)
+    dirty: bool = False
+
+    def render(self, election_id: int, with_candidates: bool) -> str:
+        data = {
+            "election_id": election_id,
+            "ballots_cast": self.ballots,
+            "eligible_voters": self.eligible_voters,
+            "turnout_percentage": round(self.ballots / self.eligible_voters * 100, 2) if self.eligible_voters else 0,
+        }
+        if with_candidates:
+            data["candidates"] = dict(self.candidates)
+        return f"event: tally\ndata: {json.dumps(data)}\n\n"
+
+
+class LiveTallyHub:
+    """
+    Per-process fan-out of running tallies to Server-Sent Events watchers.
+
+    Every process holds one Redis pattern subscription to the tally deltas
+    published when ballots are counted, and keeps a running tally only for the
+    elections somebody in this process is watching. A tally is loaded from the
+    database when its first watcher arrives and reloaded every
+    LIVE_TALLY_RESYNC_SECONDS to correct deltas missed around the load or while
+    Redis was unreachable. Changed tallies are rendered once per tick, at most
+    LIVE_TALLY_MAX_UPDATES_PER_SECOND times a second, and handed to every
+    watcher; a watcher that has not consumed the previous update only gets the
+    newest one.
+    """
+
+    def __init__(self, max_updates_per_second: float, resync_seconds: int):
+        self.interval = 1 / max_updates_per_second
+        self.resync_seconds = resync_seconds
+        self.redis: Redis | None = None
+        self.tallies: Dict[int, _Tally] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self.tasks = []
+
+    def start(self, redis: Redis):
+        """Start following tally deltas"""
+        if not self.tasks:
+            self.redis = redis
+            self.tasks = [
+                asyncio.create_task(self._listen()),
+                asyncio.create_task(self._broadcast()),
+                asyncio.create_task(self._resync()),
+            ]
+            print("Live tally hub started")
+
+    async def stop(self):
+        """Stop following tally deltas"""
+        if self.tasks:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks = []
+            self.tallies.clear()
+            print("Live tally hub stopped")
+
+    async def watch(self, election_id: int, with_candidates: bool) -> AsyncIterator[str]:
+        """Server-Sent Events for one watcher: the current tally, then every coalesced update"""
+        queue = asyncio.Queue(maxsize=1)
+        tally = await self._subscribe(election_id, queue, with_candidates)
+        try:
+            yield tally.render(election_id, with_candidates)
+            while True:
+                try:
+                    turnout_event, full_event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield full_event if with_candidates else turnout_event
+        finally:
+            self._unsubscribe(election_id, queue)
+
+    async def _subscribe(self, election_id: int, queue: asyncio.Queue, with_candidates: bool) -> _Tally:
+        lock = self._locks.setdefault(election_id, asyncio.Lock())
+        async with lock:
+            tally = self.tallies.get(election_id)
+            if tally is None:
+                tally = await self._load(election_id)
+                self.tallies[election_id] = tally
+            tally.watchers[queue] = with_candidates
+        return tally
+
+    def _unsubscribe(self, election_id: int, queue: asyncio.Queue):
+        tally = self.tallies.get(election_id)
+        if tally is None:
+            return
+        tally.watchers.pop(queue, None)
+        if not tally.watchers:
+            self.tallies.pop(election_id, None)
+            lock = self._locks.get(election_id)
+            if lock is not None and not lock.locked():
+                self._locks.pop(election_id, None)
+
+    @staticmethod
+    async def _load(election_id: int) -> _Tally:
+        async with SessionLocal() as db:
+            ballots, counts = await VoteCounter.current_counts(election_id, db)
+            eligible_result = await db.execute(
+                select(func.count(Voter.voter_hashed_national_id)).where(Voter.election_id == election_id)
+            )
+            eligible_voters = eligible_result.scalar() or 0
+        return _Tally(ballots, eligible_voters, Counter(counts))
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{TALLY_CHANNEL}*")
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        tally = self.tallies.get(int(message["channel"][len(TALLY_CHANNEL):]))
+                        if tally is None:
+                            continue
+                        delta = json.loads(message["data"])
+                        tally.ballots += delta["ballots"]
+                        tally.candidates.update(delta["candidates"])
+                        tally.dirty = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in live tally subscription: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def _broadcast(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for election_id, tally in list(self.tallies.items()):
+                if not tally.dirty:
+                    continue
+                tally.dirty = False
+                events = self._render_events(election_id, tally)
+                for queue in list(tally.watchers):
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(events)
+
+    @staticmethod
+    def _render_events(election_id: int, tally: _Tally) -> Tuple[str, str | None]:
+        turnout_event = tally.render(election_id, False)
+        full_event = tally.render(election_id, True) if any(tally.watchers.values()) else None
+        return turnout_event, full_event
+
+    async def _resync(self):
+        while True:
+            await asyncio.sleep(self.resync_seconds)
+            for election_id in list(self.tallies):
+                try:
+                    fresh = await self._load(election_id)
+                except Exception as e:
+                    print(f"Error reloading live tally of election {election_id}: {str(e)}")
+                    continue
+                tally = self.tallies.get(election_id)
+                if tally is None:
+                    continue
+                tally.ballots = fresh.ballots
+                tally.eligible_voters = fresh.eligible_voters
+                tally.candidates = fresh.candidates
+                tally.dirty = True
+
+
+# Global hub instance
+live_tally_hub = LiveTallyHub(settings.LIVE_TALLY_MAX_UPDATES_PER_SECOND, settings.LIVE_TALLY_RESYNC_SECONDS)
+
+
+def start_live_tally_hub(redis: Redis):
+    """Start streaming live tallies"""
+    live_tally_hub.start(redis)
+
+
+async def stop_live_tally_hub():
+    """Stop streaming live tallies"""
+    await live_tally_hub.stop()
@@ -0,0 +1,164 @@
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List, Literal, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from redis.asyncio import Redis
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from core.dependencies import SessionLocal
+from models.voting_process import VotingProcess
+from services.election_results import REGION_LEVELS, ElectionResultsService
+
+ExportDataset = Literal["candidates", "regions", "ballots"]
+ExportFormat = Literal["csv", "parquet"]
+
+# Column names and types of every dataset
+EXPORT_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    "candidates": [
+        ("position", "int"),
+        ("hashed_national_id", "str"),
+        ("name", "str"),
+        ("party", "str"),
+        ("vote_count", "int"),
+        ("vote_percentage", "float"),
+        ("rank", "int"),
+        ("is_winner", "bool"),
+    ],
+    "regions": [
+        ("level", "str"),
+        ("region", "str"),
+        ("hashed_national_id", "str"),
+        ("name", "str"),
+        ("party", "str"),
+        ("vote_count", "int"),
+        ("vote_percentage", "float"),
+        ("rank", "int"),
+        ("is_winner", "bool"),
+    ],
+    "ballots": [
+        ("cast_at", "timestamp"),
+    ],
+}
+
+# Rows fetched from the server-side cursor and written per chunk
+EXPORT_BATCH_ROWS = 10000
+
+
+class ResultsExportService:
+    """
+    Bulk exports of a finished election as CSV or Parquet.
+
+    Candidate and regional rows come from the results snapshot. Ballots are read
+    through a server-side cursor in batches of EXPORT_BATCH_ROWS and each batch
+    is encoded and sent before the next one is fetched, so memory stays flat and
+    the first bytes leave before the last ballot is read. Ballots are exported
+    as their cast time only, truncated to the second, with no voter or receipt.
+    """
+
+    @staticmethod
+    async def snapshot_rows(
+        election_id: int, dataset: ExportDataset, db, redis: Redis | None = None
+    ) -> List[Tuple[Any, ...]]:
+        """Rows of a snapshot-backed dataset; raises ValueError like the results routes"""
+        if dataset == "candidates":
+            results = await ElectionResultsService.get_election_results(election_id, db, redis)
+            return [
+                (c["position"], c["hashed_national_id"], c["name"], c["party"], c["vote_count"],
+                 c["vote_percentage"], c["rank"], c["is_winner"])
+                for c in results["results"]["candidates"]
+            ]
+
+        rows = []
+        for level in REGION_LEVELS:
+            regional = await ElectionResultsService.get_regional_results(election_id, level, db, redis)
+            for region in regional["regions"]:
+                rows += [
+                    (level, region["region"], c["hashed_national_id"], c["name"], c["party"], c["vote_count"],
+                     c["vote_percentage"], c["rank"], c["is_winner"])
+                    for c in region["candidates"]
+                ]
+        return rows
+
+    @staticmethod
+    async def batches_of(rows: List[Tuple[Any, ...]]) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        for start in range(0, len(rows), EXPORT_BATCH_ROWS):
+            yield rows[start:start + EXPORT_BATCH_ROWS]
+
+    @staticmethod
+    async def ballot_batches(election_id: int) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        """Ballot cast times in batches, on a session of its own that lives as long as the stream"""
+        async with SessionLocal() as db:
+            ballots = await db.stream(
+                select(func.date_trunc("second", VotingProcess.created_at))
+                .where(VotingProcess.election_id == election_id)
+                .execution_options(yield_per=EXPORT_BATCH_ROWS)
+            )
+            async for partition in ballots.partitions():
+                yield [tuple(row) for row in partition]
+
+    @staticmethod
+    async def encode_csv(dataset: ExportDataset, batches: AsyncIterator[List[Tuple[Any, ...]]]) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _ in EXPORT_COLUMNS[dataset]])
+        async for rows in batches:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def parquet_schema(dataset: ExportDataset) -> pa.Schema:
+        """Arrow schema of a dataset"""
+        types = {
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "str": pa.string(),
+            "bool": pa.bool_(),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+        }
+        return pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS[dataset]])
+
+    @staticmethod
+    async def encode_parquet(schema: pa.Schema, batches: AsyncIterator[List[Tuple[Any, ...]]]) -> AsyncIterator[bytes]:
+        """One row group per batch, sent as soon as it is written; the footer goes last"""
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, schema) as writer:
+            async for rows in batches:
+                columns = list(zip(*rows)) if rows else [[] for _ in schema.names]
+                writer.write_batch(pa.record_batch([list(column) for column in columns], schema=schema))
+                chunk = sink.take()
+                if chunk:
+                    yield chunk
+        chunk = sink.take()
+        if chunk:
+            yield chunk
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what the Parquet writer produced since the last take()"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
@@ -0,0 +1,152 @@
+import asyncio
+from typing import Dict, Iterable, List, Set
+
+from redis.asyncio import Redis
+from sqlalchemy import and_, exists, not_, or_
+from sqlalchemy.future import select
+
+from core.dependencies import SessionLocal
+from core.settings import settings
+from models.candidate_participation import CandidateParticipation
+from models.election import Election
+from models.election_result_snapshot import ElectionResultSnapshot
+from services.election_results import CountingInProgress, ElectionResultsService
+
+
+class ResultsFinalizer:
+    """
+    Background finalization of finished elections.
+
+    The status scheduler hands over finished elections that have not been
+    finalized yet; a fixed number of workers rank their candidates and build
+    their results snapshot, so the first viewer after an election closes reads
+    a stored snapshot. The queue is bounded and the worker count caps how many
+    tallies run against the database at once: elections that do not fit are
+    simply picked up again on a later scheduler run.
+
+    An election is only finalized once all its ballots are counted, so it waits
+    out the settle period and the vote buffer without that counting as a
+    failure. One that fails max_attempts times is left alone until a restart
+    or a manual finalize.
+    """
+
+    def __init__(self, workers: int, queue_size: int, max_attempts: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.redis: Redis | None = None
+        self.queue: asyncio.Queue | None = None
+        self.tasks: List[asyncio.Task] = []
+        # Elections queued or being finalized, so repeated scheduler runs don't enqueue them twice
+        self.scheduled: Set[int] = set()
+        # Failed finalizations per election
+        self.failures: Dict[int, int] = {}
+
+    def start(self, redis: Redis):
+        """Start the finalization workers"""
+        if not self.tasks:
+            self.redis = redis
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+            print(f"Results finalizer started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers; unfinished elections are found again after a restart"""
+        if self.tasks:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks = []
+            self.queue = None
+            self.scheduled.clear()
+            self.failures.clear()
+            print("Results finalizer stopped")
+
+    @staticmethod
+    async def find_unfinalized_elections(db, limit: int, skipped: Iterable[int] = ()) -> List[int]:
+        """Finished elections without a results snapshot or with candidates not ranked yet"""
+        has_snapshot = exists().where(ElectionResultSnapshot.election_id == Election.id)
+        has_unranked_candidate = exists().where(
+            and_(
+                CandidateParticipation.election_id == Election.id,
+                CandidateParticipation.rank.is_(None)
+            )
+        )
+        result = await db.execute(
+            select(Election.id)
+            .where(
+                Election.status == "finished",
+                or_(not_(has_snapshot), has_unranked_candidate),
+                Election.id.not_in(list(skipped))
+            )
+            .order_by(Election.ends_at)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def enqueue_finished_elections(self, db) -> int:
+        """Queue unfinalized elections for the workers, as many as the queue has room for"""
+        if self.queue is None:
+            return 0
+
+        room = self.queue.maxsize - self.queue.qsize()
+        if room <= 0:
+            return 0
+
+        given_up = [election_id for election_id, failures in self.failures.items() if failures >= self.max_attempts]
+        enqueued = 0
+        for election_id in await self.find_unfinalized_elections(db, room + len(self.scheduled), given_up):
+            if election_id in self.scheduled:
+                continue
+            try:
+                self.queue.put_nowait(election_id)
+            except asyncio.QueueFull:
+                break
+            self.scheduled.add(election_id)
+            enqueued += 1
+        return enqueued
+
+    async def _work(self):
+        while True:
+            election_id = await self.queue.get()
+            try:
+                await self.finalize(election_id)
+                self.failures.pop(election_id, None)
+            except asyncio.CancelledError:
+                raise
+            except CountingInProgress:
+                # Picked up again by a later scheduler run
+                pass
+            except Exception as e:
+                failures = self.failures[election_id] = self.failures.get(election_id, 0) + 1
+                print(f"Error finalizing results of election {election_id} (attempt {failures}): {str(e)}")
+                if failures >= self.max_attempts:
+                    print(f"Giving up finalizing election {election_id} after {failures} attempts")
+            finally:
+                self.scheduled.discard(election_id)
+                self.queue.task_done()
+
+    async def finalize(self, election_id: int):
+        """Rank the candidates and store the results snapshot, once every ballot is counted"""
+        vote_buffer = self.redis if settings.BUFFERED_VOTE_INGEST else None
+        async with SessionLocal() as db:
+            await ElectionResultsService.ensure_counting_complete(election_id, db, vote_buffer)
+            await ElectionResultsService.update_candidate_rankings(election_id, db)
+            await ElectionResultsService.build_results_snapshot(election_id, db, vote_buffer)
+        print(f"Finalized results of election {election_id}")
+
+
+# Global finalizer instance
+results_finalizer = ResultsFinalizer(
+    settings.RESULTS_FINALIZER_WORKERS, settings.RESULTS_FINALIZER_QUEUE_SIZE, settings.RESULTS_FINALIZER_MAX_ATTEMPTS
+)
+
+
+def start_results_finalizer(redis: Redis):
+    """Start finalizing finished elections in the background"""
+    results_finalizer.start(redis)
+
+
+async def stop_results_finalizer():
+    """Stop the results finalization workers"""
+    await results_finalizer.stop()
@@ -0,0 +1,299 @@
+import random
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+from sqlalchemy import String, desc, literal
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.future import select
+
+from models.candidate_participation import CandidateParticipation
+from models.election import Election
+from models.ranked_ballot import RankedBallot
+
+# Methods tabulated from whole ballots; the others only need the vote counters
+RANKED_METHODS = frozenset({"borda", "irv", "stv"})
+
+# Ballot matrix methods: (ballots, number of candidates, seats) -> tabulation
+TABULATORS: Dict[str, Callable[[np.ndarray, int, int], Dict[str, Any]]] = {}
+
+
+def register_tabulator(method: str):
+    """Register a ballot matrix tabulator for a tabulation method"""
+    def register(tabulate):
+        TABULATORS[method] = tabulate
+        return tabulate
+    return register
+
+
+def candidate_order(candidate_ids: Iterable[str]) -> List[str]:
+    """The candidate ids the columns of a tabulation index into"""
+    return sorted(candidate_ids)
+
+
+def record_ranking(recorded_ballot, ranking: List[str]):
+    """
+    Build the insert storing one ballot's ranking, for use as a CTE next to the
+    ballot's counters: nothing is stored when `recorded_ballot` returns no row.
+    The ranking shares the voting process's transaction, see RankedBallot.
+    """
+    return insert(RankedBallot).from_select(
+        ["election_id", "rankings"],
+        select(recorded_ballot.c.election_id, literal(ranking, ARRAY(String)))
+    )
+
+
+def _first_choices(ballots: np.ndarray, continuing: np.ndarray):
+    """Each ballot's most preferred continuing candidate, and which ballots still have one"""
+    ranked = ballots >= 0
+    active = ranked & continuing[np.where(ranked, ballots, 0)]
+    has_choice = active.any(axis=1)
+    top = ballots[np.arange(len(ballots)), active.argmax(axis=1)]
+    return top[has_choice], has_choice
+
+
+def _lowest(tallies: np.ndarray, history: List[np.ndarray], continuing: np.ndarray) -> int:
+    """
+    Continuing candidate to eliminate. Ties are broken by the earliest round
+    looking backwards in which the tied candidates differ, then by candidate order.
+    """
+    tied = np.flatnonzero(continuing & (tallies == tallies[continuing].min()))
+    for previous in reversed(history):
+        if len(tied) == 1:
+            break
+        tied = tied[previous[tied] == previous[tied].min()]
+    return int(tied[-1])
+
+
+def _finishing_order(counted: Dict[str, Any], num_candidates: int) -> List[int]:
+    """Winners in the order elected, then the others by how long they stayed in the count"""
+    winners = list(counted["winners"])
+    eliminated = [round_["eliminated"] for round_ in counted["rounds"] if round_["eliminated"] is not None]
+    last_tallies = counted["rounds"][-1]["tallies"] if counted["rounds"] else np.zeros(num_candidates)
+    placed = set(winners) | set(eliminated)
+    remaining = [
+        int(candidate) for candidate in np.lexsort((np.arange(num_candidates), -last_tallies))
+        if candidate not in placed
+    ]
+    return winners + remaining + eliminated[::-1]
+
+
+@register_tabulator("borda")
+def tabulate_borda(ballots: np.ndarray, num_candidates: int, seats: int) -> Dict[str, Any]:
+    """
+    Each ranking position is worth (ranking positions - position) points, so
+    a first preference is worth the same on a short ballot as on a full one
+    """
+    positions = ballots.shape[1]
+    points = np.broadcast_to(np.arange(positions, 0, -1), ballots.shape)
+    ranked = ballots >= 0
+    scores = np.bincount(ballots[ranked], weights=points[ranked], minlength=num_candidates)
+    order = np.lexsort((np.arange(num_candidates), -scores))
+    return {"scores": scores, "winners": [int(candidate) for candidate in order[:seats] if scores[candidate] > 0], "rounds": []}
+
+
+@register_tabulator("irv")
+def tabulate_irv(ballots: np.ndarray, num_candidates: int, seats: int) -> Dict[str, Any]:
+    """Instant runoff: eliminate the weakest candidate until one holds a majority of continuing ballots"""
+    continuing = np.ones(num_candidates, dtype=bool)
+    history = []
+    rounds = []
+    while True:
+        top, _ = _first_choices(ballots, continuing)
+        tallies = np.bincount(top, minlength=num_candidates).astype(np.float64)
+        history.append(tallies)
+        if tallies.sum() == 0:
+            rounds.append({"tallies": tallies, "elected": None, "eliminated": None})
+            return {"winners": [], "rounds": rounds}
+
+        leader = int(np.argmax(np.where(continuing, tallies, -1)))
+        if tallies[leader] * 2 > tallies.sum() or continuing.sum() == 1:
+            rounds.append({"tallies": tallies, "elected": leader, "eliminated": None})
+            return {"winners": [leader], "rounds": rounds}
+
+        eliminated = _lowest(tallies, history[:-1], continuing)
+        continuing[eliminated] = False
+        rounds.append({"tallies": tallies, "elected": None, "eliminated": eliminated})
+
+
+@register_tabulator("stv")
+def tabulate_stv(ballots: np.ndarray, num_candidates: int, seats: int) -> Dict[str, Any]:
+    """
+    Single transferable vote with the Droop quota. Surpluses are transferred by
+    scaling the weight of every ballot held by the elected candidate (Gregory method).
+    """
+    if not len(ballots):
+        return {"quota": 1.0, "winners": [], "rounds": []}
+
+    weights = np.ones(len(ballots))
+    continuing = np.ones(num_candidates, dtype=bool)
+    quota = np.floor((ballots[:, 0] >= 0).sum() / (seats + 1)) + 1
+    winners = []
+    history = []
+    rounds = []
+    while len(winners) < seats and continuing.any():
+        top, has_choice = _first_choices(ballots, continuing)
+        tallies = np.bincount(top, weights=weights[has_choice], minlength=num_candidates)
+        history.append(tallies)
+
+        remaining_seats = seats - len(winners)
+        if continuing.sum() <= remaining_seats:
+            elected = [int(c) for c in np.lexsort((np.arange(num_candidates), -tallies)) if continuing[c]]
+            winners += elected
+            rounds.append({"tallies": tallies, "elected": elected, "eliminated": None})
+            break
+
+        reached = continuing & (tallies >= quota)
+        if reached.any():
+            elected = int(np.argmax(np.where(reached, tallies, -1)))
+            winners.append(elected)
+            continuing[elected] = False
+            held = np.zeros(len(ballots), dtype=bool)
+            held[has_choice] = top == elected
+            weights[held] *= (tallies[elected] - quota) / tallies[elected]
+            rounds.append({"tallies": tallies, "elected": [elected], "eliminated": None})
+        else:
+            eliminated = _lowest(tallies, history[:-1], continuing)
+            continuing[eliminated] = False
+            rounds.append({"tallies": tallies, "elected": [], "eliminated": eliminated})
+
+    return {"quota": float(quota), "winners": winners, "rounds": rounds}
+
+
+class TabulationService:
+    """
+    Determines election winners according to the election's tabulation method.
+
+    Plurality and approval elections are decided by the vote counters. Ranked
+    ballots are stored as candidate ids and loaded into an (ballots x ranking
+    positions) int16 matrix of indexes into the candidates participating at
+    tally time, padded with -1, and counted with whole-array NumPy
+    operations per round, so a round costs the same few vector passes whatever
+    the number of ballots.
+    """
+
+    # Rows per multi-row INSERT of rankings
+    INSERT_ROWS = 5000
+
+    @staticmethod
+    async def store_rankings(election_id: int, rankings: List[List[str]], db) -> None:
+        """
+        Store the rankings of ballots being recorded in the current transaction,
+        in random order so their rows do not follow the order of the voters
+        """
+        rankings = list(rankings)
+        random.SystemRandom().shuffle(rankings)
+        for start in range(0, len(rankings), TabulationService.INSERT_ROWS):
+            await db.execute(
+                insert(RankedBallot).values([
+                    {"election_id": election_id, "rankings": ranking}
+                    for ranking in rankings[start:start + TabulationService.INSERT_ROWS]
+                ])
+            )
+
+    @staticmethod
+    async def load_ballots(
+        election_id: int, candidate_ids: List[str], positions: int, db, batch_size: int = 50000
+    ) -> np.ndarray:
+        """
+        The election's ranked ballots as a padded matrix of indexes into
+        `candidate_ids`. Candidates no longer participating are dropped from
+        the rankings, moving the later preferences up.
+        """
+        candidate_indexes = {candidate_id: index for index, candidate_id in enumerate(candidate_ids)}
+        chunks = []
+        padding = [-1] * positions
+        rankings = await db.stream_scalars(
+            select(RankedBallot.rankings)
+            .where(RankedBallot.election_id == election_id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in rankings.partitions():
+            indexes = [
+                [candidate_indexes[candidate_id] for candidate_id in ranking if candidate_id in candidate_indexes]
+                for ranking in partition
+            ]
+            chunks.append(np.array(
+                [ranking[:positions] + padding[len(ranking):] for ranking in indexes], dtype=np.int16
+            ))
+        if not chunks:
+            return np.empty((0, positions), dtype=np.int16)
+        return np.concatenate(chunks)
+
+    @staticmethod
+    async def tabulate(election_id: int, db) -> Dict[str, Any]:
+        """
+        Tabulate an election. Returns the method, seats, winners (candidate ids)
+        and, for ranked methods, the counting rounds, first preference counts
+        and final ranks keyed by candidate id.
+        """
+        election_result = await db.execute(
+            select(Election.tabulation_method, Election.seats, Election.num_of_votes_per_voter)
+            .where(Election.id == election_id)
+        )
+        election = election_result.one_or_none()
+        if not election:
+            raise ValueError("Election not found")
+
+        counters_result = await db.execute(
+            select(CandidateParticipation.candidate_hashed_national_id, CandidateParticipation.vote_count)
+            .where(CandidateParticipation.election_id == election_id)
+            .order_by(desc(CandidateParticipation.vote_count), CandidateParticipation.candidate_hashed_national_id)
+        )
+        counters = counters_result.all()
+
+        tabulation = {"method": election.tabulation_method, "seats": election.seats}
+        if election.tabulation_method not in RANKED_METHODS:
+            # The seats-th highest count and everyone tied with it win
+            counts = [vote_count for _, vote_count in counters]
+            threshold = counts[election.seats - 1] if len(counts) >= election.seats else 0
+            tabulation["winners"] = [
+                candidate_id for candidate_id, vote_count in counters
+                if vote_count > 0 and vote_count >= threshold
+            ]
+            return tabulation
+
+        candidate_ids = candidate_order(candidate_id for candidate_id, _ in counters)
+        ballots = await TabulationService.load_ballots(election_id, candidate_ids, election.num_of_votes_per_voter, db)
+        counted = TABULATORS[election.tabulation_method](ballots, len(candidate_ids), election.seats)
+
+        def by_candidate(values: np.ndarray) -> Dict[str, float]:
+            return {candidate_ids[index]: round(float(value), 4) for index, value in enumerate(values)}
+
+        def ids(indexes):
+            if indexes is None:
+                return None
+            if isinstance(indexes, list):
+                return [candidate_ids[index] for index in indexes]
+            return candidate_ids[indexes]
+
+        first_choices = ballots[:, 0] if ballots.shape[1] else np.empty(0, dtype=np.int16)
+        first_preferences = np.bincount(first_choices[first_choices >= 0], minlength=len(candidate_ids))
+
+        if "scores" in counted:
+            # Tied scores share a rank
+            scores = counted["scores"]
+            ranks = [int((scores > score).sum()) + 1 for score in scores]
+        else:
+            ranks = [0] * len(candidate_ids)
+            for place, index in enumerate(_finishing_order(counted, len(candidate_ids))):
+                ranks[index] = place + 1
+
+        tabulation["ballots_counted"] = len(ballots)
+        tabulation["first_preferences"] = {
+            candidate_id: int(count) for candidate_id, count in zip(candidate_ids, first_preferences)
+        }
+        tabulation["ranks"] = dict(zip(candidate_ids, ranks))
+        tabulation["winners"] = ids(counted["winners"])
+        tabulation["rounds"] = [
+            {
+                "tallies": by_candidate(round_["tallies"]),
+                "elected": ids(round_["elected"]),
+                "eliminated": ids(round_["eliminated"]),
+            }
+            for round_ in counted["rounds"]
+        ]
+        if "scores" in counted:
+            tabulation["scores"] = by_candidate(counted["scores"])
+        if "quota" in counted:
+            tabulation["quota"] = counted["quota"]
+        return tabulation
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import Integer, String, and_, any_, bindparam, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.future import select
+
+from models.election import Election
+from models.turnout_bucket import TurnoutBucket
+from models.voter import Voter
+from models.voting_process import VotingProcess
+
+
+class TurnoutService:
+    """
+    Turnout over time, pre-aggregated per election, minute and voter governorate.
+
+    Every path that records ballots adds them to `turnout_buckets` in the same
+    transaction, so reading a turnout series costs one row per bucket instead
+    of a scan over the election's voting processes.
+    """
+
+    @staticmethod
+    def count_ballots(recorded_ballots, shard: int = 0):
+        """
+        Build the upsert adding ballots to their buckets.
+
+        `recorded_ballots` is a selectable (typically the CTE of a voting process
+        insert) with election_id, voter_hashed_national_id and created_at columns.
+        """
+        bucket_start = func.date_trunc("minute", recorded_ballots.c.created_at)
+        governorate = func.coalesce(Voter.governerate, "")
+        upsert = insert(TurnoutBucket).from_select(
+            ["election_id", "bucket_start", "governorate", "shard", "ballots"],
+            select(
+                recorded_ballots.c.election_id,
+                bucket_start,
+                governorate,
+                literal(shard, Integer),
+                func.count()
+            )
+            .select_from(recorded_ballots)
+            .outerjoin(
+                Voter,
+                and_(
+                    Voter.voter_hashed_national_id == recorded_ballots.c.voter_hashed_national_id,
+                    Voter.election_id == recorded_ballots.c.election_id
+                )
+            )
+            .group_by(recorded_ballots.c.election_id, bucket_start, governorate)
+            .order_by(recorded_ballots.c.election_id, bucket_start, governorate)
+        )
+        return upsert.on_conflict_do_update(
+            index_elements=[
+                TurnoutBucket.election_id,
+                TurnoutBucket.bucket_start,
+                TurnoutBucket.governorate,
+                TurnoutBucket.shard
+            ],
+            set_={"ballots": TurnoutBucket.ballots + upsert.excluded.ballots}
+        )
+
+    @staticmethod
+    def count_recorded_voters(election_id: int, voter_ids: List[str]):
+        """Build the upsert adding the already inserted ballots of the given voters to their buckets"""
+        recorded_ballots = (
+            select(VotingProcess.election_id, VotingProcess.voter_hashed_national_id, VotingProcess.created_at)
+            .where(
+                VotingProcess.election_id == election_id,
+                VotingProcess.voter_hashed_national_id == any_(bindparam("voter_ids", voter_ids, type_=ARRAY(String)))
+            )
+            .subquery("recorded_ballots")
+        )
+        return TurnoutService.count_ballots(recorded_ballots)
+
+    @staticmethod
+    async def get_turnout_series(
+        election_id: int, db, interval_minutes: int = 1, by_governorate: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Ballots cast per `interval_minutes`, counted from the election start and
+        optionally split by governorate. Intervals without ballots are omitted.
+        """
+        election_result = await db.execute(
+            select(Election.starts_at, Election.ends_at)
+            .where(Election.id == election_id)
+        )
+        election = election_result.one_or_none()
+        if not election:
+            raise ValueError("Election not found")
+
+        interval_start = func.date_bin(
+            literal(timedelta(minutes=interval_minutes)), TurnoutBucket.bucket_start, literal(election.starts_at)
+        ).label("interval_start")
+        columns = [interval_start]
+        if by_governorate:
+            columns.append(TurnoutBucket.governorate)
+
+        series_result = await db.execute(
+            select(*columns, func.sum(TurnoutBucket.ballots).label("ballots"))
+            .where(TurnoutBucket.election_id == election_id)
+            .group_by(*columns)
+            .order_by(*columns)
+        )
+
+        series = []
+        total_ballots = 0
+        for row in series_result.all():
+            point = {"interval_start": row.interval_start, "ballots": int(row.ballots)}
+            if by_governorate:
+                point["governorate"] = row.governorate or None
+            series.append(point)
+            total_ballots += int(row.ballots)
+
+        return {
+            "election_id": election_id,
+            "starts_at": election.starts_at,
+            "ends_at": election.ends_at,
+            "interval_minutes": interval_minutes,
+            "total_ballots": total_ballots,
+            "series": series,
+        }
@@ -0,0 +1,348 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import List, Set
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from sqlalchemy.dialects.postgresql import insert
+
+from core.dependencies import SessionLocal
+from core.settings import settings
+from models.voting_process import VotingProcess
+from services.ballot_integrity import sum_receipts
+from services.election_cache import election_cache
+from services.live_tally import publish_tally_delta
+from services.tabulation import RANKED_METHODS, TabulationService
+from services.turnout import TurnoutService
+from services.vote_counter import VoteCounter
+
+BALLOT_STREAM = "votes:ballots"
+WRITER_GROUP = "vote-writers"
+
+# Acknowledge and delete entries; an election's pending count only drops for
+# entries this call acknowledged, so an entry handled twice (claimed by another
+# consumer meanwhile) is not subtracted twice. ARGV: group, then (entry id,
+# pending count key or '') pairs.
+_ACK_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    if redis.call('XACK', KEYS[1], ARGV[1], ARGV[i]) == 1 and ARGV[i + 1] ~= '' then
+        redis.call('DECR', ARGV[i + 1])
+    end
+    redis.call('XDEL', KEYS[1], ARGV[i])
+end
+return true
+"""
+
+# Ballots that failed VOTE_BUFFER_MAX_DELIVERIES times, kept with their entry id for inspection
+DEAD_LETTER_STREAM = "votes:dead-letter"
+
+# Claim the voter and queue the ballot atomically: the ballot only enters the
+# stream if this request is the first to claim the (election, voter) key, and
+# is counted as pending for its election until the consumer acknowledges it.
+_SUBMIT_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    redis.call('INCR', KEYS[3])
+    redis.call('EXPIRE', KEYS[3], ARGV[2])
+    return redis.call('XADD', KEYS[2], '*', 'election_id', ARGV[3], 'voter', ARGV[4], 'candidates', ARGV[5], 'cast_at', ARGV[1], 'receipt', ARGV[6])
+end
+return false
+"""
+
+
+class VoteBuffer:
+    """Redis side of buffered vote ingestion"""
+
+    @staticmethod
+    def dedupe_key(election_id: int, voter_hashed_national_id: str) -> str:
+        return f"votes:cast:{election_id}:{voter_hashed_national_id}"
+
+    @staticmethod
+    def pending_key(election_id: int) -> str:
+        return f"votes:pending:{election_id}"
+
+    @staticmethod
+    async def pending_ballots(redis: Redis, election_id: int) -> int:
+        """Ballots of the election accepted by the buffer and not yet written (or dead-lettered)"""
+        return max(int(await redis.get(VoteBuffer.pending_key(election_id)) or 0), 0)
+
+    @staticmethod
+    async def submit(
+        redis: Redis,
+        election_id: int,
+        voter_hashed_national_id: str,
+        candidate_ids: List[str],
+        cast_at: datetime,
+        receipt: str,
+    ) -> bool:
+        """
+        Queue a validated ballot for the background writer.
+        Returns False when the voter already has a ballot queued or recorded.
+        """
+        entry_id = await redis.eval(
+            _SUBMIT_SCRIPT,
+            3,
+            VoteBuffer.dedupe_key(election_id, voter_hashed_national_id),
+            BALLOT_STREAM,
+            VoteBuffer.pending_key(election_id),
+            cast_at.isoformat(),
+            settings.VOTE_BUFFER_DEDUPE_TTL_SECONDS,
+            election_id,
+            voter_hashed_national_id,
+            json.dumps(candidate_ids),
+            receipt,
+        )
+        return entry_id is not None
+
+    @staticmethod
+    async def claim_voters(redis: Redis, election_id: int, voter_ids: List[str], cast_at: datetime) -> Set[str]:
+        """
+        Claim voters whose ballots are written to the database directly rather than
+        through the stream, so the buffer rejects their later submissions.
+        Returns the voters that were not claimed already.
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            for voter_id in voter_ids:
+                pipe.set(
+                    VoteBuffer.dedupe_key(election_id, voter_id),
+                    cast_at.isoformat(),
+                    nx=True,
+                    ex=settings.VOTE_BUFFER_DEDUPE_TTL_SECONDS,
+                )
+            claimed = await pipe.execute()
+        return {voter_id for voter_id, was_claimed in zip(voter_ids, claimed) if was_claimed}
+
+    @staticmethod
+    async def release_voters(redis: Redis, election_id: int, voter_ids: List[str]) -> None:
+        """Undo `claim_voters` for ballots that could not be written"""
+        if voter_ids:
+            await redis.delete(*(VoteBuffer.dedupe_key(election_id, voter_id) for voter_id in voter_ids))
+
+    @staticmethod
+    async def has_pending_ballot(redis: Redis, election_id: int, voter_hashed_national_id: str) -> bool:
+        """Whether the voter's ballot was accepted by the buffer (flushed or not)"""
+        return bool(await redis.exists(VoteBuffer.dedupe_key(election_id, voter_hashed_national_id)))
+
+
+class VoteBufferConsumer:
+    """
+    Background writer draining the ballot stream into PostgreSQL.
+
+    Each batch is written with one multi-row INSERT ... ON CONFLICT DO NOTHING into
+    voting_processes and one aggregated counter update per election, then
+    acknowledged. A batch that was committed but not acknowledged (e.g. the process
+    died in between) is written again by whichever consumer claims it, and the
+    conflict clause keeps it from being counted twice.
+
+    A batch that fails is retried at once one entry at a time, so a bad ballot
+    only holds back itself. Entries still unacknowledged after
+    VOTE_BUFFER_RETRY_MS, whichever consumer read them, are claimed and retried
+    every VOTE_BUFFER_RETRY_MS however busy the stream is; after
+    VOTE_BUFFER_MAX_DELIVERIES deliveries an entry is moved to
+    DEAD_LETTER_STREAM. Its voter stays claimed, so the voter cannot vote again
+    before the ballot is dealt with.
+    """
+
+    def __init__(self):
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self.redis: Redis | None = None
+        self.task: asyncio.Task | None = None
+
+    def start(self, redis: Redis):
+        """Start consuming in the background"""
+        if self.task is None:
+            self.redis = redis
+            self.task = asyncio.create_task(self._run())
+            print("Vote buffer consumer started")
+
+    async def stop(self):
+        """Stop consuming; unacknowledged entries are picked up again on the next start"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+            print("Vote buffer consumer stopped")
+
+    async def _run(self):
+        try:
+            await self.redis.xgroup_create(BALLOT_STREAM, WRITER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        # Entries this consumer read before a restart but never acknowledged
+        pending = await self.redis.xreadgroup(WRITER_GROUP, self.consumer_name, {BALLOT_STREAM: "0"})
+        for _, entries in pending or []:
+            await self._retry_entries(entries)
+
+        next_retry = time.monotonic() + settings.VOTE_BUFFER_RETRY_MS / 1000
+        while True:
+            try:
+                entries = await self.redis.xreadgroup(
+                    WRITER_GROUP,
+                    self.consumer_name,
+                    {BALLOT_STREAM: ">"},
+                    count=settings.VOTE_BUFFER_BATCH_SIZE,
+                    block=settings.VOTE_BUFFER_BLOCK_MS,
+                )
+                if entries:
+                    try:
+                        await self._flush_entries(entries)
+                    except Exception as e:
+                        print(f"Error writing buffered ballots, retrying one by one: {str(e)}")
+                        for _, stream_entries in entries:
+                            await self._retry_entries(stream_entries)
+
+                # Failed entries, and batches left behind by consumers that went away
+                if time.monotonic() >= next_retry:
+                    next_retry = time.monotonic() + settings.VOTE_BUFFER_RETRY_MS / 1000
+                    # [next id, entries] before Redis 7, [next id, entries, deleted ids] since
+                    claimed = await self.redis.xautoclaim(
+                        BALLOT_STREAM,
+                        WRITER_GROUP,
+                        self.consumer_name,
+                        min_idle_time=settings.VOTE_BUFFER_RETRY_MS,
+                        count=settings.VOTE_BUFFER_BATCH_SIZE,
+                    )
+                    await self._retry_entries(claimed[1])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in vote buffer consumer: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def _retry_entries(self, entries) -> None:
+        """Write entries delivered before, dead-lettering those delivered too often"""
+        if not entries:
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entry_id, _ in entries:
+                pipe.xpending_range(BALLOT_STREAM, WRITER_GROUP, min=entry_id, max=entry_id, count=1)
+            pending = await pipe.execute()
+        deliveries = {info["message_id"]: info["times_delivered"] for infos in pending for info in infos}
+
+        retried = []
+        for entry_id, fields in entries:
+            if fields and deliveries.get(entry_id, 0) > settings.VOTE_BUFFER_MAX_DELIVERIES:
+                await self._dead_letter(entry_id, fields, deliveries[entry_id])
+            else:
+                retried.append((entry_id, fields))
+
+        try:
+            await self._flush_entries([[BALLOT_STREAM, retried]])
+        except Exception as e:
+            print(f"Error writing {len(retried)} retried buffered ballots, retrying one by one: {str(e)}")
+            for entry in retried:
+                try:
+                    await self._flush_entries([[BALLOT_STREAM, [entry]]])
+                except Exception as e:
+                    print(f"Error writing buffered ballot {entry[0]}: {str(e)}")
+
+    async def _dead_letter(self, entry_id: str, fields, deliveries: int) -> None:
+        await self.redis.xadd(DEAD_LETTER_STREAM, {**fields, "entry_id": entry_id, "deliveries": deliveries})
+        await self._acknowledge([(entry_id, fields)])
+        print(
+            f"Moved buffered ballot {entry_id} of election {fields.get('election_id')} to {DEAD_LETTER_STREAM} "
+            f"after {deliveries} deliveries"
+        )
+
+    async def _flush_entries(self, streams) -> None:
+        handled = [entry for _, entries in streams or [] for entry in entries]
+        if not handled:
+            return
+
+        ballots = [fields for _, fields in handled if fields]
+        if ballots:
+            await self._write_ballots(ballots)
+
+        await self._acknowledge(handled)
+
+    async def _acknowledge(self, entries) -> None:
+        """Remove handled entries from the stream and from their elections' pending counts, atomically"""
+        arguments = []
+        for entry_id, fields in entries:
+            arguments += [entry_id, VoteBuffer.pending_key(int(fields["election_id"])) if fields else ""]
+        await self.redis.eval(_ACK_SCRIPT, 1, BALLOT_STREAM, WRITER_GROUP, *arguments)
+
+    async def _write_ballots(self, ballots) -> None:
+        candidates_by_voter = {
+            (int(ballot["election_id"]), ballot["voter"]): json.loads(ballot["candidates"])
+            for ballot in ballots
+        }
+        receipts_by_voter = {
+            (int(ballot["election_id"]), ballot["voter"]): ballot.get("receipt")
+            for ballot in ballots
+        }
+
+        async with SessionLocal() as db:
+            inserted = await db.execute(
+                insert(VotingProcess)
+                .values([
+                    {
+                        "voter_hashed_national_id": ballot["voter"],
+                        "election_id": int(ballot["election_id"]),
+                        "created_at": datetime.fromisoformat(ballot["cast_at"]),
+                        "receipt_hash": ballot.get("receipt"),
+                    }
+                    for ballot in ballots
+                ])
+                .on_conflict_do_nothing(
+                    index_elements=[VotingProcess.voter_hashed_national_id, VotingProcess.election_id]
+                )
+                .returning(VotingProcess.election_id, VotingProcess.voter_hashed_national_id)
+            )
+
+            ballots_per_election = Counter()
+            candidate_deltas = defaultdict(Counter)
+            receipts = defaultdict(list)
+            voters = defaultdict(list)
+            for election_id, voter_id in inserted.all():
+                ballots_per_election[election_id] += 1
+                voters[election_id].append(voter_id)
+                candidate_deltas[election_id].update(candidates_by_voter[(election_id, voter_id)])
+                receipts[election_id].append(receipts_by_voter[(election_id, voter_id)])
+
+            for election_id, ballot_count in ballots_per_election.items():
+                await VoteCounter.apply_deltas(
+                    election_id,
+                    ballot_count,
+                    dict(candidate_deltas[election_id]),
+                    db,
+                    receipt_delta=sum_receipts(receipts[election_id])
+                )
+                await db.execute(TurnoutService.count_recorded_voters(election_id, voters[election_id]))
+
+                election = await election_cache.get(election_id, db)
+                if election and election.tabulation_method in RANKED_METHODS:
+                    await TabulationService.store_rankings(
+                        election_id,
+                        [candidates_by_voter[(election_id, voter_id)] for voter_id in voters[election_id]],
+                        db
+                    )
+
+            await db.commit()
+
+        for election_id, ballot_count in ballots_per_election.items():
+            await publish_tally_delta(self.redis, election_id, ballot_count, dict(candidate_deltas[election_id]))
+
+
+# Global consumer instance
+vote_buffer_consumer = VoteBufferConsumer()
+
+
+def start_vote_buffer_consumer(redis: Redis):
+    """Start the buffered vote writer"""
+    vote_buffer_consumer.start(redis)
+
+
+async def stop_vote_buffer_consumer():
+    """Stop the buffered vote writer"""
+    await vote_buffer_consumer.stop()
@@ -0,0 +1,273 @@
+import zlib
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Integer, Numeric, String, column, delete, func, literal, true, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from models.candidate_participation import CandidateParticipation
+from models.election import Election
+from models.vote_counter_shard import VoteCounterShard
+
+# Candidate id of the shard rows counting an election's total ballots
+ELECTION_TOTAL = ""
+
+# Ballot receipt accumulators are sums of 256-bit receipt values modulo 2^256
+RECEIPT_MODULUS = 2 ** 256
+RECEIPT_NUMERIC = Numeric(78, 0)
+
+
+def _receipt_literal(value: int):
+    return literal(Decimal(value % RECEIPT_MODULUS), RECEIPT_NUMERIC)
+
+
+def _fold_receipts(accumulator, amount):
+    """SQL expression adding `amount` to a receipt accumulator column"""
+    return func.mod(accumulator + amount, literal(Decimal(RECEIPT_MODULUS), RECEIPT_NUMERIC))
+
+
+class VoteCounter:
+    """
+    Service owning the vote counters (`Election.total_vote_count` and
+    `CandidateParticipation.vote_count`).
+
+    Counters are never read into Python and written back: every method issues
+    `count = count + n` on the server, so concurrent ballots cannot overwrite each
+    other's increments. Candidate rows are always locked in candidate id order,
+    which keeps two ballots selecting the same candidates in a different order
+    from deadlocking each other.
+
+    The election's receipt accumulator moves together with its total, so the
+    ballots counted and the receipts folded in always match.
+
+    Elections with `counter_shards > 1` do not touch those rows per ballot. Each
+    ballot increments one of N slot rows per candidate in `vote_counter_shards`
+    (picked from the voter id), and `rollup` later drains the slots into the
+    election and participation counters.
+    """
+
+    @staticmethod
+    def shard_for(voter_hashed_national_id: str, shards: int) -> int:
+        """Stable slot number of a voter"""
+        return zlib.crc32(voter_hashed_national_id.encode("utf-8")) % shards
+
+    @staticmethod
+    def count_ballot(
+        election_id: int,
+        candidate_ids: List[str],
+        recorded_ballot,
+        shards: int = 1,
+        voter_hashed_national_id: str | None = None,
+        receipt_value: int = 0,
+    ):
+        """
+        Build the statement counting one ballot.
+
+        `recorded_ballot` is a CTE returning the election id of the voting process
+        that was just inserted; when it returns no row (the voter had already
+        voted) no counter is touched. The statement returns at least one row when
+        the ballot was counted. `receipt_value` is folded into the election's
+        receipt accumulator along with the +1 on its total.
+        """
+        if shards > 1:
+            return VoteCounter._count_ballot_sharded(
+                candidate_ids,
+                recorded_ballot,
+                VoteCounter.shard_for(voter_hashed_national_id, shards),
+                receipt_value
+            )
+
+        locked_participations = (
+            select(CandidateParticipation.candidate_hashed_national_id)
+            .where(
+                CandidateParticipation.election_id.in_(select(recorded_ballot.c.election_id)),
+                CandidateParticipation.candidate_hashed_national_id.in_(candidate_ids)
+            )
+            .order_by(CandidateParticipation.candidate_hashed_national_id)
+            .with_for_update()
+            .cte("locked_participations")
+        )
+        election_total = (
+            update(Election)
+            .where(Election.id.in_(select(recorded_ballot.c.election_id)))
+            .values(
+                total_vote_count=Election.total_vote_count + 1,
+                receipt_accumulator=_fold_receipts(Election.receipt_accumulator, _receipt_literal(receipt_value))
+            )
+            .returning(Election.id)
+            .cte("updated_election_total")
+        )
+        return (
+            update(CandidateParticipation)
+            .where(
+                CandidateParticipation.election_id == election_id,
+                CandidateParticipation.candidate_hashed_national_id.in_(
+                    select(locked_participations.c.candidate_hashed_national_id)
+                )
+            )
+            .values(vote_count=CandidateParticipation.vote_count + 1)
+            .returning(CandidateParticipation.candidate_hashed_national_id)
+            .add_cte(recorded_ballot)
+            .add_cte(election_total)
+        )
+
+    @staticmethod
+    def _count_ballot_sharded(candidate_ids: List[str], recorded_ballot, shard: int, receipt_value: int):
+        """Upsert +1 into the ballot's slot for every selected candidate and for the election total"""
+        slots = values(
+            column("candidate_hashed_national_id", String),
+            column("receipt_accumulator", RECEIPT_NUMERIC),
+            name="ballot_slots"
+        ).data(
+            [(ELECTION_TOTAL, Decimal(receipt_value % RECEIPT_MODULUS))]
+            + [(candidate_id, Decimal(0)) for candidate_id in sorted(candidate_ids)]
+        )
+
+        upsert = insert(VoteCounterShard).from_select(
+            ["election_id", "candidate_hashed_national_id", "shard", "vote_count", "receipt_accumulator"],
+            select(
+                recorded_ballot.c.election_id,
+                slots.c.candidate_hashed_national_id,
+                literal(shard, Integer),
+                literal(1, Integer),
+                slots.c.receipt_accumulator
+            )
+            .select_from(recorded_ballot)
+            .join(slots, true())
+            .order_by(slots.c.candidate_hashed_national_id)
+        )
+        return (
+            upsert.on_conflict_do_update(
+                index_elements=[
+                    VoteCounterShard.election_id,
+                    VoteCounterShard.candidate_hashed_national_id,
+                    VoteCounterShard.shard
+                ],
+                set_={
+                    "vote_count": VoteCounterShard.vote_count + upsert.excluded.vote_count,
+                    "receipt_accumulator": _fold_receipts(
+                        VoteCounterShard.receipt_accumulator, upsert.excluded.receipt_accumulator
+                    )
+                }
+            )
+            .returning(VoteCounterShard.candidate_hashed_national_id)
+            .add_cte(recorded_ballot)
+        )
+
+    @staticmethod
+    async def apply_deltas(
+        election_id: int, ballots: int, candidate_deltas: Dict[str, int], db, receipt_delta: int = 0
+    ) -> None:
+        """
+        Add aggregated counts for many ballots at once: `ballots` to the election
+        total and each candidate's delta to its participation, in two statements
+        whatever the number of ballots. `receipt_delta` is the sum of the ballots'
+        receipt values. The caller owns the transaction.
+        """
+        if ballots <= 0:
+            return
+
+        if candidate_deltas:
+            deltas = values(
+                column("candidate_hashed_national_id", String),
+                column("delta", Integer),
+                name="candidate_deltas"
+            ).data(sorted(candidate_deltas.items()))
+
+            await db.execute(
+                update(CandidateParticipation)
+                .where(
+                    CandidateParticipation.election_id == election_id,
+                    CandidateParticipation.candidate_hashed_national_id == deltas.c.candidate_hashed_national_id
+                )
+                .values(vote_count=CandidateParticipation.vote_count + deltas.c.delta)
+            )
+
+        await db.execute(
+            update(Election)
+            .where(Election.id == election_id)
+            .values(
+                total_vote_count=Election.total_vote_count + ballots,
+                receipt_accumulator=_fold_receipts(Election.receipt_accumulator, _receipt_literal(receipt_delta))
+            )
+        )
+
+    @staticmethod
+    async def rollup(election_id: int, db) -> int:
+        """
+        Drain the election's counter slots into its election and participation
+        counters and commit. Slots are deleted and summed in the same statements,
+        so ballots counted concurrently either land in this rollup or in a freshly
+        created slot picked up by the next one.
+
+        Returns the number of ballots moved into the election total.
+        """
+        drained = (
+            delete(VoteCounterShard)
+            .where(VoteCounterShard.election_id == election_id)
+            .returning(
+                VoteCounterShard.candidate_hashed_national_id,
+                VoteCounterShard.vote_count,
+                VoteCounterShard.receipt_accumulator
+            )
+            .cte("drained_slots")
+        )
+        totals_result = await db.execute(
+            select(
+                drained.c.candidate_hashed_national_id,
+                func.sum(drained.c.vote_count),
+                func.sum(drained.c.receipt_accumulator)
+            )
+            .group_by(drained.c.candidate_hashed_national_id)
+        )
+        totals = {}
+        receipt_delta = 0
+        for candidate_id, count, receipts in totals_result.all():
+            totals[candidate_id] = int(count)
+            if candidate_id == ELECTION_TOTAL:
+                receipt_delta = int(receipts)
+
+        ballots = totals.pop(ELECTION_TOTAL, 0)
+        await VoteCounter.apply_deltas(election_id, ballots, totals, db, receipt_delta=receipt_delta)
+        await db.commit()
+        return ballots
+
+    @staticmethod
+    async def current_counts(election_id: int, db) -> Tuple[int, Dict[str, int]]:
+        """
+        Ballots and per-candidate votes counted so far, including counter slots
+        that have not been rolled up yet. Unlike `rollup` this only reads.
+        """
+        total_result = await db.execute(select(Election.total_vote_count).where(Election.id == election_id))
+        ballots = total_result.scalar_one_or_none() or 0
+
+        participations_result = await db.execute(
+            select(CandidateParticipation.candidate_hashed_national_id, CandidateParticipation.vote_count)
+            .where(CandidateParticipation.election_id == election_id)
+        )
+        counts = {candidate_id: vote_count for candidate_id, vote_count in participations_result.all()}
+
+        slots_result = await db.execute(
+            select(VoteCounterShard.candidate_hashed_national_id, func.sum(VoteCounterShard.vote_count))
+            .where(VoteCounterShard.election_id == election_id)
+            .group_by(VoteCounterShard.candidate_hashed_national_id)
+        )
+        for candidate_id, vote_count in slots_result.all():
+            if candidate_id == ELECTION_TOTAL:
+                ballots += int(vote_count)
+            else:
+                counts[candidate_id] = counts.get(candidate_id, 0) + int(vote_count)
+
+        return ballots, counts
+
+    @staticmethod
+    async def rollup_sharded_elections(db) -> int:
+        """Roll up every election that still has undrained counter slots"""
+        result = await db.execute(select(VoteCounterShard.election_id).distinct())
+        election_ids = result.scalars().all()
+
+        for election_id in election_ids:
+            await VoteCounter.rollup(election_id, db)
+
+        return len(election_ids)
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Awaitable, BinaryIO, Callable
+
+from fastapi import HTTPException, UploadFile
+
+from core.settings import settings
+from services.bulk_loader import BulkLoader
+from services.csv_handler import MAX_REPORTED_ERRORS, VOTER_REQUIRED_COLUMNS, CSVHandler
+
+
+class VoterImportService:
+    """
+    Imports voter rolls of any size from CSV with bounded memory.
+
+    The upload is read straight from its spooled temporary file, parsed and
+    validated VOTER_IMPORT_CHUNK_ROWS rows at a time in a worker thread, and
+    each valid chunk is bulk loaded with COPY before the next one is read.
+    Everything happens in the caller's transaction, so a file with bad rows
+    is still read to the end (to report every bad row) and then rolled back
+    by the caller as a whole.
+    """
+
+    @staticmethod
+    async def import_voters_csv(file: UploadFile, election_id: int, db) -> int:
+        """Add the voters of an uploaded CSV to the election's roll; returns how many were new"""
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="File must be a CSV")
+
+        await file.seek(0)
+        return await VoterImportService.import_voters(file.file, election_id, db)
+
+    @staticmethod
+    async def import_voters(
+        file: BinaryIO,
+        election_id: int,
+        db,
+        on_progress: Callable[[int, int, int], Awaitable[None]] | None = None
+    ) -> int:
+        """
+        Add the voters of a CSV file to the election's roll; returns how many
+        were new. `on_progress` is awaited after every chunk with the rows read,
+        the rows rejected so far and the bytes of the file consumed.
+        """
+        chunks = CSVHandler.read_csv_chunks(
+            file, "voters", VOTER_REQUIRED_COLUMNS, settings.VOTER_IMPORT_CHUNK_ROWS
+        )
+
+        imported = 0
+        rows_read = 0
+        rows_rejected = 0
+        errors = []
+        error_count = 0
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            voters, chunk_errors = await asyncio.to_thread(CSVHandler.validate_voters, chunk)
+
+            if chunk_errors:
+                error_count += len(chunk_errors)
+                rows_rejected += len({index for index, _ in chunk_errors})
+                chunk_errors.sort()
+                errors += [(rows_read + index, message) for index, message in chunk_errors[:MAX_REPORTED_ERRORS - len(errors)]]
+            elif not error_count and voters:
+                loaded = await BulkLoader.load_voters(election_id, voters, db)
+                imported += loaded.inserted
+            rows_read += len(chunk)
+            if on_progress is not None:
+                await on_progress(rows_read, rows_rejected, file.tell())
+
+        CSVHandler.raise_for_errors(errors, total=error_count)
+        print(f"Imported {imported} of {rows_read} voters into election {election_id}")
+        return imported
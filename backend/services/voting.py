@@ -0,0 +1,346 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from sqlalchemy import String, any_, bindparam, exists
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from models.election_result_snapshot import ElectionResultSnapshot
+from models.voter import Voter
+from models.voting_process import VotingProcess
+from schemas.voting import BallotResult, KioskBallot
+from services.ballot_integrity import new_receipt, receipt_value, sum_receipts
+from services.election_cache import election_cache
+from services.tabulation import RANKED_METHODS, TabulationService, record_ranking
+from services.turnout import TurnoutService
+from services.vote_buffer import VoteBuffer
+from services.vote_counter import VoteCounter
+
+
+class VotingService:
+    """Service for validating and recording ballots"""
+
+    # Rows per multi-row INSERT, well below the 32767 bind parameters asyncpg allows
+    BATCH_INSERT_ROWS = 5000
+
+    @staticmethod
+    async def cast_ballot(
+        election_id: int,
+        voter_hashed_national_id: str,
+        candidate_hashed_national_ids: List[str],
+        db,
+        redis: Redis | None = None,
+    ) -> Tuple[datetime, str]:
+        """
+        Validate and record a whole ballot in two round trips regardless of ballot size:
+        - one SELECT of the voter state, including the candidates an API voter is
+          restricted to; the election window and its participating candidates come
+          from the election cache
+        - one data-modifying statement that inserts the voting process and increments
+          every counter and its turnout bucket only if the insert did not conflict
+
+        When `redis` is given the second round trip is replaced by queueing the
+        ballot in the vote buffer, which writes it to the database in batches.
+
+        Returns the timestamp recorded for the ballot and the voter's receipt.
+        """
+        candidate_ids = list(candidate_hashed_national_ids)
+
+        if len(set(candidate_ids)) != len(candidate_ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The same candidate cannot be selected more than once"
+            )
+
+        election = await election_cache.get(election_id, db)
+        if not election:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
+
+        now = datetime.now(timezone.utc)
+        if not election.is_running(now):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Election is not currently running")
+
+        # Round trip 1: the voter state
+        voter_has_voted = exists().where(
+            VotingProcess.voter_hashed_national_id == Voter.voter_hashed_national_id,
+            VotingProcess.election_id == election_id
+        )
+        voter_result = await db.execute(
+            select(Voter.is_verified, Voter.eligible_candidate_ids, voter_has_voted.label("voter_has_voted")).where(
+                Voter.voter_hashed_national_id == voter_hashed_national_id,
+                Voter.election_id == election_id
+            )
+        )
+        voter = voter_result.one_or_none()
+
+        if not voter or not voter.is_verified:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Voter not found or not verified for this election")
+
+        if voter.voter_has_voted:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Voter has already voted in this election")
+
+        ballot_size_error = election.ballot_size_error(len(candidate_ids))
+        if ballot_size_error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=ballot_size_error)
+
+        for candidate_id in candidate_ids:
+            if candidate_id not in election.candidate_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Candidate {candidate_id} is not participating in this election"
+                )
+
+        ineligible_candidate_id = VotingService._find_ineligible_candidate(voter.eligible_candidate_ids, candidate_ids)
+        if ineligible_candidate_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Voter is not eligible to vote for candidate {ineligible_candidate_id}"
+            )
+
+        receipt = new_receipt(election_id, voter_hashed_national_id, now)
+
+        if redis is not None:
+            # Buffered ingestion: the Redis claim is the duplicate check, the ballot
+            # reaches PostgreSQL through the vote buffer consumer
+            if not await VoteBuffer.submit(redis, election_id, voter_hashed_national_id, candidate_ids, now, receipt):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Voter has already voted in this election")
+            return now, receipt
+
+        # Round trip 2: record the ballot. The counters are only touched when the
+        # voting process insert did not hit the (voter, election) primary key, so a
+        # concurrent duplicate submission cannot be counted twice.
+        inserted = (
+            insert(VotingProcess)
+            .values(
+                voter_hashed_national_id=voter_hashed_national_id,
+                election_id=election_id,
+                created_at=now,
+                receipt_hash=receipt
+            )
+            .on_conflict_do_nothing(
+                index_elements=[VotingProcess.voter_hashed_national_id, VotingProcess.election_id]
+            )
+            .returning(VotingProcess.election_id, VotingProcess.voter_hashed_national_id, VotingProcess.created_at)
+            .cte("inserted_voting_process")
+        )
+        counted_turnout = TurnoutService.count_ballots(
+            inserted, shard=VoteCounter.shard_for(voter_hashed_national_id, election.counter_shards)
+        ).cte("counted_turnout")
+        statement = VoteCounter.count_ballot(
+            election_id,
+            candidate_ids,
+            inserted,
+            shards=election.counter_shards,
+            voter_hashed_national_id=voter_hashed_national_id,
+            receipt_value=receipt_value(receipt)
+        ).add_cte(counted_turnout)
+        if election.tabulation_method in RANKED_METHODS:
+            statement = statement.add_cte(record_ranking(inserted, candidate_ids).cte("recorded_ranking"))
+        record_result = await db.execute(statement)
+
+        if not record_result.all():
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Voter has already voted in this election")
+
+        await db.commit()
+        return now, receipt
+
+    @staticmethod
+    async def cast_ballots(
+        election_id: int,
+        organization_id: int,
+        ballots: List[Tuple[int, KioskBallot]],
+        db,
+        redis: Redis | None = None,
+    ) -> List[BallotResult]:
+        """
+        Validate and record a batch of kiosk ballots for one election.
+
+        Ballots are checked against the cached election one by one, then against
+        the voters table with a single query for the whole batch. Accepted ballots
+        are inserted with multi-row INSERT ... ON CONFLICT DO NOTHING statements
+        and counted with one aggregated counter update, all in one transaction.
+
+        Uploads are refused with 409 once KIOSK_UPLOAD_WINDOW_SECONDS have passed
+        since the election ended, whenever the ballots were cast, or once its
+        results have been snapshotted.
+
+        `ballots` holds (position in the upload, ballot) pairs; one result is
+        returned per pair, in the same order.
+        """
+        election = await election_cache.get(election_id, db)
+        if not election or election.organization_id != organization_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Election not found")
+
+        now = datetime.now(timezone.utc)
+        if now < election.starts_at:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Election has not started yet")
+        if now > election.uploads_close_at:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Ballot uploads for this election closed at {election.uploads_close_at.isoformat()}"
+            )
+        if now > election.ends_at:
+            finalized = await db.scalar(
+                select(exists().where(ElectionResultSnapshot.election_id == election_id))
+            )
+            if finalized:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT, detail="Election results have already been finalized"
+                )
+
+        results = {}
+        pending = []
+        seen_voters = set()
+
+        def reject(index: int, ballot: KioskBallot, detail: str) -> None:
+            results[index] = BallotResult(
+                index=index, voter_hashed_national_id=ballot.voter_hashed_national_id, accepted=False, detail=detail
+            )
+
+        for index, ballot in ballots:
+            candidate_ids = ballot.candidate_hashed_national_ids
+            cast_at = ballot.cast_at or now
+            if cast_at.tzinfo is None:
+                cast_at = cast_at.replace(tzinfo=timezone.utc)
+
+            if ballot.voter_hashed_national_id in seen_voters:
+                reject(index, ballot, "Voter appears more than once in this upload")
+            elif not (election.starts_at <= cast_at <= min(election.ends_at, now)):
+                reject(index, ballot, "Ballot was not cast while the election was running")
+            elif len(set(candidate_ids)) != len(candidate_ids):
+                reject(index, ballot, "The same candidate cannot be selected more than once")
+            elif ballot_size_error := election.ballot_size_error(len(candidate_ids)):
+                reject(index, ballot, ballot_size_error)
+            elif not election.candidate_ids.issuperset(candidate_ids):
+                invalid_candidate_id = next(c for c in candidate_ids if c not in election.candidate_ids)
+                reject(index, ballot, f"Candidate {invalid_candidate_id} is not participating in this election")
+            else:
+                pending.append((index, ballot, cast_at))
+            seen_voters.add(ballot.voter_hashed_national_id)
+
+        if pending:
+            # One query for the state of every voter in the batch
+            voter_ids = [ballot.voter_hashed_national_id for _, ballot, _ in pending]
+            has_voted = exists().where(
+                VotingProcess.voter_hashed_national_id == Voter.voter_hashed_national_id,
+                VotingProcess.election_id == election_id
+            )
+            voters_result = await db.execute(
+                select(
+                    Voter.voter_hashed_national_id,
+                    Voter.is_verified,
+                    Voter.eligible_candidate_ids,
+                    has_voted.label("has_voted")
+                ).where(
+                    Voter.election_id == election_id,
+                    Voter.voter_hashed_national_id == any_(bindparam("voter_ids", voter_ids, type_=ARRAY(String)))
+                )
+            )
+            voter_states = {row.voter_hashed_national_id: row for row in voters_result.all()}
+
+            eligible = []
+            for index, ballot, cast_at in pending:
+                voter = voter_states.get(ballot.voter_hashed_national_id)
+                if not voter or not voter.is_verified:
+                    reject(index, ballot, "Voter not found or not verified for this election")
+                elif voter.has_voted:
+                    reject(index, ballot, "Voter has already voted in this election")
+                elif ineligible_candidate_id := VotingService._find_ineligible_candidate(
+                    voter.eligible_candidate_ids, ballot.candidate_hashed_national_ids
+                ):
+                    reject(index, ballot, f"Voter is not eligible to vote for candidate {ineligible_candidate_id}")
+                else:
+                    eligible.append((index, ballot, cast_at))
+            pending = eligible
+
+        claimed = []
+        if pending and redis is not None:
+            # Keep the vote buffer from accepting these voters again
+            claimed_voters = await VoteBuffer.claim_voters(
+                redis, election_id, [ballot.voter_hashed_national_id for _, ballot, _ in pending], now
+            )
+            eligible = []
+            for index, ballot, cast_at in pending:
+                if ballot.voter_hashed_national_id in claimed_voters:
+                    eligible.append((index, ballot, cast_at))
+                    claimed.append(ballot.voter_hashed_national_id)
+                else:
+                    reject(index, ballot, "Voter has already voted in this election")
+            pending = eligible
+
+        receipts = {
+            ballot.voter_hashed_national_id: new_receipt(election_id, ballot.voter_hashed_national_id, cast_at)
+            for _, ballot, cast_at in pending
+        }
+
+        if pending:
+            try:
+                recorded = set()
+                for start in range(0, len(pending), VotingService.BATCH_INSERT_ROWS):
+                    chunk = pending[start:start + VotingService.BATCH_INSERT_ROWS]
+                    inserted = await db.execute(
+                        insert(VotingProcess)
+                        .values([
+                            {
+                                "voter_hashed_national_id": ballot.voter_hashed_national_id,
+                                "election_id": election_id,
+                                "created_at": cast_at,
+                                "receipt_hash": receipts[ballot.voter_hashed_national_id],
+                            }
+                            for _, ballot, cast_at in chunk
+                        ])
+                        .on_conflict_do_nothing(
+                            index_elements=[VotingProcess.voter_hashed_national_id, VotingProcess.election_id]
+                        )
+                        .returning(VotingProcess.voter_hashed_national_id)
+                    )
+                    recorded.update(inserted.scalars().all())
+
+                candidate_deltas = Counter()
+                rankings = []
+                for index, ballot, _ in pending:
+                    if ballot.voter_hashed_national_id in recorded:
+                        candidate_deltas.update(ballot.candidate_hashed_national_ids)
+                        rankings.append(ballot.candidate_hashed_national_ids)
+                        results[index] = BallotResult(
+                            index=index,
+                            voter_hashed_national_id=ballot.voter_hashed_national_id,
+                            accepted=True,
+                            receipt=receipts[ballot.voter_hashed_national_id]
+                        )
+                    else:
+                        # Voted between the state query and the insert
+                        reject(index, ballot, "Voter has already voted in this election")
+
+                await VoteCounter.apply_deltas(
+                    election_id,
+                    len(recorded),
+                    dict(candidate_deltas),
+                    db,
+                    receipt_delta=sum_receipts(receipts[voter_id] for voter_id in recorded)
+                )
+                if recorded:
+                    await db.execute(TurnoutService.count_recorded_voters(election_id, list(recorded)))
+                if election.tabulation_method in RANKED_METHODS:
+                    await TabulationService.store_rankings(election_id, rankings, db)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                if redis is not None:
+                    await VoteBuffer.release_voters(redis, election_id, claimed)
+                raise
+
+        return [results[index] for index, _ in ballots]
+
+    @staticmethod
+    def _find_ineligible_candidate(eligible_candidate_ids: List[str] | None, candidate_ids: List[str]) -> str | None:
+        """First selected candidate outside the voter's eligible candidates, if the voter is restricted"""
+        if eligible_candidate_ids is None:
+            return None
+        eligible = set(eligible_candidate_ids)
+        return next((candidate_id for candidate_id in candidate_ids if candidate_id not in eligible), None)
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from core.settings import settings
+from schemas.voting import KioskBallot
+from services import voting
+from services.election_cache import CachedElection
+from services.voting import VotingService
+
+
+def closed_election(ended_ago: timedelta) -> CachedElection:
+    ends_at = datetime.now(timezone.utc) - ended_ago
+    return CachedElection(
+        id=1,
+        organization_id=1,
+        title="Closed election",
+        starts_at=ends_at - timedelta(hours=8),
+        ends_at=ends_at,
+        num_of_votes_per_voter=1,
+        counter_shards=1,
+        live_results=False,
+        tabulation_method="plurality",
+        candidate_ids=frozenset({"candidate"}),
+        candidates=(),
+        ballot_payload=None,
+    )
+
+
+class FinalizedElectionSession:
+    """Stands in for the database of an election whose results snapshot exists"""
+
+    async def scalar(self, statement):
+        return True
+
+
+def upload(monkeypatch, election: CachedElection, db=None):
+    async def cached(election_id, db):
+        return election
+
+    monkeypatch.setattr(voting.election_cache, "get", cached)
+    ballot = KioskBallot(
+        voter_hashed_national_id="voter",
+        candidate_hashed_national_ids=["candidate"],
+        cast_at=election.ends_at - timedelta(minutes=5),
+    )
+    return asyncio.run(VotingService.cast_ballots(election.id, election.organization_id, [(0, ballot)], db))
+
+
+def test_upload_after_window_is_rejected(monkeypatch):
+    election = closed_election(timedelta(seconds=settings.KIOSK_UPLOAD_WINDOW_SECONDS + 60))
+
+    with pytest.raises(HTTPException) as rejected:
+        upload(monkeypatch, election)
+
+    assert rejected.value.status_code == 409
+
+
+def test_upload_after_finalization_is_rejected(monkeypatch):
+    election = closed_election(timedelta(minutes=1))
+
+    with pytest.raises(HTTPException) as rejected:
+        upload(monkeypatch, election, FinalizedElectionSession())
+
+    assert rejected.value.status_code == 409
+    assert rejected.value.detail == "Election results have already been finalized"
+
+
+def test_upload_window_is_measured_from_the_close():
+    election = closed_election(timedelta(0))
+
+    assert election.uploads_close_at - election.ends_at == timedelta(seconds=settings.KIOSK_UPLOAD_WINDOW_SECONDS)